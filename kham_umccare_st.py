@@ -6,6 +6,9 @@ import os
 from datetime import datetime, date # Import the date object
 import re
 import openpyxl
+from umc_loader import process_umc_workbook
+from umc_daily import ingest_daily_export
+from umc_session import share_dataset, activate_dataset, restore_session, sync_view, current_view, save_view
 
 # Set page configuration (do this ONLY in the main script)
 st.set_page_config(
@@ -17,293 +20,104 @@ st.set_page_config(
 # --- Configuration ---
 MAX_MONTHS = 12
 EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
-EXCLUDE_SPECIALTY_TERMS = ['grand total', 'tổng cộng', 'total']
 
-# --- Helper Function to Parse Sheet Names ---
-# ...(No changes needed here)...
-def parse_sheet_name_to_date(sheet_name):
-    """Attempts to parse common month/year formats from sheet names."""
-    sheet_name_lower = str(sheet_name).lower().strip()
-    formats_to_try = [
-        "%b-%y", "%b %y", "%B-%y", "%B %y", "%b-%Y", "%b %Y", "%B-%Y", "%B %Y",
-        "T%m-%y", "T%m_%y", "T%m-%Y", "T%m_%Y", "thang%m_%y", "thang%m-%y",
-        "thang%m_%Y", "thang%m-%Y", "%m/%Y", "%m-%Y", "%Y/%m", "%Y-%m"
-    ]
-    cleaned_name = re.sub(r'^(sheet|data|thang|t)(\s*|-|_)?', '', sheet_name_lower)
-    for fmt in formats_to_try:
-        try:
-            # Return as Timestamp initially, convert later if needed
-            return pd.to_datetime(cleaned_name, format=fmt).replace(day=1)
-        except ValueError:
-            continue
-    # st.warning(f"Không thể tự động nhận dạng tháng/năm từ tên sheet: '{sheet_name}'. Bỏ qua sheet này.") # Reduce noise
-    return None
 # --- Data Loading Function ---
+def show_load_report(report):
+    """Renders the loader's messages and the data validation report."""
+    for level, text in report['messages']:
+        getattr(st, level)(text)
+    if report['issue_summary'] is not None:
+        st.dataframe(report['issue_summary'])
+        with st.expander("Chi tiết vấn đề dữ liệu"):
+            st.dataframe(report['issue_details'])
+
 @st.cache_data(ttl=3600)
 def load_process_umc_data_monthly(file_path):
-    """Loads data assuming each sheet is a month, EXCLUDING 'Grand Total' specialty rows."""
+    """Loads data assuming each sheet is a month, EXCLUDING 'Grand Total' specialty rows.
+
+    Returns (data, new specialty aliases); the aliases are persisted by the caller, not in here.
+    """
     st.info("Đang đọc file Excel...")
     try:
-        df_sheets = pd.read_excel(file_path, sheet_name=None)
-        if not df_sheets:
-            st.error("File Excel không chứa sheet nào.")
-            return None
-
-        all_monthly_data = []
-        valid_sheets_found = 0
-        parsed_sheet_names = [] # Keep track to avoid duplicate warnings
-
-        for sheet_name, raw_data in df_sheets.items():
-            month_date = parse_sheet_name_to_date(sheet_name)
-            if month_date is None:
-                if sheet_name not in parsed_sheet_names: # Show warning only once per name
-                    st.warning(f"Bỏ qua sheet '{sheet_name}' do không nhận dạng được ngày tháng.")
-                    parsed_sheet_names.append(sheet_name)
-                continue
-
-            if 'Chuyên khoa' not in raw_data.columns:
-                st.warning(f"Sheet '{sheet_name}' ({month_date.strftime('%b %Y')}) thiếu cột 'Chuyên khoa'. Bỏ qua.")
-                continue
-
-            # Exclude Grand Total / Summary Rows
-            raw_data['Chuyên khoa'] = raw_data['Chuyên khoa'].astype(str)
-            mask_keep = ~raw_data['Chuyên khoa'].str.lower().str.strip().isin(EXCLUDE_SPECIALTY_TERMS)
-            data_cleaned = raw_data[mask_keep].copy()
-            if data_cleaned.empty:
-                 st.warning(f"Sheet '{sheet_name}' ({month_date.strftime('%b %Y')}) không còn dữ liệu sau khi loại bỏ dòng tổng cộng. Bỏ qua.")
-                 continue
-
-            present_channels = [ch for ch in EXPECTED_CHANNELS if ch in data_cleaned.columns]
-
-            cols_to_keep = ['Chuyên khoa'] + present_channels
-            cols_to_keep = [col for col in cols_to_keep if col in data_cleaned.columns]
-            monthly_df = data_cleaned[cols_to_keep].copy()
-            monthly_df['Month'] = month_date
-
-            for channel in present_channels:
-                monthly_df[channel] = pd.to_numeric(monthly_df[channel], errors='coerce').fillna(0).astype(int)
-
-            if present_channels:
-                 monthly_df['Grand Total'] = monthly_df[present_channels].sum(axis=1)
-            else:
-                 monthly_df['Grand Total'] = 0
-
-            all_monthly_data.append(monthly_df)
-            valid_sheets_found += 1
-
-        if not all_monthly_data:
-            st.error("Không tìm thấy sheet hợp lệ nào chứa dữ liệu chuyên khoa (sau khi loại bỏ dòng tổng cộng).")
-            return None
-
-        combined_df = pd.concat(all_monthly_data, ignore_index=True)
-
-        pivot_values = [ch for ch in EXPECTED_CHANNELS if ch in combined_df.columns] + ['Grand Total']
-        pivot_values = list(set(col for col in pivot_values if col in combined_df.columns))
-
-        try:
-             duplicates = combined_df[combined_df.duplicated(subset=['Month', 'Chuyên khoa'], keep=False)]
-             if not duplicates.empty:
-                 st.warning("Phát hiện dữ liệu chuyên khoa trùng lặp trong cùng một tháng. Sẽ cộng gộp giá trị.")
-
-             pivoted_df = combined_df.pivot_table(
-                 index=['Month', 'Chuyên khoa'],
-                 values=pivot_values,
-                 fill_value=0,
-                 aggfunc='sum'
-             )
-        except Exception as pivot_error:
-             st.error(f"Lỗi khi tổng hợp dữ liệu: {pivot_error}")
-             return None
-
-        pivoted_df = pivoted_df.sort_index()
-
-        if 'Grand Total' in pivoted_df.columns:
-             pivoted_df['Total_Registrations_AllM'] = pivoted_df.groupby(level='Chuyên khoa')['Grand Total'].transform('sum')
-        else:
-             channel_sum_cols = [ch for ch in EXPECTED_CHANNELS if ch in pivoted_df.columns]
-             if channel_sum_cols:
-                  pivoted_df['Temp_Total'] = pivoted_df[channel_sum_cols].sum(axis=1)
-                  pivoted_df['Total_Registrations_AllM'] = pivoted_df.groupby(level='Chuyên khoa')['Temp_Total'].transform('sum')
-                  if 'Temp_Total' in pivoted_df.columns: del pivoted_df['Temp_Total']
-             else:
-                  pivoted_df['Total_Registrations_AllM'] = 0
-
-        st.success(f"Đã xử lý thành công dữ liệu từ {valid_sheets_found} sheet.")
-        return pivoted_df
-
+        data, report = process_umc_workbook(file_path)
     except Exception as e:
         st.error(f"Lỗi khi đọc hoặc xử lý file Excel: {e}")
         import traceback
-        st.error(traceback.format_exc())
-        return None
+        with st.expander("Chi tiết kỹ thuật"):
+            st.code(traceback.format_exc())
+        return None, {}
+    show_load_report(report)
+    return data, report['new_aliases']
 
-file_path = "So lieu UMC care.xlsx"
-# Load data directly from file_path if it exists
-if os.path.exists(file_path):
-    st.info(f"Đang tải dữ liệu từ file: {file_path}")
-    data = load_process_umc_data_monthly(file_path)
-    if data is not None:
-        st.session_state['umc_data'] = data
-        min_ts = data.index.get_level_values('Month').min()
-        max_ts = data.index.get_level_values('Month').max()
-        st.session_state['min_date'] = min_ts
-        st.session_state['max_date'] = max_ts
-        st.session_state['start_date'] = min_ts
-        st.session_state['end_date'] = max_ts
-    else:
-        st.error("Không thể tải dữ liệu từ file.")
-else:
-    st.warning(f"File '{file_path}' không tồn tại. Vui lòng kiểm tra đường dẫn.")
-# --- Data Loading Function ---
-# ...(No changes needed in the core logic, just ensure it returns Timestamps or None)...
 @st.cache_data(ttl=3600)
-def load_process_umc_data_monthly(file_path):
-    """Loads data assuming each sheet is a month, EXCLUDING 'Grand Total' specialty rows."""
-    st.info("Đang đọc file Excel...")
+def load_daily_export(uploaded_daily_file):
+    """Rolls a daily CSV/Parquet export up to the monthly frame; returns (data, drill-down store path, new aliases)."""
+    st.info("Đang đọc dữ liệu theo ngày...")
     try:
-        df_sheets = pd.read_excel(file_path, sheet_name=None)
-        if not df_sheets:
-            st.error("File Excel không chứa sheet nào.")
-            return None
-
-        all_monthly_data = []
-        valid_sheets_found = 0
-        parsed_sheet_names = [] # Keep track to avoid duplicate warnings
-
-        for sheet_name, raw_data in df_sheets.items():
-            month_date = parse_sheet_name_to_date(sheet_name)
-            if month_date is None:
-                if sheet_name not in parsed_sheet_names: # Show warning only once per name
-                    st.warning(f"Bỏ qua sheet '{sheet_name}' do không nhận dạng được ngày tháng.")
-                    parsed_sheet_names.append(sheet_name)
-                continue
-
-            if 'Chuyên khoa' not in raw_data.columns:
-                st.warning(f"Sheet '{sheet_name}' ({month_date.strftime('%b %Y')}) thiếu cột 'Chuyên khoa'. Bỏ qua.")
-                continue
-
-            # Exclude Grand Total / Summary Rows
-            raw_data['Chuyên khoa'] = raw_data['Chuyên khoa'].astype(str)
-            mask_keep = ~raw_data['Chuyên khoa'].str.lower().str.strip().isin(EXCLUDE_SPECIALTY_TERMS)
-            data_cleaned = raw_data[mask_keep].copy()
-            # num_excluded = len(raw_data) - len(data_cleaned) # Reduce verbose output
-            # if num_excluded > 0:
-            #      st.write(f"Sheet '{sheet_name}': Đã loại bỏ {num_excluded} dòng tổng cộng.")
-            if data_cleaned.empty:
-                 st.warning(f"Sheet '{sheet_name}' ({month_date.strftime('%b %Y')}) không còn dữ liệu sau khi loại bỏ dòng tổng cộng. Bỏ qua.")
-                 continue
-
-            present_channels = [ch for ch in EXPECTED_CHANNELS if ch in data_cleaned.columns]
-            # Don't skip if channels are missing, just process what's there + Grand Total later
-
-            cols_to_keep = ['Chuyên khoa'] + present_channels
-            # Handle potential missing channel columns gracefully when selecting
-            cols_to_keep = [col for col in cols_to_keep if col in data_cleaned.columns]
-            monthly_df = data_cleaned[cols_to_keep].copy()
-            monthly_df['Month'] = month_date
-
-            # Process present channels
-            for channel in present_channels: # Only loop through channels actually found
-                monthly_df[channel] = pd.to_numeric(monthly_df[channel], errors='coerce').fillna(0).astype(int)
-
-            # Add/Recalculate Grand Total column
-            if present_channels: # Only calculate if there were any channels found
-                 monthly_df['Grand Total'] = monthly_df[present_channels].sum(axis=1)
-            else:
-                 monthly_df['Grand Total'] = 0 # Assign 0 if no standard channels were found
-
-            all_monthly_data.append(monthly_df)
-            valid_sheets_found += 1
-
-        if not all_monthly_data:
-            st.error("Không tìm thấy sheet hợp lệ nào chứa dữ liệu chuyên khoa (sau khi loại bỏ dòng tổng cộng).")
-            return None
-
-        combined_df = pd.concat(all_monthly_data, ignore_index=True)
-
-        # --- Pivot ---
-        pivot_values = [ch for ch in EXPECTED_CHANNELS if ch in combined_df.columns] + ['Grand Total']
-        pivot_values = list(set(col for col in pivot_values if col in combined_df.columns)) # Ensure unique and present values
-
-        try:
-             # Check for duplicates before pivoting
-             duplicates = combined_df[combined_df.duplicated(subset=['Month', 'Chuyên khoa'], keep=False)]
-             if not duplicates.empty:
-                 st.warning("Phát hiện dữ liệu chuyên khoa trùng lặp trong cùng một tháng. Sẽ cộng gộp giá trị.")
-                 # st.dataframe(duplicates.sort_values(by=['Month', 'Chuyên khoa'])) # Optional: show duplicates
-
-             pivoted_df = combined_df.pivot_table(
-                 index=['Month', 'Chuyên khoa'],
-                 values=pivot_values,
-                 fill_value=0,
-                 aggfunc='sum' # Use sum to handle potential duplicates
-             )
-        except Exception as pivot_error:
-             st.error(f"Lỗi khi tổng hợp dữ liệu: {pivot_error}")
-             return None
-
-        pivoted_df = pivoted_df.sort_index()
-
-        # Calculate overall total
-        if 'Grand Total' in pivoted_df.columns:
-             pivoted_df['Total_Registrations_AllM'] = pivoted_df.groupby(level='Chuyên khoa')['Grand Total'].transform('sum')
-        else:
-             channel_sum_cols = [ch for ch in EXPECTED_CHANNELS if ch in pivoted_df.columns]
-             if channel_sum_cols:
-                  pivoted_df['Temp_Total'] = pivoted_df[channel_sum_cols].sum(axis=1)
-                  pivoted_df['Total_Registrations_AllM'] = pivoted_df.groupby(level='Chuyên khoa')['Temp_Total'].transform('sum')
-                  if 'Temp_Total' in pivoted_df.columns: del pivoted_df['Temp_Total']
-             else:
-                  pivoted_df['Total_Registrations_AllM'] = 0
-
-        st.success(f"Đã xử lý thành công dữ liệu từ {valid_sheets_found} sheet.")
-        return pivoted_df
-
+        data, report = ingest_daily_export(uploaded_daily_file)
     except Exception as e:
-        st.error(f"Lỗi khi đọc hoặc xử lý file Excel: {e}")
+        st.error(f"Lỗi khi đọc hoặc xử lý dữ liệu theo ngày: {e}")
         import traceback
-        st.error(traceback.format_exc())
-        return None
-
-# --- Sidebar ---
-st.sidebar.title("Tải & Cấu hình")
-uploaded_file = st.sidebar.file_uploader("Tải lên file Excel UMC Care (Sheet theo Tháng)", type=["xlsx", "xls"])
+        with st.expander("Chi tiết kỹ thuật"):
+            st.code(traceback.format_exc())
+        return None, None, {}
+    show_load_report(report)
+    return data, report['daily_store'], report['new_aliases']
+
+# --- Session Dataset ---
+# The frame and its indexes are shared by all sessions (one copy per dataset version); the session
+# only references them, so the cache_data copy returned by the loaders is dropped right away.
+def set_active_dataset(data, daily_store=None, source=None, new_aliases=None):
+    """Points the session at the shared dataset; the date range resets only when the dataset changes."""
+    entry = share_dataset(data, daily_store, source, new_aliases) if data is not None and not data.empty else None
+    if activate_dataset(entry):
+        # Let the date pickers pick up the new range instead of their previous values
+        st.session_state.pop('date_start', None)
+        st.session_state.pop('date_end', None)
 
 # Initialize session state
 if 'umc_data' not in st.session_state: st.session_state['umc_data'] = None
+if 'umc_daily_store' not in st.session_state: st.session_state['umc_daily_store'] = None
+if 'umc_data_version' not in st.session_state: st.session_state['umc_data_version'] = None
+if 'umc_rank_index' not in st.session_state: st.session_state['umc_rank_index'] = None
 if 'start_date' not in st.session_state: st.session_state['start_date'] = None
 if 'end_date' not in st.session_state: st.session_state['end_date'] = None
-if 'min_date' not in st.session_state: st.session_state['min_date'] = None
-if 'max_date' not in st.session_state: st.session_state['max_date'] = None
 
-# Load and Store Data in Session State
+# Restore the view (date range, page selections) from the URL on the session's first run
+restore_session(default_file=None)
+
+# --- Sidebar ---
+st.sidebar.title("Tải & Cấu hình")
+uploaded_file = st.sidebar.file_uploader("Tải lên file Excel UMC Care (Sheet theo Tháng)", type=["xlsx", "xls"])
+uploaded_daily_file = st.sidebar.file_uploader("Hoặc tải lên dữ liệu theo ngày (CSV/Parquet)", type=["csv", "parquet"])
+
+# Load and Store Data in Session State (an upload takes precedence over the default file)
+file_path = "So lieu UMC care.xlsx"
 if uploaded_file is not None:
-    data = load_process_umc_data_monthly(uploaded_file) # Use the updated function
-    st.session_state['umc_data'] = data
-    # Reset dates when new file is uploaded
-    if data is not None and not data.empty:
-        # Store min/max as Timestamp initially
-        min_ts = data.index.get_level_values('Month').min()
-        max_ts = data.index.get_level_values('Month').max()
-        st.session_state['min_date'] = min_ts
-        st.session_state['max_date'] = max_ts
-        # Default selection to the full range
-        st.session_state['start_date'] = min_ts
-        st.session_state['end_date'] = max_ts
+    data, new_aliases = load_process_umc_data_monthly(uploaded_file) # Use the updated function
+    set_active_dataset(data, source=uploaded_file.name, new_aliases=new_aliases)
+elif uploaded_daily_file is not None:
+    # Daily exports are rolled up to months; the daily rows stay on disk for drill-down
+    data, daily_store, new_aliases = load_daily_export(uploaded_daily_file)
+    set_active_dataset(data, daily_store, source=uploaded_daily_file.name, new_aliases=new_aliases)
+elif os.path.exists(file_path):
+    # Load data directly from file_path if it exists
+    st.info(f"Đang tải dữ liệu từ file: {file_path}")
+    data, new_aliases = load_process_umc_data_monthly(file_path)
+    if data is not None:
+        set_active_dataset(data, source=os.path.basename(file_path), new_aliases=new_aliases)
     else:
-        st.session_state['min_date'] = None
-        st.session_state['max_date'] = None
-        st.session_state['start_date'] = None
-        st.session_state['end_date'] = None
-    # Clear uploader buffer maybe? Helps avoid re-processing same file on rerun
-    # uploaded_file.seek(0) # Reset buffer - might be needed sometimes
+        st.error("Không thể tải dữ liệu từ file.")
+else:
+    st.warning(f"File '{file_path}' không tồn tại. Vui lòng kiểm tra đường dẫn.")
 
 
 # --- Date Range Selector - WITH FIX ---
 if st.session_state['umc_data'] is not None and not st.session_state['umc_data'].empty:
-    # Retrieve Timestamps from session state
-    min_ts = st.session_state.get('min_date')
-    max_ts = st.session_state.get('max_date')
+    # Retrieve Timestamps from session state (the data's span comes from the shared ranking index)
+    data_months = st.session_state['umc_rank_index']['months']
+    min_ts = data_months[0]
+    max_ts = data_months[-1]
     start_ts = st.session_state.get('start_date')
     end_ts = st.session_state.get('end_date')
 
@@ -358,7 +172,14 @@ if st.session_state['umc_data'] is not None and not st.session_state['umc_data']
 
     # Rerun if state was updated
     if update_needed:
-         st.experimental_rerun()
+         st.rerun()
+
+    # --- Share View ---
+    sync_view()
+    if st.sidebar.button("🔗 Tạo liên kết chia sẻ", key='share_view'):
+        view_id = save_view(current_view())
+        st.sidebar.caption("Thêm vào sau địa chỉ trang để mở lại đúng chế độ xem này:")
+        st.sidebar.code(f"?view={view_id}", language='text')
 
 else:
     st.sidebar.info("Tải file dữ liệu lên để chọn khoảng thời gian.")
@@ -4,6 +4,11 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
+import numpy as np
+from umc_index import top_specialties, ranked_specialty_count, period_column_totals
+from umc_charts import resolution_selector, resample_to_resolution, time_axis, scatter_class, RESOLUTION_LABELS
+from umc_compare import build_period_comparison, comparison_frame, comparison_totals, COMPARISON_METRICS
+from umc_session import restore_session, check_widget_value
 
 # --- Configuration ---
 GA_COLOR_SEQUENCE = px.colors.qualitative.Plotly
@@ -12,10 +17,100 @@ EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care'] # Consiste
 
 st.set_page_config(page_title="Tổng quan", layout="wide")
 st.title("📊 Tổng quan dữ liệu đăng ký")
+restore_session()
+
+# --- Cached Period Comparison (one per dataset version) ---
+@st.cache_resource(ttl=3600)
+def load_period_comparison(version, _data):
+    """MoM / YoY / rolling comparison cube for the dataset, shared across sessions."""
+    return build_period_comparison(_data)
+
+def _format_pct(value):
+    return "N/A" if np.isnan(value) else f"{value:+.1f}%"
+
+def _format_delta(value):
+    return None if np.isnan(value) else f"{value:+,.0f}"
+
+# --- Period Comparison Section ---
+def period_comparison_section(comparison, start_date, end_date, date_range_str):
+    """KPI cards for the last month of the range and a specialty x month heatmap."""
+    st.subheader(f"So sánh theo kỳ (tháng {end_date.strftime('%b %Y')})")
+
+    totals = comparison_totals(comparison, end_date)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("So với tháng trước", _format_pct(totals['mom_pct']), delta=_format_delta(totals['mom_abs']))
+    with col2:
+        st.metric("So với cùng kỳ năm trước", _format_pct(totals['yoy_pct']), delta=_format_delta(totals['yoy_abs']))
+    with col3:
+        roll3 = totals['roll3']
+        st.metric("Tổng 3 tháng gần nhất", "N/A" if np.isnan(roll3) else f"{roll3:,.0f}",
+                  delta=None if np.isnan(totals['roll3_pct']) else _format_pct(totals['roll3_pct']))
+    with col4:
+        roll12 = totals['roll12']
+        st.metric("Tổng 12 tháng gần nhất", "N/A" if np.isnan(roll12) else f"{roll12:,.0f}",
+                  delta=None if np.isnan(totals['roll12_pct']) else _format_pct(totals['roll12_pct']))
+
+    col_metric, col_column = st.columns(2)
+    with col_metric:
+        metric_options = [m for m in COMPARISON_METRICS if m != 'value']
+        check_widget_value('overview_heatmap_metric_page1', metric_options)
+        metric = st.selectbox(
+            'Chỉ số hiển thị trên bản đồ nhiệt:',
+            metric_options,
+            format_func=COMPARISON_METRICS.get,
+            index=metric_options.index('yoy_pct'),
+            key='overview_heatmap_metric_page1'
+        )
+    with col_column:
+        check_widget_value('overview_heatmap_column_page1', comparison['columns'])
+        column = st.selectbox(
+            'Kênh:',
+            comparison['columns'][::-1],
+            format_func=lambda c: 'Tổng lượt đăng ký' if c == 'Grand Total' else c,
+            key='overview_heatmap_column_page1'
+        )
+
+    heatmap_df = comparison_frame(comparison, metric, column, start_date, end_date)
+    # Keep specialties with registrations in the range, busiest first
+    range_totals = comparison_frame(comparison, 'value', column, start_date, end_date).sum()
+    specialty_order = range_totals[range_totals > 0].sort_values(ascending=False).index
+    heatmap_df = heatmap_df[specialty_order].T
+
+    if heatmap_df.empty:
+        st.info("Không có dữ liệu để hiển thị bản đồ nhiệt trong khoảng thời gian đã chọn.")
+        return
+
+    is_pct = metric.endswith('_pct')
+    is_change = is_pct or metric.endswith('_abs')  # Diverging scale centred on 0 for changes
+    fig_heatmap = go.Figure(data=go.Heatmap(
+        z=heatmap_df.values,
+        x=heatmap_df.columns,
+        y=heatmap_df.index,
+        colorscale='RdYlGn' if is_change else 'Blues',
+        zmid=0 if is_change else None,
+        hoverongaps=False,
+        hovertemplate='%{y}<br>%{x|%b %Y}: %{z:,.1f}' + ('%' if is_pct else '') + '<extra></extra>'
+    ))
+    fig_heatmap.update_layout(
+        title=f'{COMPARISON_METRICS[metric]} ({date_range_str})',
+        height=max(400, 22 * len(heatmap_df.index)),
+        template=TEMPLATE,
+        xaxis=dict(tickformat="%b %Y", showgrid=False, tickangle=-45),
+        yaxis=dict(autorange="reversed", showgrid=False, ticksuffix='  '),
+        plot_bgcolor='white',
+        margin=dict(l=10, r=10, t=50, b=50, pad=5)
+    )
+    st.plotly_chart(fig_heatmap, use_container_width=True)
 
 # --- Analysis Function (Revised for Date Range and Pivoted Data) ---
-def overview_analysis(data, start_date, end_date):
-    """Perform overview analysis for the selected date range using pivoted data."""
+def overview_analysis(data, start_date, end_date, rank_index=None, comparison=None):
+    """Perform overview analysis for the selected date range using pivoted data.
+
+    When `rank_index` (see umc_index.build_rank_index) is given, specialty rankings
+    are answered from its prefix sums instead of a group-by over the filtered data.
+    `comparison` (see umc_compare.build_period_comparison) enables the period comparison section.
+    """
 
     # Filter data based on the selected date range (using Month index level)
     mask = (data.index.get_level_values('Month') >= start_date) & \
@@ -74,42 +169,54 @@ def overview_analysis(data, start_date, end_date):
 
     # Metric 4: Top Specialty
     with col4:
-        # Sum 'Grand Total' per specialty *within the filtered date range*
-        specialty_totals_selected = data_filtered.groupby(level='Chuyên khoa')['Grand Total'].sum()
-        if not specialty_totals_selected.empty and total_registrations_selected > 0:
-            top_specialty = specialty_totals_selected.idxmax()
-            top_specialty_total_selected = specialty_totals_selected.max()
+        # Top specialty by 'Grand Total' *within the filtered date range*
+        if rank_index is not None:
+            top_specialty_selected = top_specialties(rank_index, start_date, end_date, n=1)
+        else:
+            top_specialty_selected = data_filtered.groupby(level='Chuyên khoa')['Grand Total'].sum().nlargest(1)
+        if not top_specialty_selected.empty and total_registrations_selected > 0:
+            top_specialty = top_specialty_selected.index[0]
+            top_specialty_total_selected = top_specialty_selected.iloc[0]
             top_specialty_pct_selected = (top_specialty_total_selected / total_registrations_selected) * 100
             st.metric(f"Chuyên khoa hàng đầu", top_specialty, f"{top_specialty_pct_selected:.1f}%")
         else:
             st.metric(f"Chuyên khoa hàng đầu", "N/A", "0.0%")
 
-    # --- Monthly Trend Chart ---
-    st.subheader("Xu hướng đăng ký theo tháng")
+    # --- Registration Trend Chart ---
+    channels_in_data = [ch for ch in EXPECTED_CHANNELS if ch in data_filtered.columns]
+    trend_columns = channels_in_data + (['Grand Total'] if 'Grand Total' in data_filtered.columns else [])
 
-    # Aggregate data by month for plotting
-    monthly_agg = data_filtered.groupby(level='Month').sum()
+    # Coarser resolution for long ranges keeps the figure payload bounded
+    col_res, _ = st.columns([1, 3])
+    with col_res:
+        resolution = resolution_selector(start_date, end_date, len(trend_columns), key='overview_resolution_page1')
+    period_label = RESOLUTION_LABELS[resolution]
+    st.subheader(f"Xu hướng đăng ký theo {period_label.lower()}")
 
-    # Ensure all months in the selected range are present
-    full_month_range = pd.date_range(start=start_date, end=end_date, freq='MS')
-    monthly_agg = monthly_agg.reindex(full_month_range, fill_value=0)
+    if rank_index is not None:
+        period_agg = period_column_totals(rank_index, start_date, end_date, resolution, trend_columns)
+    else:
+        # Aggregate data by month, ensure all months in the selected range are present
+        monthly_agg = data_filtered.groupby(level='Month')[trend_columns].sum()
+        full_month_range = pd.date_range(start=start_date, end=end_date, freq='MS')
+        monthly_agg = monthly_agg.reindex(full_month_range, fill_value=0)
+        period_agg = resample_to_resolution(monthly_agg, resolution)
 
     # Plot
     fig_trend = go.Figure()
 
-    channels_in_data = [ch for ch in EXPECTED_CHANNELS if ch in monthly_agg.columns]
     for i, channel in enumerate(channels_in_data):
         fig_trend.add_trace(go.Bar(
-            x=monthly_agg.index,
-            y=monthly_agg[channel],
+            x=period_agg.index,
+            y=period_agg[channel],
             name=channel,
             marker_color=GA_COLOR_SEQUENCE[i % len(GA_COLOR_SEQUENCE)]
         ))
 
-    if 'Grand Total' in monthly_agg.columns:
-        fig_trend.add_trace(go.Scatter(
-            x=monthly_agg.index,
-            y=monthly_agg['Grand Total'],
+    if 'Grand Total' in period_agg.columns:
+        fig_trend.add_trace(scatter_class(len(period_agg), len(trend_columns))(
+            x=period_agg.index,
+            y=period_agg['Grand Total'],
             mode='lines+markers',
             name='Tổng lượt đăng ký',
             line=dict(width=3, color='dimgray'),
@@ -117,55 +224,93 @@ def overview_analysis(data, start_date, end_date):
         ))
 
     fig_trend.update_layout(
-        title=f'Xu hướng đăng ký theo tháng ({date_range_str})',
-        xaxis_title='Tháng',
+        title=f'Xu hướng đăng ký theo {period_label.lower()} ({date_range_str})',
+        xaxis_title=period_label,
         yaxis_title='Lượt đăng ký',
         barmode='stack',
         height=500,
         template=TEMPLATE,
         legend=dict(orientation="h", yanchor="bottom", y=-0.25, xanchor="center", x=0.5),
         yaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke'),
-        xaxis=dict(
-            tickformat="%b %Y",
-            showgrid=False,
-            dtick="M1",
-            tickangle=-45
-            ),
+        xaxis=time_axis(resolution),
         plot_bgcolor='white'
     )
     st.plotly_chart(fig_trend, use_container_width=True)
 
-    # --- Top 10 Specialties Chart ---
-    st.subheader(f"Top 10 chuyên khoa ({date_range_str})")
+    # --- Period Comparison (MoM / YoY / Rolling) ---
+    if comparison is not None:
+        period_comparison_section(comparison, start_date, end_date, date_range_str)
+
+    # --- Top N Specialties Chart ---
+    rank_columns = ['Grand Total'] + [ch for ch in EXPECTED_CHANNELS if ch in data_filtered.columns]
+    col_rank1, col_rank2 = st.columns([1, 3])
+    with col_rank1:
+        check_widget_value('overview_rank_column_page1', rank_columns)
+        rank_column = st.selectbox(
+            'Xếp hạng theo:',
+            rank_columns,
+            format_func=lambda c: 'Tổng lượt đăng ký' if c == 'Grand Total' else c,
+            key='overview_rank_column_page1'
+        )
+
+    if rank_index is not None:
+        specialty_count = ranked_specialty_count(rank_index, start_date, end_date, rank_column)
+    else:
+        specialty_totals_selected = data_filtered.groupby(level='Chuyên khoa')[rank_column].sum()
+        specialty_totals_selected = specialty_totals_selected[specialty_totals_selected > 0]
+        specialty_count = len(specialty_totals_selected)
+
+    if specialty_count == 0:
+        st.info("Không có dữ liệu đăng ký chuyên khoa trong khoảng thời gian đã chọn.")
+        return
 
-    if not specialty_totals_selected.empty:
-        top10_specialties = specialty_totals_selected.nlargest(10)
+    with col_rank2:
+        if specialty_count > 1:
+            check_widget_value('overview_top_n_page1', min_value=1, max_value=specialty_count)
+            top_n = st.slider(
+                'Số chuyên khoa hiển thị:',
+                min_value=1,
+                max_value=specialty_count,
+                value=min(10, specialty_count),
+                key='overview_top_n_page1'
+            )
+        else:
+            top_n = 1
+
+    rank_label = 'Tổng lượt đăng ký' if rank_column == 'Grand Total' else f"Lượt đăng ký qua {rank_column}"
+    st.subheader(f"Top {top_n} chuyên khoa ({date_range_str})")
+
+    if rank_index is not None:
+        top_n_specialties = top_specialties(rank_index, start_date, end_date, n=top_n, column=rank_column)
+    else:
+        top_n_specialties = specialty_totals_selected.nlargest(top_n)
 
-        fig_top10 = px.bar(
-            x=top10_specialties.values,
-            y=top10_specialties.index,
+    if not top_n_specialties.empty:
+        fig_top_n = px.bar(
+            x=top_n_specialties.values,
+            y=top_n_specialties.index,
             orientation='h',
-            labels={'x': 'Tổng lượt đăng ký', 'y': 'Chuyên khoa'},
-            text=top10_specialties.values
+            labels={'x': rank_label, 'y': 'Chuyên khoa'},
+            text=top_n_specialties.values
         )
-        fig_top10.update_traces(
+        fig_top_n.update_traces(
              marker_color=GA_COLOR_SEQUENCE[0],
              texttemplate='%{text:,.0f}',
              textposition='outside'
         )
-        fig_top10.update_layout(
-            title=f'Top 10 chuyên khoa theo lượt đăng ký ({date_range_str})',
-            height=500,
+        fig_top_n.update_layout(
+            title=f'Top {top_n} chuyên khoa theo {rank_label.lower()} ({date_range_str})',
+            height=max(500, 28 * top_n),
             yaxis=dict(autorange="reversed", showgrid=False, ticksuffix='  '),
             xaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke'),
-            xaxis_title='Tổng lượt đăng ký',
+            xaxis_title=rank_label,
             yaxis_title=None,
             template=TEMPLATE,
             bargap=0.3,
             plot_bgcolor='white',
             margin=dict(l=10, r=10, t=50, b=50, pad=5)
         )
-        st.plotly_chart(fig_top10, use_container_width=True)
+        st.plotly_chart(fig_top_n, use_container_width=True)
     else:
         st.info("Không có dữ liệu đăng ký chuyên khoa trong khoảng thời gian đã chọn.")
 
@@ -173,11 +318,14 @@ def overview_analysis(data, start_date, end_date):
 # --- Load data and run analysis ---
 if 'umc_data' in st.session_state and st.session_state['umc_data'] is not None:
     data_loaded = st.session_state['umc_data']
+    rank_index = st.session_state.get('umc_rank_index')
+    data_version = st.session_state.get('umc_data_version')
     start_date = st.session_state.get('start_date')
     end_date = st.session_state.get('end_date')
 
     if start_date and end_date:
-         overview_analysis(data_loaded, start_date, end_date)
+         comparison = load_period_comparison(data_version, data_loaded) if data_version else None
+         overview_analysis(data_loaded, start_date, end_date, rank_index, comparison)
     else:
          st.warning("Vui lòng chọn khoảng thời gian phân tích ở thanh bên trái.")
 else:
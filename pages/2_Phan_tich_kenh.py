@@ -4,6 +4,9 @@ import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
+from umc_index import period_column_totals
+from umc_charts import resolution_selector, resample_to_resolution, time_axis, scatter_class, RESOLUTION_LABELS
+from umc_session import restore_session, check_widget_value
 
 # --- Configuration ---
 GA_COLOR_SEQUENCE = px.colors.qualitative.Plotly
@@ -12,9 +15,10 @@ EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
 
 st.set_page_config(page_title="Phân tích kênh", layout="wide")
 st.title("📈 Phân tích kênh đăng ký")
+restore_session()
 
 # --- Analysis Function ---
-def channel_analysis(data, start_date, end_date):
+def channel_analysis(data, start_date, end_date, rank_index=None):
     """Analyze registration channels for the selected date range using pivoted data."""
 
     # Filter data based on the selected date range
@@ -46,6 +50,7 @@ def channel_analysis(data, start_date, end_date):
              [f'Tổng hợp ({date_range_str})', 'Từng tháng'],
             key='channel_period_select_page2' # Unique key
         )
+        check_widget_value('channel_select_filter_page2', channels_in_data, multi=True)
         selected_channels_filter = st.multiselect(
             'Lọc kênh hiển thị:',
             channels_in_data,
@@ -57,6 +62,19 @@ def channel_analysis(data, start_date, end_date):
         st.warning("Vui lòng chọn ít nhất một kênh để hiển thị.")
         return
 
+    with col1:
+        resolution = resolution_selector(start_date, end_date, len(selected_channels_filter), key='channel_resolution_page2')
+    period_label = RESOLUTION_LABELS[resolution]
+
+    # Per-period channel totals, shared by the breakdown and trend charts
+    if rank_index is not None:
+        period_agg = period_column_totals(rank_index, start_date, end_date, resolution, selected_channels_filter)
+    else:
+        monthly_agg = data_filtered.groupby(level='Month')[selected_channels_filter].sum()
+        full_month_range = pd.date_range(start=start_date, end=end_date, freq='MS')
+        monthly_agg = monthly_agg.reindex(full_month_range, fill_value=0)
+        period_agg = resample_to_resolution(monthly_agg, resolution)
+
     # --- Distribution Chart ---
     if analysis_period == f'Tổng hợp ({date_range_str})':
         st.subheader(f"Phân bố kênh tổng hợp ({date_range_str})")
@@ -89,24 +107,17 @@ def channel_analysis(data, start_date, end_date):
                 st.info(f"Không có lượt đăng ký cho các kênh đã chọn trong khoảng thời gian này.")
 
     else: # analysis_period == 'Từng tháng':
-        st.subheader("Lượt đăng ký theo kênh và tháng")
-        # Aggregate filtered data by month for the selected channels
-        monthly_agg = data_filtered.groupby(level='Month')[selected_channels_filter].sum()
-        # Reindex to ensure all months in the selection are present
-        full_month_range = pd.date_range(start=start_date, end=end_date, freq='MS')
-        monthly_agg = monthly_agg.reindex(full_month_range, fill_value=0)
-
-        fig_monthly_dist = px.bar(monthly_agg, x=monthly_agg.index, y=selected_channels_filter,
-                                 # title="Lượt đăng ký theo kênh và tháng", # Title in subheader
+        st.subheader(f"Lượt đăng ký theo kênh và {period_label.lower()}")
+        fig_monthly_dist = px.bar(period_agg, x=period_agg.index, y=selected_channels_filter,
                                  template=TEMPLATE,
                                  color_discrete_sequence=GA_COLOR_SEQUENCE)
         fig_monthly_dist.update_layout(
             barmode='stack',
-            xaxis_title='Tháng',
+            xaxis_title=period_label,
             yaxis_title='Lượt đăng ký',
             height=450,
             yaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke'),
-            xaxis=dict(tickformat="%b %Y", showgrid=False, dtick="M1", tickangle=-45),
+            xaxis=time_axis(resolution),
             legend_title_text='Kênh',
             legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5),
             plot_bgcolor='white'
@@ -118,17 +129,12 @@ def channel_analysis(data, start_date, end_date):
     # --- Channel Trend Chart ---
     st.subheader("Xu hướng kênh đăng ký theo thời gian")
 
-    # Aggregate filtered data by month for the selected channels again for clarity
-    monthly_agg_trend = data_filtered.groupby(level='Month')[selected_channels_filter].sum()
-    # Reindex
-    full_month_range_trend = pd.date_range(start=start_date, end=end_date, freq='MS')
-    monthly_agg_trend = monthly_agg_trend.reindex(full_month_range_trend, fill_value=0)
-
+    trace_class = scatter_class(len(period_agg), len(selected_channels_filter))
     fig_trend = go.Figure()
     for i, channel in enumerate(selected_channels_filter):
-        fig_trend.add_trace(go.Scatter(
-            x=monthly_agg_trend.index,
-            y=monthly_agg_trend[channel],
+        fig_trend.add_trace(trace_class(
+            x=period_agg.index,
+            y=period_agg[channel],
             mode='lines+markers',
             name=channel,
             line=dict(color=GA_COLOR_SEQUENCE[i % len(GA_COLOR_SEQUENCE)]),
@@ -137,12 +143,12 @@ def channel_analysis(data, start_date, end_date):
 
     fig_trend.update_layout(
         # title='Xu hướng kênh đăng ký theo tháng', # Title in subheader
-        xaxis_title='Tháng',
+        xaxis_title=period_label,
         yaxis_title='Lượt đăng ký',
         height=400,
         template=TEMPLATE,
         yaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke'),
-        xaxis=dict(tickformat="%b %Y", showgrid=False, dtick="M1", tickangle=-45),
+        xaxis=time_axis(resolution),
         legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5),
         hovermode='x unified',
         plot_bgcolor='white'
@@ -152,11 +158,12 @@ def channel_analysis(data, start_date, end_date):
 # --- Load data and run analysis ---
 if 'umc_data' in st.session_state and st.session_state['umc_data'] is not None:
     data_loaded = st.session_state['umc_data']
+    rank_index = st.session_state.get('umc_rank_index')
     start_date = st.session_state.get('start_date')
     end_date = st.session_state.get('end_date')
 
     if start_date and end_date:
-         channel_analysis(data_loaded, start_date, end_date)
+         channel_analysis(data_loaded, start_date, end_date, rank_index)
     else:
          st.warning("Vui lòng chọn khoảng thời gian phân tích ở thanh bên trái.")
 else:
@@ -1,20 +1,59 @@
 # pages/3_So_Sanh_Chuyen_Khoa.py
+import threading
+from collections import OrderedDict
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from datetime import datetime
+from umc_index import top_specialties, period_specialty_totals
+from umc_charts import resolution_selector, resample_to_resolution, time_axis, scatter_class, RESOLUTION_LABELS
+from umc_similarity import build_similarity_index, similar_specialties, suggest_comparison_set, cluster_table, profile_projection
+from umc_session import restore_session, check_widget_value
+from umc_versions import load_version_manifest
 
 # --- Configuration ---
 GA_COLOR_SEQUENCE = px.colors.qualitative.Plotly
 TEMPLATE = "plotly_white"
 EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+# More specialties than this are compared as lines instead of grouped bars
+MAX_GROUPED_BAR_SPECIALTIES = 6
+MAX_SIMILARITY_INDEXES = 4  # Dataset versions whose similarity index stays in memory
 
 st.set_page_config(page_title="So sánh chuyên khoa", layout="wide")
 st.title("🔬 So sánh chuyên khoa")
+restore_session()
+
+# --- Shared Similarity Indexes (one per dataset version, shared across sessions) ---
+@st.cache_resource
+def _similarity_indexes():
+    """Process-wide {version: similarity index}, least recently used first."""
+    return OrderedDict(), threading.Lock()
+
+def load_similarity_index(version, rank_index):
+    """Clusters and nearest neighbours of the specialty profiles for `version`, built once per process.
+
+    A new version starts from its parent version's index (else the most recent one in memory), which
+    is returned as is when the profiles are identical and otherwise warm-starts k-means.
+    """
+    registry, lock = _similarity_indexes()
+    with lock:
+        index = registry.get(version)
+        if index is None:
+            parent = next((entry['parent'] for entry in load_version_manifest() if entry['version'] == version), None)
+            previous = registry.get(parent)
+            if previous is None and registry:
+                previous = next(reversed(registry.values()))
+            index = build_similarity_index(rank_index, previous=previous)
+            registry[version] = index
+            while len(registry) > MAX_SIMILARITY_INDEXES:
+                registry.popitem(last=False)
+        else:
+            registry.move_to_end(version)
+    return index
 
 # --- Analysis Function ---
-def specialty_comparison(data, start_date, end_date):
+def specialty_comparison(data, start_date, end_date, rank_index=None, similarity_index=None):
     """Compare specialties for the selected date range using pivoted data."""
 
     # Filter data based on the selected date range
@@ -29,19 +68,42 @@ def specialty_comparison(data, start_date, end_date):
         st.warning(f"Không có dữ liệu trong khoảng thời gian đã chọn ({date_range_str}).")
         return
 
-    # Calculate total for selected period for default sorting
-    specialty_totals_selected = data_filtered.groupby(level='Chuyên khoa')['Grand Total'].sum()
+    specialty_options = sorted(data_filtered.index.get_level_values('Chuyên khoa').unique().tolist())
+
+    # Suggested comparison set: top 5 by total, or the specialties whose profile is closest to one anchor
+    anchor_specialty = None
+    if similarity_index is not None and len(similarity_index['specialties']) > 1:
+        col_mode, col_anchor = st.columns([1, 2])
+        with col_mode:
+            suggest_modes = ['Top 5 theo tổng lượt', 'Tương tự một chuyên khoa']
+            check_widget_value('specialty_suggest_mode_page3', suggest_modes)
+            suggest_mode = st.radio(
+                'Gợi ý chuyên khoa:',
+                suggest_modes,
+                horizontal=True,
+                key='specialty_suggest_mode_page3'
+            )
+        if suggest_mode == 'Tương tự một chuyên khoa':
+            anchor_options = [spec for spec in similarity_index['specialties'] if spec in specialty_options]
+            with col_anchor:
+                check_widget_value('specialty_anchor_page3', anchor_options)
+                anchor_specialty = st.selectbox('Chuyên khoa gốc:', anchor_options, key='specialty_anchor_page3') if anchor_options else None
 
-    # Get default specialties based on calculated total
-    default_specialties = specialty_totals_selected.nlargest(5).index.tolist() if not specialty_totals_selected.empty else []
+    if anchor_specialty is not None:
+        default_specialties = [spec for spec in suggest_comparison_set(similarity_index, anchor_specialty, n=5) if spec in specialty_options]
+    elif rank_index is not None:
+        default_specialties = top_specialties(rank_index, start_date, end_date, n=5).index.tolist()
+    else:
+        specialty_totals_selected = data_filtered.groupby(level='Chuyên khoa')['Grand Total'].sum()
+        default_specialties = specialty_totals_selected.nlargest(5).index.tolist() if not specialty_totals_selected.empty else []
 
-    # Select specialties to compare
-    specialty_options = sorted(data_filtered.index.get_level_values('Chuyên khoa').unique().tolist())
+    # Select specialties to compare (a new anchor resets the selection to its suggested set)
+    check_widget_value('specialty_select_compare_page3', specialty_options, multi=True)
     selected_specialties = st.multiselect(
         f'Chọn chuyên khoa để so sánh (Kỳ: {date_range_str}):',
         options=specialty_options,
         default=default_specialties,
-        key='specialty_select_compare_page3'
+        key='specialty_select_compare_page3' if anchor_specialty is None else f'specialty_select_compare_page3_{specialty_options.index(anchor_specialty)}'
     )
 
     if not selected_specialties:
@@ -51,39 +113,58 @@ def specialty_comparison(data, start_date, end_date):
     # Filter data further for selected specialties
     filtered_spec_data = data_filtered[data_filtered.index.get_level_values('Chuyên khoa').isin(selected_specialties)]
 
-    # --- Comparison chart by Month ---
-    st.subheader("So sánh lượt đăng ký theo chuyên khoa và tháng")
+    # --- Comparison chart by period (month / quarter / year) ---
+    resolution = resolution_selector(start_date, end_date, len(selected_specialties), key='specialty_resolution_page3')
+    period_label = RESOLUTION_LABELS[resolution]
+    st.subheader(f"So sánh lượt đăng ký theo chuyên khoa và {period_label.lower()}")
 
-    # Aggregate by month for the selected specialties
-    # Unstack 'Chuyên khoa' level to make it columns for plotting
-    monthly_spec_agg = filtered_spec_data.groupby(level=['Month', 'Chuyên khoa'])['Grand Total'].sum().unstack(level='Chuyên khoa', fill_value=0)
+    if rank_index is not None:
+        monthly_spec_agg = period_specialty_totals(rank_index, start_date, end_date, selected_specialties, resolution)
+    else:
+        # Aggregate by month for the selected specialties
+        # Unstack 'Chuyên khoa' level to make it columns for plotting
+        monthly_spec_agg = filtered_spec_data.groupby(level=['Month', 'Chuyên khoa'])['Grand Total'].sum().unstack(level='Chuyên khoa', fill_value=0)
 
-    # Ensure all months in the range are present
-    full_month_range = pd.date_range(start=start_date, end=end_date, freq='MS')
-    monthly_spec_agg = monthly_spec_agg.reindex(full_month_range, fill_value=0)
+        # Ensure all months in the range are present
+        full_month_range = pd.date_range(start=start_date, end=end_date, freq='MS')
+        monthly_spec_agg = monthly_spec_agg.reindex(full_month_range, fill_value=0)
+        monthly_spec_agg = resample_to_resolution(monthly_spec_agg, resolution)
 
     if monthly_spec_agg.empty:
         st.warning("Không tìm thấy dữ liệu 'Grand Total' theo tháng cho các chuyên khoa đã chọn.")
     else:
+        plotted_specialties = [spec for spec in selected_specialties if spec in monthly_spec_agg.columns]
+        as_lines = len(plotted_specialties) > MAX_GROUPED_BAR_SPECIALTIES
+        trace_class = scatter_class(len(monthly_spec_agg), len(plotted_specialties))
         fig_month_compare = go.Figure()
-        for i, spec in enumerate(selected_specialties):
-            if spec in monthly_spec_agg.columns:
-                 fig_month_compare.add_trace(go.Bar(
-                     x=monthly_spec_agg.index,
-                     y=monthly_spec_agg[spec],
-                     name=spec,
-                     marker_color=GA_COLOR_SEQUENCE[i % len(GA_COLOR_SEQUENCE)]
-                 ))
+        for i, spec in enumerate(plotted_specialties):
+            color = GA_COLOR_SEQUENCE[i % len(GA_COLOR_SEQUENCE)]
+            if as_lines:
+                fig_month_compare.add_trace(trace_class(
+                    x=monthly_spec_agg.index,
+                    y=monthly_spec_agg[spec],
+                    mode='lines+markers',
+                    name=spec,
+                    line=dict(color=color),
+                    marker=dict(size=5)
+                ))
+            else:
+                fig_month_compare.add_trace(go.Bar(
+                    x=monthly_spec_agg.index,
+                    y=monthly_spec_agg[spec],
+                    name=spec,
+                    marker_color=color
+                ))
 
         fig_month_compare.update_layout(
             # title=f'So sánh tổng lượt đăng ký theo chuyên khoa và tháng ({date_range_str})', # In subheader
-            xaxis_title='Tháng',
+            xaxis_title=period_label,
             yaxis_title='Lượt đăng ký',
             barmode='group',
             height=500,
             template=TEMPLATE,
             yaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke'),
-            xaxis=dict(tickformat="%b %Y", showgrid=False, dtick="M1", tickangle=-45),
+            xaxis=time_axis(resolution),
             legend_title_text='Chuyên khoa',
             plot_bgcolor='white',
             legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5)
@@ -126,16 +207,62 @@ def specialty_comparison(data, start_date, end_date):
         )
         st.plotly_chart(fig_channel_dist, use_container_width=True)
 
+    if similarity_index is not None and len(similarity_index['specialties']) > 1:
+        specialty_similarity_section(similarity_index, anchor_specialty)
+
+# --- Similarity Section ---
+def specialty_similarity_section(similarity_index, anchor_specialty=None):
+    """Clusters of specialties with similar demand shape and channel mix (last months of data)."""
+    profile_months = similarity_index['months']
+    st.subheader(f"Nhóm chuyên khoa có hồ sơ tương tự ({profile_months[0].strftime('%b %Y')} - {profile_months[-1].strftime('%b %Y')})")
+    st.caption("Hồ sơ gồm xu hướng lượt đăng ký theo tháng (chuẩn hóa theo quy mô) và tỷ lệ các kênh; không phụ thuộc khoảng thời gian đang chọn.")
+
+    if anchor_specialty is not None:
+        nearest = similar_specialties(similarity_index, anchor_specialty, n=10)
+        st.markdown(f"**Chuyên khoa gần nhất với {anchor_specialty}**")
+        st.dataframe(nearest.round(3).to_frame())
+
+    projection = profile_projection(similarity_index)
+    clusters = cluster_table(similarity_index)
+    projection = projection.join(clusters[['Nhóm', 'Tổng lượt']])
+    projection['Nhóm'] = projection['Nhóm'].astype(str)
+    fig_clusters = px.scatter(
+        projection.reset_index(),
+        x='x', y='y',
+        color='Nhóm',
+        size='Tổng lượt',
+        hover_name='Chuyên khoa',
+        color_discrete_sequence=GA_COLOR_SEQUENCE,
+        category_orders={'Nhóm': sorted(projection['Nhóm'].unique(), key=int)}
+    )
+    fig_clusters.update_layout(
+        xaxis_title='Thành phần chính 1',
+        yaxis_title='Thành phần chính 2',
+        height=500,
+        template=TEMPLATE,
+        legend_title_text='Nhóm',
+        plot_bgcolor='white'
+    )
+    st.plotly_chart(fig_clusters, use_container_width=True)
+
+    with st.expander("Bảng nhóm chuyên khoa"):
+        st.dataframe(clusters.round(1))
+
 
 # --- Load data and run analysis ---
 if 'umc_data' in st.session_state and st.session_state['umc_data'] is not None:
     data_loaded = st.session_state['umc_data']
+    rank_index = st.session_state.get('umc_rank_index')
     start_date = st.session_state.get('start_date')
     end_date = st.session_state.get('end_date')
 
+    similarity_index = None
+    if rank_index is not None:
+        similarity_index = load_similarity_index(st.session_state.get('umc_data_version'), rank_index)
+
     if start_date and end_date:
          # Pass the original loaded data (DataFrame) to the function
-         specialty_comparison(data_loaded, start_date, end_date)
+         specialty_comparison(data_loaded, start_date, end_date, rank_index, similarity_index)
     else:
          st.warning("Vui lòng chọn khoảng thời gian phân tích ở thanh bên trái.")
 else:
@@ -2,12 +2,14 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from umc_session import restore_session, check_widget_value
 
 # --- Configuration ---
 EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care', 'Grand Total']
 
 st.set_page_config(page_title="Dữ liệu chi tiết", layout="wide")
 st.title("📄 Dữ liệu chi tiết")
+restore_session()
 
 # --- Display Function ---
 def data_details(data, start_date, end_date):
@@ -34,9 +36,11 @@ def data_details(data, start_date, end_date):
     available_specialties = sorted(data_filtered_main['Chuyên khoa'].unique())
 
     # --- Filtering Options ---
+    filter_options = [f"Dữ liệu tổng hợp ({date_range_str})", "Lọc theo tháng cụ thể", "Lọc theo kênh cụ thể", "Lọc theo chuyên khoa cụ thể"]
+    check_widget_value('data_filter_option_page4', filter_options)
     filter_option = st.radio(
         "Chọn cách xem dữ liệu:",
-        [f"Dữ liệu tổng hợp ({date_range_str})", "Lọc theo tháng cụ thể", "Lọc theo kênh cụ thể", "Lọc theo chuyên khoa cụ thể"],
+        filter_options,
         key='data_filter_option_page4',
         horizontal=True
     )
@@ -56,6 +60,7 @@ def data_details(data, start_date, end_date):
              st.warning("Không có tháng nào trong khoảng thời gian đã chọn.")
              return
 
+        check_widget_value('data_month_select_page4', month_labels)
         month_selection_str = st.selectbox(
             "Chọn tháng cụ thể để xem:",
             options=month_labels,
@@ -74,6 +79,7 @@ def data_details(data, start_date, end_date):
              st.warning("Không tìm thấy kênh nào có dữ liệu trong khoảng thời gian đã chọn.")
              return
 
+        check_widget_value('data_channel_select_page4', available_channels)
         channel_selection = st.selectbox(
             "Chọn kênh đăng ký để xem dữ liệu theo tháng:",
             options=available_channels,
@@ -92,6 +98,7 @@ def data_details(data, start_date, end_date):
              st.warning("Không tìm thấy chuyên khoa nào trong khoảng thời gian đã chọn.")
              return
 
+        check_widget_value('data_specialty_select_page4', available_specialties)
         specialty_selection = st.selectbox(
             "Chọn chuyên khoa để xem dữ liệu theo tháng:",
             options=available_specialties,
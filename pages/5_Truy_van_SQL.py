@@ -0,0 +1,71 @@
+# pages/5_Truy_van_SQL.py
+import streamlit as st
+from umc_sql import duckdb, build_duckdb_store, run_query, ANALYSIS_QUERIES, SCHEMA_DESCRIPTION, MAX_RESULT_ROWS
+from umc_session import restore_session
+
+st.set_page_config(page_title="Truy vấn SQL", layout="wide")
+st.title("🧮 Truy vấn dữ liệu bằng SQL")
+restore_session()
+
+# --- Cached Store (one per dataset version, shared across sessions) ---
+@st.cache_resource(ttl=3600)
+def load_duckdb_store(version, _data):
+    """DuckDB copy of the pivoted dataset for ad-hoc queries."""
+    return build_duckdb_store(_data)
+
+# --- Query Page ---
+def sql_query_page(con, start_date, end_date):
+    """Ad-hoc SQL over the dataset, with the dashboard analyses as parameterized presets."""
+    date_range_str = f"{start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')}"
+    st.header(f"Truy vấn tùy chỉnh ({date_range_str})")
+
+    with st.expander("Cấu trúc dữ liệu"):
+        st.code(SCHEMA_DESCRIPTION, language='text')
+
+    preset = st.selectbox(
+        'Mẫu truy vấn:',
+        list(ANALYSIS_QUERIES),
+        key='sql_preset_page5'
+    )
+    sql = st.text_area(
+        'Câu lệnh SQL ($start, $end lấy theo khoảng thời gian đang chọn):',
+        value=ANALYSIS_QUERIES[preset],
+        height=220,
+        key=f'sql_text_page5_{list(ANALYSIS_QUERIES).index(preset)}'
+    )
+
+    if not st.button("Chạy truy vấn", key='sql_run_page5'):
+        return
+
+    try:
+        result_df, truncated = run_query(con, sql, start_date, end_date)
+    except Exception as e:
+        st.error(f"Lỗi truy vấn: {e}")
+        return
+
+    if truncated:
+        st.warning(f"Kết quả có hơn {MAX_RESULT_ROWS:,} dòng; chỉ hiển thị {MAX_RESULT_ROWS:,} dòng đầu tiên.")
+    st.dataframe(result_df)
+    st.download_button(
+        "Tải kết quả (CSV)",
+        result_df.to_csv(index=False).encode('utf-8-sig'),
+        file_name="ket_qua_truy_van.csv",
+        mime="text/csv",
+        key='sql_download_page5'
+    )
+
+# --- Load data and run ---
+if duckdb is None:
+    st.warning("Trang này cần gói `duckdb`. Cài đặt bằng `pip install duckdb` rồi khởi động lại ứng dụng.")
+elif 'umc_data' in st.session_state and st.session_state['umc_data'] is not None:
+    data_loaded = st.session_state['umc_data']
+    data_version = st.session_state.get('umc_data_version')
+    start_date = st.session_state.get('start_date')
+    end_date = st.session_state.get('end_date')
+
+    if start_date and end_date:
+         sql_query_page(load_duckdb_store(data_version, data_loaded), start_date, end_date)
+    else:
+         st.warning("Vui lòng chọn khoảng thời gian phân tích ở thanh bên trái.")
+else:
+    st.warning("Vui lòng tải lên file dữ liệu ở trang chính để truy vấn.")
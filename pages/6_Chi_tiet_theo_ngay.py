@@ -0,0 +1,101 @@
+# pages/6_Chi_Tiet_Theo_Ngay.py
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.express as px
+from umc_daily import load_daily_totals, load_daily_rows
+from umc_session import restore_session, check_widget_value
+
+# --- Configuration ---
+GA_COLOR_SEQUENCE = px.colors.qualitative.Plotly
+TEMPLATE = "plotly_white"
+EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+
+st.set_page_config(page_title="Chi tiết theo ngày", layout="wide")
+st.title("📅 Chi tiết theo ngày")
+restore_session()
+
+# --- Cached Readers (the store is immutable per export, so its path is a safe key) ---
+@st.cache_data(ttl=3600)
+def cached_daily_totals(store_path, month):
+    return load_daily_totals(store_path, month)
+
+@st.cache_data(ttl=3600)
+def cached_daily_rows(store_path, month, specialties):
+    return load_daily_rows(store_path, month, list(specialties))
+
+# --- Drill-down Function ---
+def daily_drilldown(store_path, start_date, end_date):
+    """Daily registrations for one month of the selected range, read on demand from the daily store."""
+    months = pd.date_range(start=start_date, end=end_date, freq='MS')
+    if months.empty:
+        st.warning("Không có tháng nào trong khoảng thời gian đã chọn.")
+        return
+
+    month_labels = [m.strftime('%b %Y') for m in months]
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        check_widget_value('daily_month_select_page6', month_labels)
+        month_label = st.selectbox(
+            "Chọn tháng:",
+            month_labels[::-1],
+            key='daily_month_select_page6'
+        )
+    selected_month = months[month_labels.index(month_label)]
+
+    # --- Daily totals (precomputed at ingestion) ---
+    st.subheader(f"Lượt đăng ký theo ngày - {month_label}")
+    daily_totals = cached_daily_totals(store_path, selected_month)
+    if daily_totals.empty:
+        st.info("Không có dữ liệu theo ngày cho tháng này.")
+        return
+
+    fig_daily = go.Figure()
+    for i, channel in enumerate(ch for ch in EXPECTED_CHANNELS if ch in daily_totals.columns):
+        fig_daily.add_trace(go.Bar(
+            x=daily_totals.index,
+            y=daily_totals[channel],
+            name=channel,
+            marker_color=GA_COLOR_SEQUENCE[i % len(GA_COLOR_SEQUENCE)]
+        ))
+    fig_daily.update_layout(
+        xaxis_title='Ngày',
+        yaxis_title='Lượt đăng ký',
+        barmode='stack',
+        height=450,
+        template=TEMPLATE,
+        yaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke'),
+        xaxis=dict(tickformat="%d/%m", showgrid=False, dtick=86400000.0, tickangle=-45),
+        legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5),
+        plot_bgcolor='white'
+    )
+    st.plotly_chart(fig_daily, use_container_width=True)
+
+    # --- Per-specialty rows (reads only this month's partition) ---
+    st.subheader("Dữ liệu chi tiết theo chuyên khoa")
+    data_loaded = st.session_state['umc_data']
+    month_specialties = sorted(data_loaded.loc[selected_month].index.unique()) if selected_month in data_loaded.index.get_level_values('Month') else []
+    check_widget_value('daily_specialty_select_page6', month_specialties, multi=True)
+    selected_specialties = st.multiselect(
+        "Lọc chuyên khoa (để trống để xem tất cả):",
+        month_specialties,
+        key='daily_specialty_select_page6'
+    )
+    daily_rows = cached_daily_rows(store_path, selected_month, tuple(selected_specialties))
+    daily_rows = daily_rows.assign(**{'Ngày': pd.to_datetime(daily_rows['Ngày']).dt.strftime('%Y-%m-%d')})
+    st.dataframe(daily_rows, hide_index=True)
+
+# --- Load data and run ---
+if 'umc_data' in st.session_state and st.session_state['umc_data'] is not None:
+    daily_store = st.session_state.get('umc_daily_store')
+    start_date = st.session_state.get('start_date')
+    end_date = st.session_state.get('end_date')
+
+    if not daily_store:
+         st.info("Dữ liệu hiện tại là dữ liệu theo tháng. Tải lên file dữ liệu theo ngày (CSV/Parquet) ở trang chính để xem chi tiết theo ngày.")
+    elif start_date and end_date:
+         daily_drilldown(daily_store, start_date, end_date)
+    else:
+         st.warning("Vui lòng chọn khoảng thời gian phân tích ở thanh bên trái.")
+else:
+    st.warning("Vui lòng tải lên file dữ liệu ở trang chính để xem chi tiết theo ngày.")
@@ -0,0 +1,174 @@
+# pages/7_Mo_Phong_Kenh.py
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+import plotly.express as px
+from umc_simulator import build_channel_cube, slice_months, sample_shift_fractions, shift_matrices, evaluate_scenarios
+from umc_session import restore_session, check_widget_value
+
+# --- Configuration ---
+GA_COLOR_SEQUENCE = px.colors.qualitative.Plotly
+TEMPLATE = "plotly_white"
+MAX_SCENARIOS = 1000
+
+st.set_page_config(page_title="Mô phỏng kênh", layout="wide")
+st.title("🔀 Mô phỏng chuyển dịch kênh đăng ký")
+restore_session()
+
+# --- Cached Cube (one per dataset version, shared across sessions) ---
+@st.cache_resource(ttl=3600)
+def load_channel_cube(version, _data):
+    """Month x specialty x channel cube used by every scenario evaluation."""
+    return build_channel_cube(_data)
+
+# --- Simulator Function ---
+def channel_simulator(channel_cube, start_date, end_date):
+    """What-if: move a share of one channel to another, per specialty, across many scenarios at once."""
+    date_range_str = f"{start_date.strftime('%b %Y')} - {end_date.strftime('%b %Y')}"
+    st.header(f"Kịch bản chuyển dịch kênh ({date_range_str})")
+
+    period_cube = slice_months(channel_cube, start_date, end_date)
+    cube, channels, specialties = period_cube['cube'], period_cube['channels'], period_cube['specialties']
+    if cube.shape[0] == 0 or len(channels) < 2:
+        st.warning(f"Không đủ dữ liệu kênh trong khoảng thời gian đã chọn ({date_range_str}).")
+        return
+
+    # --- Controls ---
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        check_widget_value('sim_source_page7', channels)
+        source = st.selectbox('Chuyển từ kênh:', channels, index=0, key='sim_source_page7')
+        target_options = [ch for ch in channels if ch != source]
+        check_widget_value('sim_target_page7', target_options)
+        target = st.selectbox('Sang kênh:', target_options, index=len(channels) - 2, key='sim_target_page7')
+    with col2:
+        check_widget_value('sim_pct_page7', min_value=0, max_value=100)
+        base_pct = st.slider('Tỷ lệ chuyển (%)', 0, 100, 20, key='sim_pct_page7')
+        check_widget_value('sim_spread_page7', min_value=0, max_value=100)
+        spread_pct = st.slider('Biên độ bất định (± %)', 0, 100, 25, key='sim_spread_page7',
+                               help="Mỗi kịch bản nhân tỷ lệ chuyển của từng chuyên khoa với một hệ số ngẫu nhiên riêng trong khoảng này.")
+    with col3:
+        check_widget_value('sim_n_page7', min_value=50, max_value=MAX_SCENARIOS)
+        n_scenarios = st.slider('Số kịch bản', 50, MAX_SCENARIOS, 500, step=50, key='sim_n_page7')
+        check_widget_value('sim_specialties_page7', specialties, multi=True)
+        applied_specialties = st.multiselect(
+            'Áp dụng cho chuyên khoa (để trống = tất cả):',
+            specialties.tolist(),
+            key='sim_specialties_page7'
+        )
+
+    with st.expander("Tùy chỉnh tỷ lệ chuyển theo từng chuyên khoa"):
+        default_pct = np.where(specialties.isin(applied_specialties) | (len(applied_specialties) == 0), base_pct, 0)
+        overrides = st.data_editor(
+            pd.DataFrame({'Chuyên khoa': specialties, 'Tỷ lệ chuyển (%)': default_pct.astype(float)}),
+            column_config={'Tỷ lệ chuyển (%)': st.column_config.NumberColumn(min_value=0.0, max_value=100.0, step=1.0)},
+            disabled=['Chuyên khoa'],
+            hide_index=True,
+            key=f'sim_overrides_page7_{base_pct}_{hash(tuple(applied_specialties))}'  # Reset edits when the defaults change
+        )
+    base_fractions = overrides['Tỷ lệ chuyển (%)'].fillna(0).to_numpy() / 100
+
+    # --- Vectorized evaluation of all scenarios ---
+    src, tgt = channels.index(source), channels.index(target)
+    fractions = sample_shift_fractions(base_fractions, n_scenarios, spread=spread_pct / 100)
+    results = evaluate_scenarios(cube, shift_matrices(fractions, len(channels), src, tgt))
+    channel_totals = results['monthly'].sum(axis=1)  # (K, C)
+    baseline_totals = cube.sum(axis=(0, 1))
+    grand_total = baseline_totals.sum()
+
+    # --- Result metrics ---
+    target_share = channel_totals[:, tgt] / grand_total * 100 if grand_total > 0 else np.zeros(n_scenarios)
+    baseline_share = baseline_totals[tgt] / grand_total * 100 if grand_total > 0 else 0.0
+    p10, p50, p90 = np.percentile(target_share, [10, 50, 90])
+    m1, m2, m3 = st.columns(3)
+    with m1:
+        st.metric(f"Tỷ lệ {target} hiện tại", f"{baseline_share:.1f}%")
+    with m2:
+        st.metric(f"Tỷ lệ {target} (trung vị kịch bản)", f"{p50:.1f}%", delta=f"{p50 - baseline_share:+.1f} điểm %")
+    with m3:
+        st.metric("Khoảng P10 - P90", f"{p10:.1f}% - {p90:.1f}%")
+
+    # --- Distribution of the target channel's share ---
+    col_left, col_right = st.columns(2)
+    with col_left:
+        st.subheader(f"Phân bố tỷ lệ {target} qua {n_scenarios} kịch bản")
+        fig_hist = go.Figure(go.Histogram(x=target_share, nbinsx=40, marker_color=GA_COLOR_SEQUENCE[0]))
+        fig_hist.add_vline(x=baseline_share, line_dash='dash', line_color='dimgray', annotation_text='Hiện tại')
+        fig_hist.update_layout(
+            xaxis_title=f'Tỷ lệ {target} (%)',
+            yaxis_title='Số kịch bản',
+            height=400,
+            template=TEMPLATE,
+            bargap=0.05,
+            plot_bgcolor='white'
+        )
+        st.plotly_chart(fig_hist, use_container_width=True)
+
+    # --- Channel mix: baseline vs median scenario (P10-P90 error bars) ---
+    with col_right:
+        st.subheader("Cơ cấu kênh: hiện tại và kịch bản")
+        low, median, high = np.percentile(channel_totals, [10, 50, 90], axis=0)
+        fig_mix = go.Figure()
+        fig_mix.add_trace(go.Bar(x=channels, y=baseline_totals, name='Hiện tại', marker_color='lightgray'))
+        fig_mix.add_trace(go.Bar(
+            x=channels, y=median, name='Kịch bản (trung vị)', marker_color=GA_COLOR_SEQUENCE[1],
+            error_y=dict(type='data', symmetric=False, array=high - median, arrayminus=median - low)
+        ))
+        fig_mix.update_layout(
+            yaxis_title='Tổng lượt đăng ký',
+            barmode='group',
+            height=400,
+            template=TEMPLATE,
+            yaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke'),
+            legend=dict(orientation="h", yanchor="bottom", y=-0.25, xanchor="center", x=0.5),
+            plot_bgcolor='white'
+        )
+        st.plotly_chart(fig_mix, use_container_width=True)
+
+    # --- Monthly trend of the target channel with scenario band ---
+    st.subheader(f"Xu hướng {target} theo tháng")
+    months = period_cube['months']
+    monthly_target = results['monthly'][:, :, tgt]  # (K, M)
+    band_low, band_mid, band_high = np.percentile(monthly_target, [10, 50, 90], axis=0)
+    fig_trend = go.Figure()
+    fig_trend.add_trace(go.Scatter(x=months, y=band_high, mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+    fig_trend.add_trace(go.Scatter(x=months, y=band_low, mode='lines', line=dict(width=0), fill='tonexty',
+                                   fillcolor='rgba(99, 110, 250, 0.2)', name='P10 - P90'))
+    fig_trend.add_trace(go.Scatter(x=months, y=band_mid, mode='lines+markers', name='Kịch bản (trung vị)',
+                                   line=dict(color=GA_COLOR_SEQUENCE[0])))
+    fig_trend.add_trace(go.Scatter(x=months, y=cube[:, :, tgt].sum(axis=1), mode='lines+markers', name='Hiện tại',
+                                   line=dict(color='dimgray', dash='dash')))
+    fig_trend.update_layout(
+        xaxis_title='Tháng',
+        yaxis_title='Lượt đăng ký',
+        height=400,
+        template=TEMPLATE,
+        yaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke'),
+        xaxis=dict(tickformat="%b %Y", showgrid=False, tickangle=-45),
+        legend=dict(orientation="h", yanchor="bottom", y=-0.3, xanchor="center", x=0.5),
+        hovermode='x unified',
+        plot_bgcolor='white'
+    )
+    st.plotly_chart(fig_trend, use_container_width=True)
+
+    # --- Per-specialty result (median scenario) ---
+    st.subheader("Kết quả theo chuyên khoa (kịch bản trung vị)")
+    specialty_median = np.median(results['specialty'], axis=0)  # (S, C)
+    specialty_df = pd.DataFrame(specialty_median.round(0).astype(int), index=specialties, columns=channels)
+    specialty_df[f'Thay đổi {target}'] = specialty_df[target] - cube[:, :, tgt].sum(axis=0).round(0).astype(int)
+    st.dataframe(specialty_df.sort_values(f'Thay đổi {target}', ascending=False))
+
+# --- Load data and run ---
+if 'umc_data' in st.session_state and st.session_state['umc_data'] is not None:
+    data_loaded = st.session_state['umc_data']
+    data_version = st.session_state.get('umc_data_version')
+    start_date = st.session_state.get('start_date')
+    end_date = st.session_state.get('end_date')
+
+    if start_date and end_date:
+         channel_simulator(load_channel_cube(data_version, data_loaded), start_date, end_date)
+    else:
+         st.warning("Vui lòng chọn khoảng thời gian phân tích ở thanh bên trái.")
+else:
+    st.warning("Vui lòng tải lên file dữ liệu ở trang chính để chạy mô phỏng.")
@@ -0,0 +1,67 @@
+# pages/8_Bao_Cao.py
+import os
+import streamlit as st
+import streamlit.components.v1 as components
+from umc_reports import load_manifest, REPORT_DIR, REPORT_VIEWS, REPORT_RANGES
+from umc_session import restore_session, check_widget_value
+
+st.set_page_config(page_title="Báo cáo", layout="wide")
+st.title("🗂️ Báo cáo định kỳ")
+restore_session()
+
+# --- Cached Files (rendered offline by umc_reports.py; the mtime key picks up re-renders) ---
+@st.cache_data(ttl=3600, max_entries=32)
+def read_report_file(path, mtime):
+    with open(path, 'rb') as f:
+        return f.read()
+
+# --- Report Page ---
+def report_browser(manifest):
+    """Pre-rendered views for the standard ranges, served as files (no analysis runs here)."""
+    st.caption(f"Dữ liệu đến tháng {manifest['latest_month']} · tạo lúc {manifest['generated'].replace('T', ' ')}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        check_widget_value('report_range_page8', REPORT_RANGES)
+        range_name = st.selectbox('Khoảng thời gian:', list(REPORT_RANGES), format_func=REPORT_RANGES.get, key='report_range_page8')
+    with col2:
+        check_widget_value('report_view_page8', REPORT_VIEWS)
+        view_name = st.selectbox('Trang:', list(REPORT_VIEWS), format_func=lambda v: REPORT_VIEWS[v][0], key='report_view_page8')
+
+    entry = next((r for r in manifest['reports'] if r['view'] == view_name and r['range'] == range_name), None)
+    if entry is None:
+        st.info("Chưa có báo cáo này. Chạy `python umc_reports.py` để tạo.")
+        return
+
+    version_dir = os.path.join(REPORT_DIR, manifest['version'])
+    download_cols = st.columns(len(entry['files']))
+    for col, (fmt, file_name) in zip(download_cols, entry['files'].items()):
+        path = os.path.join(version_dir, file_name)
+        if not os.path.exists(path):
+            continue
+        with col:
+            st.download_button(
+                f"Tải {fmt.upper()}",
+                read_report_file(path, os.path.getmtime(path)),
+                file_name=file_name,
+                mime='text/html' if fmt == 'html' else 'application/pdf',
+                key=f'report_download_{fmt}_page8'
+            )
+
+    html_path = os.path.join(version_dir, entry['files']['html'])
+    if os.path.exists(html_path):
+        st.subheader(entry['title'])
+        components.html(read_report_file(html_path, os.path.getmtime(html_path)).decode('utf-8'), height=1200, scrolling=True)
+
+# --- Load reports and run ---
+data_version = st.session_state.get('umc_data_version')
+manifest = load_manifest(version=data_version) if data_version else None
+if manifest is None:
+    manifest = load_manifest()
+    if manifest is not None and data_version:
+        st.warning("Báo cáo hiện có được tạo từ một phiên bản dữ liệu khác với dữ liệu đang tải.")
+
+if manifest is not None:
+    report_browser(manifest)
+else:
+    st.info("Chưa có báo cáo nào. Chạy `python umc_reports.py` (ví dụ theo lịch vào ngày 1 hằng tháng) để tạo báo cáo.")
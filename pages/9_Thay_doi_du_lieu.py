@@ -0,0 +1,145 @@
+# pages/9_Thay_Doi_Du_Lieu.py
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.express as px
+from umc_versions import load_version_manifest, load_version, diff_versions, diff_summary
+from umc_session import restore_session, check_widget_value
+
+# --- Configuration ---
+GA_COLOR_SEQUENCE = px.colors.qualitative.Plotly
+TEMPLATE = "plotly_white"
+MAX_HEATMAP_SPECIALTIES = 40
+
+st.set_page_config(page_title="Thay đổi dữ liệu", layout="wide")
+st.title("📝 Thay đổi giữa các phiên bản dữ liệu")
+restore_session()
+
+# --- Cached Diff (stored versions are immutable, so their ids are safe keys) ---
+@st.cache_data(ttl=3600, max_entries=16)
+def cached_diff(old_version, new_version):
+    old, new = load_version(old_version), load_version(new_version)
+    if old is None or new is None:
+        return None
+    return diff_versions(old, new)
+
+def _version_label(entry):
+    saved = pd.Timestamp(entry['saved']).strftime('%d/%m/%Y %H:%M')
+    return f"{saved} · {entry['source']} · {entry['version']}"
+
+# --- Changes Page ---
+def version_changes(manifest, current_version=None):
+    """Cell-level changes between two stored versions of the dataset (default: current vs. its previous copy)."""
+    entries = {entry['version']: entry for entry in manifest}
+    versions = [entry['version'] for entry in reversed(manifest)]  # Newest first
+
+    new_default = current_version if current_version in entries else versions[0]
+    # The parent may already be pruned from the store: fall back to the next older stored version
+    old_default = entries[new_default]['parent']
+    if old_default not in entries:
+        older = versions[versions.index(new_default) + 1:]
+        old_default = older[0] if older else next((v for v in versions if v != new_default), new_default)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        check_widget_value('versions_old_page9', versions)
+        old_version = st.selectbox('Phiên bản cũ:', versions, index=versions.index(old_default),
+                                   format_func=lambda v: _version_label(entries[v]), key='versions_old_page9')
+    with col2:
+        check_widget_value('versions_new_page9', versions)
+        new_version = st.selectbox('Phiên bản mới:', versions, index=versions.index(new_default),
+                                   format_func=lambda v: _version_label(entries[v]), key='versions_new_page9')
+
+    if old_version == new_version:
+        st.info("Chọn hai phiên bản khác nhau để so sánh.")
+        return
+
+    diff = cached_diff(old_version, new_version)
+    if diff is None:
+        st.warning("Không còn lưu một trong hai phiên bản đã chọn.")
+        return
+    if diff.empty:
+        st.success("Hai phiên bản giống hệt nhau ở mọi ô (tháng, chuyên khoa, kênh).")
+        return
+
+    # --- Summary ---
+    summary = diff_summary(diff)
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        st.metric("Ô thay đổi", f"{len(diff):,}")
+    with m2:
+        st.metric("Tháng bị ảnh hưởng", f"{len(summary)}")
+    with m3:
+        st.metric("Chuyên khoa bị ảnh hưởng", f"{diff['Chuyên khoa'].nunique()}")
+    with m4:
+        st.metric("Chênh lệch ròng", f"{diff['Chênh lệch'].sum():+,}")
+
+    # --- Net change per month ---
+    st.subheader("Chênh lệch theo tháng")
+    fig_months = go.Figure(go.Bar(
+        x=summary.index,
+        y=summary['Chênh lệch ròng'],
+        marker_color=[GA_COLOR_SEQUENCE[2] if v >= 0 else GA_COLOR_SEQUENCE[1] for v in summary['Chênh lệch ròng']],
+        customdata=summary[['Ô thay đổi', 'Chuyên khoa']].to_numpy(),
+        hovertemplate='%{x|%b %Y}<br>Chênh lệch: %{y:+,}<br>Ô thay đổi: %{customdata[0]}<br>Chuyên khoa: %{customdata[1]}<extra></extra>'
+    ))
+    fig_months.update_layout(
+        xaxis_title='Tháng',
+        yaxis_title='Chênh lệch lượt đăng ký',
+        height=400,
+        template=TEMPLATE,
+        yaxis=dict(showgrid=True, gridwidth=1, gridcolor='whitesmoke', zeroline=True, zerolinecolor='lightgray'),
+        xaxis=dict(tickformat="%b %Y", showgrid=False, tickangle=-45),
+        plot_bgcolor='white'
+    )
+    st.plotly_chart(fig_months, use_container_width=True)
+
+    # --- Where the changes are: month x specialty ---
+    st.subheader("Chênh lệch theo tháng và chuyên khoa")
+    net_by_cell = diff.groupby(['Chuyên khoa', 'Month'])['Chênh lệch'].sum().unstack('Month', fill_value=0)
+    most_changed = net_by_cell.abs().sum(axis=1).nlargest(MAX_HEATMAP_SPECIALTIES).index
+    if len(net_by_cell) > MAX_HEATMAP_SPECIALTIES:
+        st.caption(f"Hiển thị {MAX_HEATMAP_SPECIALTIES} chuyên khoa thay đổi nhiều nhất.")
+    net_by_cell = net_by_cell.loc[most_changed]
+    fig_cells = go.Figure(go.Heatmap(
+        z=net_by_cell.to_numpy(),
+        x=net_by_cell.columns,
+        y=net_by_cell.index,
+        colorscale='RdBu',
+        zmid=0,
+        hovertemplate='%{y}<br>%{x|%b %Y}<br>Chênh lệch: %{z:+,}<extra></extra>'
+    ))
+    fig_cells.update_layout(
+        height=max(300, 22 * len(net_by_cell) + 120),
+        template=TEMPLATE,
+        xaxis=dict(tickformat="%b %Y", tickangle=-45),
+        yaxis=dict(autorange='reversed'),
+        plot_bgcolor='white'
+    )
+    st.plotly_chart(fig_cells, use_container_width=True)
+
+    # --- Changed cells ---
+    st.subheader("Chi tiết các ô thay đổi")
+    month_labels = [m.strftime('%b %Y') for m in summary.index]
+    selected_labels = st.multiselect("Lọc theo tháng (để trống để xem tất cả):", month_labels, key='versions_month_filter_page9')
+    details = diff
+    if selected_labels:
+        details = diff[diff['Month'].isin(summary.index[[month_labels.index(label) for label in selected_labels]])]
+    details = details.assign(Month=details['Month'].dt.strftime('%Y-%m'))
+    st.dataframe(details, hide_index=True)
+    st.download_button(
+        "Tải danh sách thay đổi (CSV)",
+        details.to_csv(index=False).encode('utf-8-sig'),
+        file_name=f"thay_doi_{old_version}_{new_version}.csv",
+        mime="text/csv",
+        key='versions_download_page9'
+    )
+
+# --- Load versions and run ---
+version_manifest = load_version_manifest()
+if len(version_manifest) >= 2:
+    version_changes(version_manifest, st.session_state.get('umc_data_version'))
+elif version_manifest:
+    st.info("Mới có một phiên bản dữ liệu được lưu. Khi file dữ liệu được gửi lại, các thay đổi sẽ hiển thị ở đây.")
+else:
+    st.warning("Chưa có phiên bản dữ liệu nào được lưu. Vui lòng tải dữ liệu ở trang chính.")
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('fastapi')
+pytest.importorskip('httpx')
+from fastapi.testclient import TestClient
+
+import umc_api
+
+SPECIALTIES = [f'Chuyên khoa {i:02d}' for i in range(30)]
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """API over a three-month workbook written to a temporary folder."""
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / 'data.xlsx'
+    with pd.ExcelWriter(path) as writer:
+        for month_no, sheet in enumerate(['Jan-24', 'Feb-24', 'Mar-24'], start=1):
+            pd.DataFrame({
+                'Chuyên khoa': SPECIALTIES,
+                'Bàn Khám': [month_no * 10 + i for i in range(len(SPECIALTIES))],
+                'PKH': [i % 3 for i in range(len(SPECIALTIES))],
+                'Tổng đài': [1] * len(SPECIALTIES),
+                'UMC Care': [month_no] * len(SPECIALTIES),
+            }).to_excel(writer, sheet_name=sheet, index=False)
+    monkeypatch.setattr(umc_api, 'DATA_FILE', str(path))
+    umc_api._load_dataset.cache_clear()
+    yield TestClient(umc_api.app)
+    umc_api._load_dataset.cache_clear()
+
+def test_totals_by_month(client):
+    response = client.get('/api/v1/totals/month', params={'start': '2024-02', 'end': '2024-03'})
+    assert response.status_code == 200
+    rows = response.json()['rows']
+    assert [row['period'] for row in rows] == ['2024-02', '2024-03']
+    assert rows[0]['UMC Care'] == 2 * len(SPECIALTIES)
+    assert rows[0]['Grand Total'] == sum(rows[0][ch] for ch in ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care'])
+
+def test_totals_for_specialties_are_ints(client):
+    response = client.get('/api/v1/totals/month', params={'specialty': [SPECIALTIES[1], SPECIALTIES[0]]})
+    body = response.json()
+    assert body['specialties'] == SPECIALTIES[:2]
+    assert body['rows'][0]['Bàn Khám'] == 10 + 11
+    assert all(isinstance(value, int) for row in body['rows'] for key, value in row.items() if key != 'period')
+
+def test_unknown_specialty_is_rejected(client):
+    response = client.get('/api/v1/totals/month', params={'specialty': [SPECIALTIES[0], 'Khoa không có']})
+    assert response.status_code == 400
+    assert 'Khoa không có' in response.json()['detail']
+
+@pytest.mark.parametrize('params', [{'start': '2024/01'}, {'start': '2024-03', 'end': '2024-01'}])
+def test_bad_date_range_is_rejected(client, params):
+    assert client.get('/api/v1/totals/channel', params=params).status_code == 400
+
+def test_unknown_column_is_rejected(client):
+    assert client.get('/api/v1/totals/specialty', params={'column': 'Fax'}).status_code == 400
+
+def test_matching_etag_returns_304(client):
+    first = client.get('/api/v1/totals/specialty', params={'top': 3})
+    assert first.status_code == 200
+    etag = first.headers['etag']
+    again = client.get('/api/v1/totals/specialty', params={'top': 3}, headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['etag'] == etag
+    assert client.get('/api/v1/totals/specialty', params={'top': 4}, headers={'If-None-Match': etag}).status_code == 200
+
+def test_large_bodies_are_gzipped(client):
+    response = client.get('/api/v1/records', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert len(response.json()['rows']) == 3 * len(SPECIALTIES)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from umc_compare import ROLLING_WINDOWS, build_period_comparison, comparison_frame, comparison_totals
+
+def _pivoted(rng, months, specialties, drop=()):
+    index = pd.MultiIndex.from_product([months, specialties], names=['Month', 'Chuyên khoa'])
+    data = pd.DataFrame(rng.integers(0, 40, size=(len(index), 1)), index=index, columns=['Grand Total'])
+    return data.drop(index=list(drop))
+
+def _monthly_series(data, spec, months):
+    """Reference series on the full calendar, with missing months as 0."""
+    series = data.xs(spec, level='Chuyên khoa')['Grand Total'].astype(float)
+    return series.reindex(months, fill_value=0.0)
+
+def test_mom_yoy_and_rolling_match_pandas():
+    rng = np.random.default_rng(0)
+    months = pd.date_range('2022-01-01', periods=30, freq='MS')
+    data = _pivoted(rng, months, ['A', 'B'], drop=[(months[4], 'A'), (months[17], 'B')])
+    comparison = build_period_comparison(data)
+
+    for spec in ['A', 'B']:
+        series = _monthly_series(data, spec, months)
+        expected = {
+            'value': series,
+            'mom_abs': series.diff(1),
+            'mom_pct': series.pct_change(1, fill_method=None) * 100,
+            'yoy_abs': series.diff(12),
+            'yoy_pct': series.pct_change(12, fill_method=None) * 100,
+        }
+        for k in ROLLING_WINDOWS:
+            rolling = series.rolling(k).sum()
+            expected[f'roll{k}'] = rolling
+            expected[f'roll{k}_pct'] = rolling.pct_change(k, fill_method=None) * 100
+        for metric, reference in expected.items():
+            reference = reference.replace([np.inf, -np.inf], np.nan)
+            result = comparison_frame(comparison, metric)[spec]
+            np.testing.assert_allclose(result.to_numpy(), reference.to_numpy(), equal_nan=True, err_msg=metric)
+
+def test_totals_cover_all_specialties_and_missing_months():
+    rng = np.random.default_rng(1)
+    months = pd.date_range('2023-01-01', periods=14, freq='MS')
+    data = _pivoted(rng, months.delete(6), ['A', 'B', 'C'])  # One whole calendar month missing
+    comparison = build_period_comparison(data)
+    assert len(comparison['months']) == 14
+
+    total = data.groupby(level='Month')['Grand Total'].sum().reindex(months, fill_value=0)
+    last = comparison_totals(comparison, months[-1])
+    assert last['value'] == total.iloc[-1]
+    assert last['mom_abs'] == total.iloc[-1] - total.iloc[-2]
+    assert last['roll3'] == total.iloc[-3:].sum()
+    assert np.isnan(comparison_totals(comparison, months[7])['yoy_pct'])  # Less than a year of history
+    assert np.isnan(comparison_totals(comparison, months[7])['mom_pct'])  # Growth from a 0 month
+    assert all(np.isnan(v) for v in comparison_totals(comparison, pd.Timestamp('2030-01-01')).values())
@@ -0,0 +1,32 @@
+import pandas as pd
+
+from umc_daily import _parse_dates, ingest_daily_export
+
+def test_iso_dates_first_then_day_first():
+    values = pd.Series(['2024-01-05', '2024-02-03', '05/01/2024', '13/02/2024', 'hôm qua', None])
+    dates = _parse_dates(values)
+    assert list(dates[:4]) == [pd.Timestamp(d) for d in ['2024-01-05', '2024-02-03', '2024-01-05', '2024-02-13']]
+    assert dates[4:].isna().all()
+
+def test_ingest_reports_bad_dates_and_merges_name_variants(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / 'daily.csv'
+    pd.DataFrame({
+        'Ngày': ['2024-01-02', '2024-01-15', '03/01/2024', '', 'x', '2024-02-01', '2024-02-02', '2024-02-02'],
+        'Chuyên khoa': ['Tai mũi họng', 'TAI MUI HONG ', 'Taimũi họng', 'Mắt', 'Mắt', 'Mắt', 'MẮT', 'Tổng cộng'],
+        'Bàn Khám': [1, 2, 'abc', 4, 5, 6, 7, 100],
+        'PKH': [1, 1, 1, 1, 1, 1, 1, 100],
+        'Tổng đài': [0] * 8,
+        'UMC Care': [2] * 8,
+    }).to_csv(path, index=False)
+
+    data, report = ingest_daily_export(str(path), store_dir=str(tmp_path / 'store'), chunk_rows=3)
+    totals = data['Grand Total'].to_dict()
+    assert totals == {
+        (pd.Timestamp('2024-01-01'), 'Tai mũi họng'): (1 + 1 + 2) + (2 + 1 + 2) + (0 + 1 + 2),
+        (pd.Timestamp('2024-02-01'), 'Mắt'): (6 + 1 + 2) + (7 + 1 + 2),
+    }
+    warnings = [text for level, text in report['messages'] if level == 'warning']
+    assert "Bỏ qua 2 dòng có ngày trống hoặc không đọc được (cột 'Ngày')." in warnings
+    assert "Có 1 ô không phải số trong dữ liệu theo ngày; được tính là 0." in warnings
+    assert report['new_aliases'] == {'tai mui hong': 'Tai mũi họng', 'taimui hong': 'Tai mũi họng', 'mat': 'Mắt'}
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from umc_index import build_rank_index, period_column_totals, refresh_rank_index, top_specialties
+
+def _pivoted(totals, months=('2024-01-01', '2024-02-01')):
+    """Pivoted frame with each specialty's total split over `months` (Grand Total only)."""
+    rows = []
+    for spec, total in totals.items():
+        first = total // 2
+        rows += [(pd.Timestamp(months[0]), spec, first), (pd.Timestamp(months[1]), spec, total - first)]
+    frame = pd.DataFrame(rows, columns=['Month', 'Chuyên khoa', 'Grand Total'])
+    return frame.set_index(['Month', 'Chuyên khoa'])
+
+def _expected(data, start, end, n):
+    months = data.index.get_level_values('Month')
+    in_range = data[(months >= start) & (months <= end)]
+    totals = in_range.groupby(level='Chuyên khoa')['Grand Total'].sum()
+    return totals[totals > 0].nlargest(n)
+
+@pytest.mark.parametrize('n', [1, 3, 5, 29, 30, 40])
+def test_ties_at_cutoff_match_nlargest(n):
+    totals = {f's{i:02d}': 5 for i in range(30)}
+    totals['s07'] = 9
+    data = _pivoted(totals)
+    start, end = pd.Timestamp('2024-01-01'), pd.Timestamp('2024-02-01')
+    result = top_specialties(build_rank_index(data), start, end, n=n)
+    expected = _expected(data, start, end, n)
+    assert list(result.index) == list(expected.index)
+    assert list(result) == list(expected)
+
+def test_random_totals_match_nlargest():
+    rng = np.random.default_rng(0)
+    totals = {f's{i:03d}': int(v) for i, v in enumerate(rng.integers(0, 6, size=200))}
+    data = _pivoted(totals)
+    start, end = pd.Timestamp('2024-02-01'), pd.Timestamp('2024-02-01')
+    rank_index = build_rank_index(data)
+    for n in (1, 10, 50, 199):
+        result = top_specialties(rank_index, start, end, n=n)
+        expected = _expected(data, start, end, n)
+        assert list(result.index) == list(expected.index)
+
+def test_period_column_totals_match_groupby():
+    rng = np.random.default_rng(1)
+    months = pd.date_range('2023-01-01', periods=14, freq='MS')
+    index = pd.MultiIndex.from_product([months, ['A', 'B', 'C']], names=['Month', 'Chuyên khoa'])
+    data = pd.DataFrame(rng.integers(0, 50, size=(len(index), 2)), index=index, columns=['PKH', 'Grand Total'])
+    start, end = months[2], months[12]
+    result = period_column_totals(build_rank_index(data), start, end, 'Q')
+
+    months_level = data.index.get_level_values('Month')
+    in_range = data[(months_level >= start) & (months_level <= end)]
+    expected = in_range.groupby(in_range.index.get_level_values('Month').to_period('Q').start_time).sum()
+    assert result.to_numpy().tolist() == expected.to_numpy().tolist()
+    assert list(result.index) == list(expected.index)
+
+def _monthly_frame(rng, months, specialties, drop=()):
+    index = pd.MultiIndex.from_product([months, specialties], names=['Month', 'Chuyên khoa'])
+    data = pd.DataFrame(rng.integers(0, 30, size=(len(index), 2)), index=index, columns=['PKH', 'UMC Care'])
+    data['Grand Total'] = data.sum(axis=1)
+    return data.drop(index=list(drop))
+
+@pytest.mark.parametrize('change', ['modified', 'added', 'removed'])
+def test_refresh_matches_full_build(change):
+    rng = np.random.default_rng(2)
+    months = pd.date_range('2023-01-01', periods=12, freq='MS')
+    old = _monthly_frame(rng, months, ['A', 'B', 'C'], drop=[(months[7], 'B')])
+    new = old.copy()
+    if change == 'modified':
+        new.loc[(months[5], 'C'), ['PKH', 'Grand Total']] += 4
+    elif change == 'added':
+        new.loc[(months[7], 'B'), :] = [3, 2, 5]
+        new = new.sort_index()
+    else:
+        new = new.drop(index=[(months[5], 'A')])
+    changed = [months[7]] if change == 'added' else [months[5]]
+
+    refreshed = refresh_rank_index(build_rank_index(old), new, pd.DatetimeIndex(changed))
+    rebuilt = build_rank_index(new)
+    assert np.array_equal(refreshed['prefix'], rebuilt['prefix'])
+    assert np.array_equal(refreshed['column_prefix'], rebuilt['column_prefix'])
+
+def test_refresh_falls_back_to_full_build_for_new_specialty():
+    rng = np.random.default_rng(3)
+    months = pd.date_range('2024-01-01', periods=4, freq='MS')
+    old = _monthly_frame(rng, months, ['A', 'B'])
+    new = pd.concat([old, _monthly_frame(rng, months[-1:], ['D'])]).sort_index()
+    refreshed = refresh_rank_index(build_rank_index(old), new, pd.DatetimeIndex(months[-1:]))
+    assert list(refreshed['specialties']) == ['A', 'B', 'D']
+    assert np.array_equal(refreshed['prefix'], build_rank_index(new)['prefix'])
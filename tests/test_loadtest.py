@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from umc_loadtest import PAGES, _page_name, cache_table, latency_table
+
+def test_page_names_match_streamlit_navigation():
+    assert _page_name('pages/1_Tong_quan.py') == 'Tong quan'
+    assert _page_name('kham_umccare_st.py') == 'kham umccare st'
+    assert _page_name(PAGES['Dữ liệu chi tiết'][0]) == 'Du lieu chi tiet'
+
+def test_latency_table_percentiles_and_errors():
+    latencies = [('Tổng quan', 'mở', ms, 0) for ms in range(1, 101)] + [('Tổng quan', 'lọc', 50.0, 1)]
+    table = latency_table(latencies)
+    opened = table.loc[('Tổng quan', 'mở')]
+    assert opened['Số lượt'] == 100
+    assert opened['p50'] == 50.5
+    assert opened['max'] == 100
+    assert opened['Lỗi'] == 0
+    assert table.loc[('Tổng quan', 'lọc'), 'Lỗi'] == 1
+
+def test_cache_table_counts_only_the_run():
+    before = {'a.py:load': [10, 2], 'b.py:idle': [5, 1]}
+    after = {'a.py:load': [40, 2], 'b.py:idle': [5, 1], 'c.py:new': [3, 1]}
+    table = cache_table(before, after)
+    assert table.to_dict('index') == {
+        'a.py:load': {'Hit': 30, 'Miss': 0, 'Tỷ lệ hit (%)': 100.0},
+        'c.py:new': {'Hit': 3, 'Miss': 1, 'Tỷ lệ hit (%)': 75.0},
+    }
+
+def test_random_widget_values_stay_within_the_widget():
+    pytest.importorskip('streamlit')
+    from streamlit.proto.Slider_pb2 import Slider
+    from streamlit.proto.MultiSelect_pb2 import MultiSelect
+    from umc_loadtest import _random_widget_state
+
+    rng = random.Random(0)
+    slider = Slider(id='$$ID-x-overview_top_n_page1', min=1, max=20)
+    values = [_random_widget_state('slider', slider, rng).double_array_value.data[0] for _ in range(50)]
+    assert 1 <= min(values) and max(values) <= 20
+    multiselect = MultiSelect(id='$$ID-y-channel_select_filter_page2', options=['PKH', 'UMC Care', 'Tổng đài'])
+    picked = _random_widget_state('multiselect', multiselect, rng).string_array_value.data
+    assert picked and set(picked) <= {'PKH', 'UMC Care', 'Tổng đài'}
+    assert _random_widget_state('button', slider, rng) is None
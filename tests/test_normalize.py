@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from umc_loader import process_umc_workbook
+from umc_normalize import (SPECIALTY_ALIAS_FILE, add_aliases, is_spelling_variant, load_alias_table, resolve_specialty_names,
+                            save_alias_table, specialty_key)
+
+@pytest.mark.parametrize('name, other', [
+    ('Nội thần kinh', 'Ngoại thần kinh'),
+    ('Nội tiêu hóa', 'Ngoại tiêu hóa'),
+    ('Nội tổng quát', 'Ngoại tổng quát'),
+    ('Nội tiết', 'Nhi nội tiết'),
+])
+def test_different_word_is_not_a_spelling_variant(name, other):
+    assert not is_spelling_variant(specialty_key(name), specialty_key(other))
+
+@pytest.mark.parametrize('name, other', [
+    ('Tai mũi họng', 'Taimũi họng'),
+    ('Phục hồi chức năng', 'Phục hồi chức nănng'),
+])
+def test_typo_inside_one_word_is_a_spelling_variant(name, other):
+    assert is_spelling_variant(specialty_key(name), specialty_key(other))
+
+def test_noi_ngoai_pairs_stay_separate_and_are_suggested():
+    names = pd.Series(['Nội thần kinh', 'Nội thần kinh', 'Ngoại thần kinh', 'Nội tiêu hóa', 'Ngoại tiêu hóa'])
+    mapping, aliases, new_aliases, suggestions = resolve_specialty_names(names, {})
+    assert mapping == {name: name for name in names.unique()}
+    assert new_aliases == 4
+    assert {frozenset(pair) for pair in suggestions} == {
+        frozenset(('Nội thần kinh', 'Ngoại thần kinh')),
+        frozenset(('Nội tiêu hóa', 'Ngoại tiêu hóa')),
+    }
+
+def test_noi_ngoai_pair_kept_apart_from_stored_table():
+    _, aliases, _, _ = resolve_specialty_names(pd.Series(['Nội thần kinh']), {})
+    mapping, _, _, suggestions = resolve_specialty_names(pd.Series(['Ngoại thần kinh']), aliases)
+    assert mapping == {'Ngoại thần kinh': 'Ngoại thần kinh'}
+    assert suggestions == [('Ngoại thần kinh', 'Nội thần kinh')]
+
+def test_accent_case_and_typo_variants_merge():
+    names = pd.Series(['Tai mũi họng', 'Tai mũi họng', 'TAI MUI HONG', 'Taimũi họng'])
+    mapping, _, _, suggestions = resolve_specialty_names(names, {})
+    assert set(mapping.values()) == {'Tai mũi họng'}
+    assert suggestions == []
+
+def test_add_aliases_keeps_entries_stored_meanwhile(tmp_path):
+    path = str(tmp_path / 'aliases.json')
+    save_alias_table({'nhi': 'Nhi'}, path)
+    assert add_aliases({'nhi': 'NHI', 'mat': 'Mắt'}, path)
+    assert load_alias_table(path) == {'nhi': 'Nhi', 'mat': 'Mắt'}
+
+def test_workbook_loader_reports_new_aliases_without_writing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / 'data.xlsx'
+    pd.DataFrame({'Chuyên khoa': ['Tai mũi họng', 'TAI MUI HONG', 'Mắt'], 'PKH': [1, 2, 3]}).to_excel(path, sheet_name='Jan-24', index=False)
+    data, report = process_umc_workbook(str(path))
+    assert report['new_aliases'] == {'tai mui hong': 'Tai mũi họng', 'mat': 'Mắt'}
+    assert not (tmp_path / SPECIALTY_ALIAS_FILE).exists()
+    assert sorted(data.index.get_level_values('Chuyên khoa')) == ['Mắt', 'Tai mũi họng']
@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('plotly')
+import umc_reports
+from umc_index import dataset_version
+from umc_versions import record_version
+
+MONTHS = pd.date_range('2020-01-01', '2024-06-01', freq='MS')
+
+def _pivoted(changed_month=None):
+    index = pd.MultiIndex.from_product([MONTHS, ['Mắt', 'Nhi']], names=['Month', 'Chuyên khoa'])
+    data = pd.DataFrame({'PKH': 1, 'UMC Care': 2}, index=index)
+    if changed_month is not None:
+        data.loc[(pd.Timestamp(changed_month), 'Nhi'), 'PKH'] = 50
+    data['Grand Total'] = data['PKH'] + data['UMC Care']
+    return data
+
+@pytest.fixture
+def rendered(tmp_path, monkeypatch):
+    """Views rendered by the batch job, as (page, start month) pairs; the page runs are stubbed out."""
+    calls = []
+    def fake_render(page_path, session, static=False):
+        calls.append((page_path, session['start_date'].strftime('%Y-%m')))
+        return f"<p>{session['umc_data_version']}</p>"
+    monkeypatch.setattr(umc_reports, 'render_view', fake_render)
+    return calls
+
+def _render(data, tmp_path):
+    record = record_version(data, dataset_version(data), 'data.xlsx', store_dir=str(tmp_path / 'versions'))
+    return umc_reports.render_reports(data, str(tmp_path / 'reports'), log=lambda _: None, version_record=record)
+
+@pytest.mark.parametrize('changed_month, rerendered_starts', [
+    ('2021-03-01', set()),                           # Before every range's look-back: all copied
+    ('2022-02-01', {'2024-01'}),                     # Only inside the year-to-date look-back
+    ('2024-06-01', {'2024-06', '2024-04', '2024-01'}),
+])
+def test_only_reports_reached_by_changed_months_are_rendered(tmp_path, rendered, changed_month, rerendered_starts):
+    _render(_pivoted(), tmp_path)
+    assert len(rendered) == len(umc_reports.REPORT_VIEWS) * len(umc_reports.REPORT_RANGES)
+    rendered.clear()
+
+    manifest = _render(_pivoted(changed_month), tmp_path)
+    assert {start for _, start in rendered} == rerendered_starts
+    assert len(rendered) == len(umc_reports.REPORT_VIEWS) * len(rerendered_starts)
+    version_dir = tmp_path / 'reports' / manifest['version']
+    assert all((version_dir / report['files']['html']).exists() for report in manifest['reports'])
+
+def test_existing_reports_are_not_rendered_again(tmp_path, rendered):
+    data = _pivoted()
+    _render(data, tmp_path)
+    rendered.clear()
+    _render(data, tmp_path)
+    assert rendered == []
@@ -0,0 +1,63 @@
+import base64
+import json
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+import umc_session
+from umc_session import check_widget_value, decode_view, encode_view, load_view, save_view
+
+@pytest.fixture
+def state(monkeypatch):
+    """Plain dict standing in for st.session_state."""
+    session_state = {}
+    monkeypatch.setattr(umc_session, 'st', SimpleNamespace(session_state=session_state))
+    return session_state
+
+def _packed(widgets):
+    packed = zlib.compress(json.dumps(widgets).encode('utf-8'))
+    return base64.urlsafe_b64encode(packed).decode('ascii').rstrip('=')
+
+def test_view_round_trips_through_query_params():
+    view = {'v': 'abc123', 'from': '2024-01', 'to': '2024-06',
+            'w': {'overview_top_n_page1': 15, 'channel_select_filter_page2': ['PKH', 'UMC Care'],
+                  'specialty_anchor_page3': 'Tai mũi họng'}}
+    params = encode_view(view)
+    assert set(params) == {'v', 'from', 'to', 'w'}
+    assert decode_view(params) == view
+
+def test_malformed_params_are_ignored():
+    view = decode_view({'v': 'abc', 'from': '2024-1', 'to': 'x', 'w': 'not base64 zlib'})
+    assert view == {'v': 'abc', 'from': None, 'to': None, 'w': {}}
+    widgets = decode_view({'w': _packed({'overview_top_n_page1': 5, 'unknown_key': 1, 'sim_pct_page7': {'a': 1}})})['w']
+    assert widgets == {'overview_top_n_page1': 5}
+
+def test_saved_view_loads_by_id(tmp_path):
+    view = {'v': 'abc', 'from': '2024-01', 'to': '2024-02', 'w': {}}
+    view_id = save_view(view, str(tmp_path))
+    assert save_view(view, str(tmp_path)) == view_id
+    assert load_view(view_id, str(tmp_path)) == view
+    assert load_view('../../etc', str(tmp_path)) is None
+
+@pytest.mark.parametrize('value, kwargs, expected', [
+    ('PKH', {'options': ['PKH', 'UMC Care']}, 'PKH'),
+    ('Fax', {'options': ['PKH', 'UMC Care']}, None),
+    (['PKH'], {'options': ['PKH', 'UMC Care']}, None),
+    (['PKH', 'Fax'], {'options': ['PKH', 'UMC Care'], 'multi': True}, ['PKH']),
+    (['Fax'], {'options': ['PKH', 'UMC Care'], 'multi': True}, None),
+    ('PKH', {'options': ['PKH'], 'multi': True}, None),
+    (500, {'min_value': 1, 'max_value': 53}, 53),
+    (-3, {'min_value': 1, 'max_value': 53}, 1),
+    (10, {'min_value': 1, 'max_value': 53}, 10),
+    ('10', {'min_value': 1, 'max_value': 53}, None),
+    (True, {'min_value': 0, 'max_value': 1}, None),
+])
+def test_check_widget_value_rejects_or_clamps(state, value, kwargs, expected):
+    state['key'] = value
+    check_widget_value('key', **kwargs)
+    assert state.get('key') == expected
+
+def test_check_widget_value_ignores_unset_keys(state):
+    check_widget_value('key', options=['a'])
+    assert state == {}
@@ -0,0 +1,39 @@
+import numpy as np
+
+from umc_simulator import evaluate_scenarios, sample_shift_fractions, shift_matrices
+
+def _loop_reference(cube, fractions, source, target):
+    """Scenario by scenario, cell by cell: move fractions[k, s] of `source` to `target`."""
+    n_months, n_specialties, n_channels = cube.shape
+    monthly = np.zeros((len(fractions), n_months, n_channels))
+    specialty = np.zeros((len(fractions), n_specialties, n_channels))
+    for k in range(len(fractions)):
+        for m in range(n_months):
+            for s in range(n_specialties):
+                row = cube[m, s].copy()
+                moved = row[source] * fractions[k, s]
+                row[source] -= moved
+                row[target] += moved
+                monthly[k, m] += row
+                specialty[k, s] += row
+    return monthly, specialty
+
+def test_scenarios_match_loop_reference():
+    rng = np.random.default_rng(0)
+    cube = rng.integers(0, 50, size=(7, 5, 4)).astype(np.float64)
+    fractions = sample_shift_fractions(rng.uniform(0, 0.5, size=5), n_scenarios=6, spread=0.4, seed=1)
+    result = evaluate_scenarios(cube, shift_matrices(fractions, 4, source=0, target=3))
+
+    monthly, specialty = _loop_reference(cube, fractions, 0, 3)
+    np.testing.assert_allclose(result['monthly'], monthly)
+    np.testing.assert_allclose(result['specialty'], specialty)
+    np.testing.assert_allclose(result['monthly'].sum(axis=2), np.broadcast_to(cube.sum(axis=(1, 2)), (6, 7)))
+
+def test_sampled_fractions_are_independent_and_bounded():
+    base = np.array([0.2, 0.2, 0.9])
+    fractions = sample_shift_fractions(base, n_scenarios=200, spread=0.5, seed=3)
+    assert fractions.shape == (200, 3)
+    assert np.array_equal(fractions[0], base)
+    assert fractions.min() >= 0 and fractions.max() <= 1
+    assert not np.allclose(fractions[1:, 0], fractions[1:, 1])  # Same base, independent draws
+    assert np.array_equal(sample_shift_fractions(base, 5, spread=0.0), np.tile(base, (5, 1)))
@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+
+duckdb = pytest.importorskip('duckdb')
+
+from umc_sql import build_duckdb_store, run_query
+
+@pytest.fixture
+def con():
+    data = pd.DataFrame({
+        'Month': pd.to_datetime(['2024-01-01', '2024-01-01', '2024-02-01']),
+        'Chuyên khoa': ['copy', 'Nội tiết', 'copy'],
+        'Bàn Khám': [1, 2, 3], 'PKH': [0, 1, 0], 'Tổng đài': [0, 0, 1], 'UMC Care': [1, 1, 1],
+        'Grand Total': [2, 4, 5],
+    }).set_index(['Month', 'Chuyên khoa'])
+    return build_duckdb_store(data)
+
+def test_keywords_inside_literals_are_allowed(con):
+    result, truncated = run_query(con, "SELECT SUM(grand_total) AS total FROM registrations WHERE specialty = 'copy';")
+    assert result['total'].tolist() == [7]
+    assert not truncated
+
+def test_parameters_are_bound_only_when_used(con):
+    sql = "WITH r AS (SELECT * FROM registrations WHERE month BETWEEN $start AND $end) SELECT COUNT(*) AS n, '$end' AS label FROM r"
+    result, _ = run_query(con, sql, pd.Timestamp('2024-02-01'), pd.Timestamp('2024-02-01'))
+    assert result.iloc[0].tolist() == [1, '$end']
+
+@pytest.mark.parametrize('sql', [
+    "SELECT 1; SELECT 2",
+    "DELETE FROM registrations",
+    "COPY registrations TO 'out.csv'",
+    "SET threads = 1",
+])
+def test_non_select_statements_are_rejected(con, sql):
+    with pytest.raises(ValueError):
+        run_query(con, sql)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from umc_validate import describe_issues, validate_channel_values
+
+CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+
+def _sheet(name, rows, grand_total=None):
+    frame = pd.DataFrame(rows, columns=['Chuyên khoa'] + CHANNELS)
+    frame['Sheet'] = name
+    if grand_total is not None:
+        frame['Grand Total'] = grand_total
+    return frame
+
+def _issues(details):
+    return {(row['Sheet'], row['Chuyên khoa'], row['Kênh'], row['Vấn đề']) for _, row in details.iterrows()}
+
+def test_clean_sheets_have_no_issues():
+    raw = _sheet('T1', [['Nhi', 1, 2, 3, 4], ['Mắt', 0, 1, 0, 1]], grand_total=[10, 2])
+    numeric, summary, details = validate_channel_values(raw)
+    assert summary.empty and details.empty
+    assert numeric.to_numpy().tolist() == [[1, 2, 3, 4], [0, 1, 0, 1]]
+
+def test_bad_cells_are_flagged_per_sheet():
+    raw = pd.concat([
+        _sheet('T1', [['Nhi', 'abc', 2, 3, 4], ['Mắt', 1, -5, 0, 1]], grand_total=[9, 99]),
+        _sheet('T2', [['Nhi', 1, 2, None, 4], ['Mắt', 1, 1, None, 1]]),
+    ], ignore_index=True)
+    numeric, summary, details = validate_channel_values(raw)
+
+    assert np.isnan(numeric.loc[0, 'Bàn Khám'])
+    assert numeric.loc[1, 'PKH'] == -5
+    assert _issues(details) == {
+        ('T1', 'Nhi', 'Bàn Khám', 'Không phải số'),
+        ('T1', 'Mắt', 'PKH', 'Số âm'),
+        ('T1', 'Mắt', 'Grand Total', 'Lệch Grand Total'),
+        ('T2', '', 'Tổng đài', 'Thiếu kênh'),
+    }
+    assert summary.loc['T1'].to_dict() == {'Không phải số': 1, 'Số âm': 1, 'Bất thường': 0, 'Thiếu kênh': 0, 'Lệch Grand Total': 1}
+    assert summary.loc['T2', 'Thiếu kênh'] == 1
+
+def test_outliers_need_enough_history():
+    counts = [100, 104, 98, 101, 5000]
+    raw = pd.concat([_sheet(f'T{i}', [['Nhi', value, 1, 1, 1], ['Mắt', 3, 1, 1, 1]]) for i, value in enumerate(counts)],
+                    ignore_index=True)
+    _, _, details = validate_channel_values(raw)
+    assert _issues(details) == {('T4', 'Nhi', 'Bàn Khám', 'Bất thường')}
+
+    _, _, short = validate_channel_values(raw[raw['Sheet'].isin(['T0', 'T1', 'T4'])])
+    assert short.empty
+
+def test_description_names_only_issue_types_found():
+    raw = _sheet('T1', [['Nhi', 'x', 1, 1, 1], ['Mắt', 'y', 1, 1, 1]])
+    _, summary, details = validate_channel_values(raw)
+    text = describe_issues(summary, details)
+    assert text == "Phát hiện 2 vấn đề dữ liệu trong 1 sheet (Không phải số: 2). Ô không phải số được tính là 0."
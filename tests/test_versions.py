@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+import umc_versions
+from umc_versions import changed_months, diff_versions, load_version, load_version_manifest, record_version, version_cube
+
+CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+
+def _pivoted(rows):
+    """Pivoted frame from (month, specialty, [four channel counts]) rows."""
+    frame = pd.DataFrame([(pd.Timestamp(month), spec, *counts) for month, spec, counts in rows],
+                         columns=['Month', 'Chuyên khoa'] + CHANNELS)
+    frame['Grand Total'] = frame[CHANNELS].sum(axis=1)
+    return frame.set_index(['Month', 'Chuyên khoa']).sort_index()
+
+OLD_ROWS = [
+    ('2024-01-01', 'Nhi', [1, 2, 3, 4]),
+    ('2024-01-01', 'Nội tiết', [5, 0, 0, 1]),
+    ('2024-02-01', 'Nhi', [2, 2, 2, 2]),
+    ('2024-02-01', 'Nội tiết', [0, 0, 0, 0]),
+    ('2024-03-01', 'Nhi', [7, 1, 0, 0]),
+]
+
+def _expected_diff(old, new):
+    """Cell-by-cell reference: outer join of the two frames on (Month, Chuyên khoa)."""
+    joined = old[CHANNELS].join(new[CHANNELS], how='outer', lsuffix='_old', rsuffix='_new')
+    cells = set()
+    for (month, spec), row in joined.iterrows():
+        in_old, in_new = not row[[f'{ch}_old' for ch in CHANNELS]].isna().all(), not row[[f'{ch}_new' for ch in CHANNELS]].isna().all()
+        for ch in CHANNELS:
+            before, after = (int(row[f'{ch}_old']) if in_old else 0), (int(row[f'{ch}_new']) if in_new else 0)
+            if in_old != in_new or before != after:
+                cells.add((month, spec, ch, before, after))
+    return cells
+
+def _diff_cells(diff):
+    return set(zip(diff['Month'], diff['Chuyên khoa'], diff['Kênh'], diff['Cũ'], diff['Mới']))
+
+def test_version_cube_holds_every_cell():
+    data = _pivoted(OLD_ROWS)
+    vcube = version_cube(data)
+    assert vcube['channels'] == CHANNELS
+    assert vcube['cube'].shape == (3, 2, 4)
+    assert vcube['present'].sum() == len(OLD_ROWS)
+    assert not vcube['present'][2, 1]  # 'Nội tiết' has no March row
+    for month, spec, counts in OLD_ROWS:
+        m, s = vcube['months'].get_loc(pd.Timestamp(month)), vcube['specialties'].get_loc(spec)
+        assert vcube['cube'][m, s].tolist() == counts
+
+def test_diff_reports_modified_added_and_removed_cells():
+    new_rows = [row for row in OLD_ROWS if row[:2] != ('2024-02-01', 'Nội tiết')]  # Removed (all zero)
+    new_rows[0] = ('2024-01-01', 'Nhi', [1, 9, 3, 4])                             # Modified
+    new_rows.append(('2024-04-01', 'Mắt', [0, 1, 0, 0]))                           # Added (new month and specialty)
+    old, new = _pivoted(OLD_ROWS), _pivoted(new_rows)
+    diff = diff_versions(version_cube(old), version_cube(new))
+
+    assert _diff_cells(diff) == _expected_diff(old, new)
+    kinds = diff.groupby('Loại')['Chuyên khoa'].agg(set).to_dict()
+    assert kinds == {'Thay đổi': {'Nhi'}, 'Bị xóa': {'Nội tiết'}, 'Thêm mới': {'Mắt'}}
+    assert (diff['Chênh lệch'] == diff['Mới'] - diff['Cũ']).all()
+    assert list(changed_months(diff)) == [pd.Timestamp(m) for m in ['2024-01-01', '2024-02-01', '2024-04-01']]
+
+def test_identical_versions_have_no_diff():
+    vcube = version_cube(_pivoted(OLD_ROWS))
+    diff = diff_versions(vcube, vcube)
+    assert diff.empty
+    assert len(changed_months(diff)) == 0
+
+def test_record_version_links_parent_and_prunes_old_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(umc_versions, 'MAX_STORED_VERSIONS', 3)
+    versions = []
+    for i in range(5):
+        rows = OLD_ROWS[:-1] + [('2024-03-01', 'Nhi', [7, 1, 0, i])]
+        entry = record_version(_pivoted(rows), f'v{i}', 'data.xlsx', store_dir=tmp_path)
+        versions.append(entry['version'])
+        if i > 0:
+            assert entry['parent'] == f'v{i - 1}'
+            assert entry['changed_months'] == ['2024-03']
+            assert entry['changed_cells'] == 1
+
+    manifest = load_version_manifest(tmp_path)
+    assert [entry['version'] for entry in manifest] == versions[-3:]
+    assert sorted(path.name for path in tmp_path.glob('*.npz')) == [f'{v}.npz' for v in versions[-3:]]
+    assert load_version('v0', tmp_path) is None
+    assert record_version(_pivoted(OLD_ROWS), 'v4', 'data.xlsx', store_dir=tmp_path)['parent'] == 'v3'  # Already stored
+
+def test_record_version_without_stored_parent(tmp_path):
+    record_version(_pivoted(OLD_ROWS), 'a', 'data.xlsx', store_dir=tmp_path)
+    (tmp_path / 'a.npz').unlink()
+    entry = record_version(_pivoted(OLD_ROWS[:2]), 'b', 'data.xlsx', store_dir=tmp_path)
+    assert entry['parent'] is None
+    assert entry['changed_months'] is None
+    other = record_version(_pivoted(OLD_ROWS), 'c', 'khac.xlsx', store_dir=tmp_path)
+    assert other['parent'] is None
+
+def test_stored_cube_round_trips(tmp_path):
+    data = _pivoted(OLD_ROWS)
+    record_version(data, 'a', 'data.xlsx', store_dir=tmp_path)
+    stored, vcube = load_version('a', tmp_path), version_cube(data)
+    assert stored['months'].equals(vcube['months'])
+    assert list(stored['specialties']) == list(vcube['specialties'])
+    assert np.array_equal(stored['cube'], vcube['cube'])
+    assert np.array_equal(stored['present'], vcube['present'])
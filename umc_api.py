@@ -0,0 +1,214 @@
+# umc_api.py
+"""Read-only JSON/HTTP query API over the UMC Care dataset.
+
+Run locally:  uvicorn umc_api:app --port 8000
+Data file:    UMC_DATA_FILE (default "So lieu UMC care.xlsx"); reloaded when its mtime changes.
+
+Dates are passed as YYYY-MM. Responses carry an ETag (dataset version + body hash) and honour
+If-None-Match with 304; bodies above 1 KB are gzip-compressed when the client accepts it.
+"""
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from umc_index import build_rank_index, dataset_version, period_column_totals, period_specialty_totals, range_totals, top_specialties
+from umc_loader import process_umc_workbook
+from umc_reports import REPORT_DIR, load_manifest
+
+# --- Configuration ---
+DATA_FILE = os.environ.get('UMC_DATA_FILE', 'So lieu UMC care.xlsx')
+CACHE_MAX_AGE = 300           # Seconds clients/proxies may reuse a response without revalidating
+MAX_CACHED_RESPONSES = 512    # Per dataset version
+
+app = FastAPI(title="UMC Care API", description="Dữ liệu lượt đăng ký khám UMC Care (chỉ đọc).")
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+# Pre-rendered reports (umc_reports.py) are plain files: /reports/<version>/<view>_<range>.html
+app.mount("/reports", StaticFiles(directory=REPORT_DIR, check_dir=False), name="reports")
+
+# --- Shared Dataset Cache (one load per file revision, shared by all requests) ---
+_load_lock = threading.Lock()
+
+@lru_cache(maxsize=2)
+def _load_dataset(path, mtime):
+    data, report = process_umc_workbook(path)
+    if data is None:
+        errors = [text for level, text in report['messages'] if level == 'error']
+        raise RuntimeError('; '.join(errors) or "Không đọc được dữ liệu.")
+    months = data.index.get_level_values('Month')
+    return {
+        'data': data,
+        'version': dataset_version(data),
+        'rank_index': build_rank_index(data),
+        'min_month': months.min(),
+        'max_month': months.max(),
+        'responses': {},
+        'responses_lock': threading.Lock(),
+    }
+
+def get_dataset():
+    """Current dataset, reloading only when the workbook on disk changes."""
+    try:
+        mtime = os.path.getmtime(DATA_FILE)
+    except OSError:
+        raise HTTPException(status_code=503, detail=f"Không tìm thấy file dữ liệu '{DATA_FILE}'.")
+    with _load_lock:
+        try:
+            return _load_dataset(DATA_FILE, mtime)
+        except RuntimeError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+# --- Helpers ---
+def _json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, pd.Timestamp):
+        return value.strftime('%Y-%m')
+    raise TypeError(f"Không thể chuyển sang JSON: {type(value).__name__}")
+
+def _parse_month(value, default, name):
+    if value is None:
+        return default
+    try:
+        return pd.to_datetime(value, format='%Y-%m')
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Tham số '{name}' phải có dạng YYYY-MM.")
+
+def _date_range(dataset, start, end):
+    start_date = _parse_month(start, dataset['min_month'], 'start')
+    end_date = _parse_month(end, dataset['max_month'], 'end')
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="'end' không thể trước 'start'.")
+    return start_date, end_date
+
+def _respond(request, dataset, key, build):
+    """Serves a cached JSON body for `key`, answering 304 when the client's ETag still matches."""
+    cache = dataset['responses']
+    cached = cache.get(key)
+    if cached is None:
+        body = json.dumps(build(), ensure_ascii=False, default=_json_default).encode('utf-8')
+        etag = f'"{dataset["version"]}-{hashlib.sha1(body).hexdigest()[:16]}"'
+        cached = (body, etag)
+        with dataset['responses_lock']:
+            if len(cache) >= MAX_CACHED_RESPONSES:
+                cache.clear()
+            cache[key] = cached
+    body, etag = cached
+
+    headers = {'ETag': etag, 'Cache-Control': f'public, max-age={CACHE_MAX_AGE}'}
+    client_tags = [tag.strip().removeprefix('W/') for tag in request.headers.get('if-none-match', '').split(',')]
+    if etag in client_tags or '*' in client_tags:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
+
+def _frame_rows(frame, label):
+    """DataFrame indexed by period/specialty -> list of dicts with the index under `label`."""
+    return [dict({label: index}, **row) for index, row in zip(frame.index, frame.to_dict('records'))]
+
+# --- Endpoints ---
+@app.get("/api/v1/dataset")
+def dataset_info(request: Request):
+    """Dataset version, month range, channels and specialties."""
+    dataset = get_dataset()
+    rank_index = dataset['rank_index']
+    return _respond(request, dataset, ('dataset',), lambda: {
+        'version': dataset['version'],
+        'start': dataset['min_month'],
+        'end': dataset['max_month'],
+        'months': len(rank_index['months']),
+        'columns': rank_index['columns'],
+        'specialties': rank_index['specialties'].tolist(),
+    })
+
+@app.get("/api/v1/totals/month")
+def totals_by_month(request: Request, start: str = None, end: str = None,
+                    resolution: str = Query('M', pattern='^[MQY]$'),
+                    specialty: list[str] = Query(None)):
+    """Totals per month (or quarter/year) for every channel and 'Grand Total', optionally for some specialties."""
+    dataset = get_dataset()
+    start_date, end_date = _date_range(dataset, start, end)
+    rank_index = dataset['rank_index']
+    specialties = tuple(sorted(set(specialty))) if specialty else None
+    unknown = [name for name in specialties or () if name not in rank_index['specialties']]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Chuyên khoa không tồn tại: {', '.join(unknown)}. Xem danh sách ở /api/v1/dataset.")
+
+    def build():
+        if specialties is None:
+            frame = period_column_totals(rank_index, start_date, end_date, resolution)
+        else:
+            frame = pd.DataFrame({
+                column: period_specialty_totals(rank_index, start_date, end_date, specialties, resolution, column).sum(axis=1)
+                for column in rank_index['columns']
+            })
+        return {'version': dataset['version'], 'start': start_date, 'end': end_date, 'resolution': resolution,
+                'specialties': list(specialties) if specialties else None, 'rows': _frame_rows(frame, 'period')}
+
+    return _respond(request, dataset, ('month', start_date, end_date, resolution, specialties), build)
+
+@app.get("/api/v1/totals/channel")
+def totals_by_channel(request: Request, start: str = None, end: str = None):
+    """Totals per channel (and 'Grand Total') over the date range."""
+    dataset = get_dataset()
+    start_date, end_date = _date_range(dataset, start, end)
+    rank_index = dataset['rank_index']
+
+    def build():
+        totals = {column: range_totals(rank_index, start_date, end_date, column).sum() for column in rank_index['columns']}
+        return {'version': dataset['version'], 'start': start_date, 'end': end_date, 'totals': totals}
+
+    return _respond(request, dataset, ('channel', start_date, end_date), build)
+
+@app.get("/api/v1/totals/specialty")
+def totals_by_specialty(request: Request, start: str = None, end: str = None,
+                        column: str = 'Grand Total', top: int = Query(None, ge=1)):
+    """Per-specialty totals of one column over the date range, largest first (optionally top N)."""
+    dataset = get_dataset()
+    start_date, end_date = _date_range(dataset, start, end)
+    rank_index = dataset['rank_index']
+    if column not in rank_index['columns']:
+        raise HTTPException(status_code=400, detail=f"Cột '{column}' không tồn tại. Có thể dùng: {', '.join(rank_index['columns'])}.")
+
+    def build():
+        ranking = top_specialties(rank_index, start_date, end_date, n=top or len(rank_index['specialties']), column=column)
+        return {'version': dataset['version'], 'start': start_date, 'end': end_date, 'column': column,
+                'rows': [{'Chuyên khoa': name, column: total} for name, total in ranking.items()]}
+
+    return _respond(request, dataset, ('specialty', start_date, end_date, column, top), build)
+
+@app.get("/api/v1/records")
+def records(request: Request, start: str = None, end: str = None):
+    """The pivoted (Month, Chuyên khoa) rows for the date range, as shown on 'Dữ liệu chi tiết'."""
+    dataset = get_dataset()
+    start_date, end_date = _date_range(dataset, start, end)
+    data = dataset['data']
+
+    def build():
+        months = data.index.get_level_values('Month')
+        rows = data[(months >= start_date) & (months <= end_date)].reset_index()
+        return {'version': dataset['version'], 'start': start_date, 'end': end_date, 'rows': rows.to_dict('records')}
+
+    return _respond(request, dataset, ('records', start_date, end_date), build)
+
+@app.get("/api/v1/reports")
+def reports(request: Request):
+    """Pre-rendered reports for the current dataset version; each file is served under /reports/<version>/."""
+    dataset = get_dataset()
+
+    def build():
+        manifest = load_manifest(version=dataset['version'])
+        if manifest is None:
+            raise HTTPException(status_code=404, detail="Chưa có báo cáo cho phiên bản dữ liệu hiện tại.")
+        return manifest
+
+    return _respond(request, dataset, ('reports',), build)
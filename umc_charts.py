@@ -0,0 +1,61 @@
+# umc_charts.py
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+from umc_session import check_widget_value
+
+# --- Configuration ---
+# Upper bound on x-values x traces per figure before switching to a coarser resolution
+MAX_CHART_POINTS = 1500
+# Longest axis (in periods) still readable at each resolution
+MAX_PERIODS = {'M': 36, 'Q': 40}
+# Line charts switch to WebGL above this many points across all traces (reached by
+# multi-specialty comparisons; MAX_CHART_POINTS bounds the automatic resolutions)
+SCATTERGL_MIN_POINTS = 500
+
+RESOLUTION_LABELS = {'M': 'Tháng', 'Q': 'Quý', 'Y': 'Năm'}
+RESOLUTION_AUTO = 'auto'
+
+# --- Resolution Selection ---
+def choose_resolution(start_date, end_date, n_traces):
+    """Picks 'M', 'Q' or 'Y' so the chart stays within MAX_CHART_POINTS and readable."""
+    n_traces = max(n_traces, 1)
+    for resolution in ['M', 'Q']:
+        n_periods = len(pd.period_range(start=start_date, end=end_date, freq=resolution))
+        if n_periods <= MAX_PERIODS[resolution] and n_periods * n_traces <= MAX_CHART_POINTS:
+            return resolution
+    return 'Y'
+
+def resolution_selector(start_date, end_date, n_traces, key):
+    """Selectbox with automatic (default) or forced resolution; returns 'M', 'Q' or 'Y'."""
+    auto_resolution = choose_resolution(start_date, end_date, n_traces)
+    options = [RESOLUTION_AUTO] + list(RESOLUTION_LABELS)
+    check_widget_value(key, options)
+    choice = st.selectbox(
+        'Độ phân giải thời gian:',
+        options,
+        format_func=lambda r: f"Tự động ({RESOLUTION_LABELS[auto_resolution]})" if r == RESOLUTION_AUTO else RESOLUTION_LABELS[r],
+        key=key
+    )
+    return auto_resolution if choice == RESOLUTION_AUTO else choice
+
+# --- Aggregation ---
+def resample_to_resolution(monthly_df, resolution):
+    """Sums a month-indexed frame into periods, labelled by period start (fallback when no index)."""
+    if resolution == 'M':
+        return monthly_df
+    period_starts = monthly_df.index.to_period(resolution).start_time
+    return monthly_df.groupby(period_starts).sum()
+
+# --- Plot Helpers ---
+def time_axis(resolution):
+    """xaxis settings (tick spacing and format) for the given resolution."""
+    if resolution == 'Y':
+        return dict(tickformat="%Y", showgrid=False, dtick="M12")
+    if resolution == 'Q':
+        return dict(tickformat="Q%q %Y", showgrid=False, dtick="M3", tickangle=-45)
+    return dict(tickformat="%b %Y", showgrid=False, dtick="M1", tickangle=-45)
+
+def scatter_class(n_periods, n_traces=1):
+    """go.Scattergl when the figure's line traces hold many points in total, go.Scatter otherwise."""
+    return go.Scattergl if n_periods * n_traces > SCATTERGL_MIN_POINTS else go.Scatter
@@ -0,0 +1,93 @@
+# umc_compare.py
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+COMPARE_COLUMNS = EXPECTED_CHANNELS + ['Grand Total']
+ROLLING_WINDOWS = [3, 6, 12]
+
+# Metric key -> display label (Vietnamese, used by KPI cards and the heatmap)
+COMPARISON_METRICS = {
+    'value': 'Lượt đăng ký',
+    'mom_abs': 'Thay đổi so với tháng trước',
+    'mom_pct': 'Tăng trưởng so với tháng trước (%)',
+    'yoy_abs': 'Thay đổi so với cùng kỳ năm trước',
+    'yoy_pct': 'Tăng trưởng so với cùng kỳ năm trước (%)',
+}
+for _k in ROLLING_WINDOWS:
+    COMPARISON_METRICS[f'roll{_k}'] = f'Tổng {_k} tháng gần nhất'
+    COMPARISON_METRICS[f'roll{_k}_pct'] = f'Tăng trưởng {_k} tháng so với {_k} tháng trước (%)'
+
+# --- Helpers ---
+def _shift(values, periods):
+    """Shifts a (month, ...) array forward along the month axis, padding with NaN."""
+    shifted = np.full(values.shape, np.nan)
+    if periods < values.shape[0]:
+        shifted[periods:] = values[:-periods]
+    return shifted
+
+def _growth_pct(current, previous):
+    """Percentage growth; NaN where the previous value is missing or zero."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = (current - previous) / previous * 100
+    pct[~np.isfinite(pct)] = np.nan
+    return pct
+
+# --- Comparison Engine ---
+def build_period_comparison(data):
+    """Computes MoM, YoY and rolling 3/6/12-month sums and growth for every specialty and column.
+
+    The pivoted frame is densified into a calendar-contiguous month x specialty x column cube,
+    with an extra trailing "specialty" slot for the all-specialty total, so every metric is a
+    handful of array operations over the whole cube. Missing months count as 0.
+    """
+    columns = [col for col in COMPARE_COLUMNS if col in data.columns]
+    month_values = data.index.get_level_values('Month')
+    months = pd.date_range(start=month_values.min(), end=month_values.max(), freq='MS')
+    specialties = data.index.get_level_values('Chuyên khoa').unique().sort_values()
+
+    full_index = pd.MultiIndex.from_product([months, specialties], names=['Month', 'Chuyên khoa'])
+    cube = data[columns].reindex(full_index, fill_value=0).to_numpy(dtype=np.float64)
+    cube = cube.reshape(len(months), len(specialties), len(columns))
+    cube = np.concatenate([cube, cube.sum(axis=1, keepdims=True)], axis=1)
+
+    metrics = {'value': cube}
+    metrics['mom_abs'] = cube - _shift(cube, 1)
+    metrics['mom_pct'] = _growth_pct(cube, _shift(cube, 1))
+    metrics['yoy_abs'] = cube - _shift(cube, 12)
+    metrics['yoy_pct'] = _growth_pct(cube, _shift(cube, 12))
+
+    # Rolling sums from prefix sums: roll_k[m] = prefix[m + 1] - prefix[m + 1 - k]
+    prefix = np.zeros((len(months) + 1,) + cube.shape[1:])
+    np.cumsum(cube, axis=0, out=prefix[1:])
+    for k in ROLLING_WINDOWS:
+        rolling = np.full(cube.shape, np.nan)
+        if k <= len(months):
+            rolling[k - 1:] = prefix[k:] - prefix[:-k]
+        metrics[f'roll{k}'] = rolling
+        metrics[f'roll{k}_pct'] = _growth_pct(rolling, _shift(rolling, k))
+
+    return {
+        'months': months,
+        'specialties': specialties,
+        'columns': columns,
+        'metrics': metrics,
+    }
+
+def comparison_frame(comparison, metric, column='Grand Total', start_date=None, end_date=None):
+    """Month x specialty DataFrame of one metric for one column, optionally limited to a date range."""
+    col = comparison['columns'].index(column)
+    values = comparison['metrics'][metric][:, :-1, col]
+    frame = pd.DataFrame(values, index=comparison['months'], columns=comparison['specialties'])
+    frame.index.name = 'Month'
+    return frame.loc[start_date:end_date]
+
+def comparison_totals(comparison, month, column='Grand Total'):
+    """All-specialty values of every metric for one month, as a dict (NaN when not computable)."""
+    months = comparison['months']
+    if month not in months:
+        return {metric: np.nan for metric in comparison['metrics']}
+    m = months.get_loc(month)
+    col = comparison['columns'].index(column)
+    return {metric: values[m, -1, col] for metric, values in comparison['metrics'].items()}
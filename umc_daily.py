@@ -0,0 +1,193 @@
+# umc_daily.py
+# Daily-granularity ingestion: streams CSV/Parquet exports in chunks, rolls them up to the monthly
+# pivoted frame used by every page, and keeps the daily rows as month-partitioned Parquet for drill-down.
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from umc_loader import EXPECTED_CHANNELS, EXCLUDE_SPECIALTY_KEYS, pivot_monthly_frame
+from umc_normalize import normalize_text, specialty_key, load_alias_table, resolve_specialty_names, format_name_suggestions
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: without pyarrow only CSV input works and drill-down is disabled
+    pq = None
+
+# --- Configuration ---
+DAILY_DATE_COLUMN = 'Ngày'
+DAILY_STORE_DIR = "daily_store"
+DAILY_CHUNK_ROWS = 200_000
+
+# --- Reading ---
+def _source_name(source):
+    return str(getattr(source, 'name', source))
+
+def _source_digest(source):
+    """Content hash of a path or file-like object, read in blocks (identifies the store folder)."""
+    digest = hashlib.sha1()
+    if hasattr(source, 'read'):
+        source.seek(0)
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+        source.seek(0)
+    else:
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+def read_daily_chunks(source, chunk_rows=DAILY_CHUNK_ROWS):
+    """Yields DataFrame chunks of a daily export (.csv or .parquet, path or uploaded file)."""
+    if _source_name(source).lower().endswith('.parquet'):
+        if pq is None:
+            raise ImportError("Cần gói pyarrow để đọc file Parquet.")
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows, encoding='utf-8-sig')
+
+# --- Chunk Processing ---
+def _parse_dates(values):
+    """ISO dates (the usual export format) first; only values that are not ISO are read day-first (05/01/2024)."""
+    dates = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry].astype(str), errors='coerce', format='mixed', dayfirst=True)
+    return dates.dt.normalize()
+
+def _clean_chunk(chunk, name_mapping):
+    """Parses dates, maps specialty names and coerces channels.
+
+    Returns (clean rows, bad cell count, rows dropped for a missing or unreadable date).
+    """
+    chunk = chunk.copy()
+    chunk['Ngày'] = _parse_dates(chunk[DAILY_DATE_COLUMN])
+    bad_dates = int(chunk['Ngày'].isna().sum())
+    chunk = chunk[chunk['Ngày'].notna()]
+    chunk['Chuyên khoa'] = chunk['Chuyên khoa'].map(name_mapping)
+
+    channels = [ch for ch in EXPECTED_CHANNELS if ch in chunk.columns]
+    raw_values = chunk[channels]
+    flat = pd.to_numeric(pd.Series(raw_values.to_numpy().ravel()), errors='coerce')
+    numeric = flat.to_numpy(dtype=np.float64).reshape(raw_values.shape)
+    bad_cells = int((np.isnan(numeric) & raw_values.notna().to_numpy()).sum())
+
+    clean = pd.DataFrame(np.nan_to_num(numeric).astype(np.int64), index=chunk.index, columns=channels)
+    for channel in EXPECTED_CHANNELS:
+        if channel not in clean.columns:
+            clean[channel] = 0
+    clean.insert(0, 'Chuyên khoa', chunk['Chuyên khoa'])
+    clean.insert(0, 'Ngày', chunk['Ngày'])
+    clean['Grand Total'] = clean[EXPECTED_CHANNELS].sum(axis=1)
+    clean['Month'] = clean['Ngày'].dt.to_period('M').dt.start_time
+    return clean, bad_cells, bad_dates
+
+def _normalize_names(chunk):
+    """NFC-normalizes specialty names (once per unique value) and drops total rows."""
+    raw_names = chunk['Chuyên khoa'].astype(str)
+    normalized = {name: normalize_text(name) for name in raw_names.unique()}
+    chunk = chunk.assign(**{'Chuyên khoa': raw_names.map(normalized)})
+    excluded = {name for name in normalized.values() if specialty_key(name) in EXCLUDE_SPECIALTY_KEYS}
+    return chunk[~chunk['Chuyên khoa'].isin(excluded)]
+
+def _write_partitions(clean, store_path, part_no):
+    """Appends a chunk's rows to the month partitions: <store>/month=YYYY-MM/part-NNNNN.parquet."""
+    for month, month_rows in clean.groupby('Month', sort=False):
+        month_dir = os.path.join(store_path, f"month={month.strftime('%Y-%m')}")
+        os.makedirs(month_dir, exist_ok=True)
+        month_rows.drop(columns=['Month']).to_parquet(os.path.join(month_dir, f'part-{part_no:05d}.parquet'), index=False)
+
+# --- Ingestion ---
+def ingest_daily_export(source, store_dir=DAILY_STORE_DIR, chunk_rows=DAILY_CHUNK_ROWS):
+    """Streams a daily export into monthly aggregates (and the drill-down store when pyarrow is available).
+
+    Only per-chunk (Month, Chuyên khoa) partial sums stay in memory, never the daily rows themselves. Returns (pivoted monthly frame or
+    None, report) in the same shape as umc_loader.process_umc_workbook (including 'new_aliases'), with
+    the drill-down store path under report['daily_store'] (None when not written).
+    """
+    report = {'messages': [], 'issue_summary': None, 'issue_details': None, 'new_aliases': {}, 'daily_store': None}
+    messages = report['messages']
+
+    store_path, staging_path = None, None
+    if pq is not None:
+        store_path = os.path.join(store_dir, _source_digest(source))
+        if not os.path.isdir(store_path):  # Same export already stored: reuse its partitions
+            # Write into a staging folder and swap it in at the end, so a failed run leaves no partial store
+            staging_path = store_path + '.tmp'
+            shutil.rmtree(staging_path, ignore_errors=True)
+    else:
+        messages.append(('info', "Chưa cài pyarrow: dữ liệu theo ngày chỉ được tổng hợp theo tháng, không lưu để xem chi tiết."))
+
+    stored_aliases = load_alias_table()
+    aliases = stored_aliases
+    partial_sums = []
+    daily_totals = []
+    rows_read, bad_cells, bad_dates = 0, 0, 0
+    name_suggestions = {}
+
+    for part_no, chunk in enumerate(read_daily_chunks(source, chunk_rows)):
+        if part_no == 0:
+            missing = [col for col in [DAILY_DATE_COLUMN, 'Chuyên khoa'] if col not in chunk.columns]
+            if missing:
+                messages.append(('error', f"File dữ liệu theo ngày thiếu cột: {', '.join(missing)}."))
+                return None, report
+
+        # Resolve only the names this chunk introduces; the alias table carries over between chunks
+        chunk = _normalize_names(chunk)
+        name_mapping, aliases, _, chunk_suggestions = resolve_specialty_names(chunk['Chuyên khoa'], aliases)
+        name_suggestions.update((frozenset(pair), pair) for pair in chunk_suggestions)
+        clean, chunk_bad, chunk_bad_dates = _clean_chunk(chunk, name_mapping)
+        rows_read += len(clean)
+        bad_cells += chunk_bad
+        bad_dates += chunk_bad_dates
+
+        value_cols = EXPECTED_CHANNELS + ['Grand Total']
+        partial_sums.append(clean.groupby(['Month', 'Chuyên khoa'])[value_cols].sum())
+        daily_totals.append(clean.groupby('Ngày')[value_cols].sum())
+        if staging_path is not None:
+            _write_partitions(clean, staging_path, part_no)
+
+    report['new_aliases'] = {key: name for key, name in aliases.items() if key not in stored_aliases}
+    if rows_read == 0:
+        messages.append(('error', "Không tìm thấy dòng dữ liệu hợp lệ trong file theo ngày."))
+        return None, report
+    if bad_dates:
+        messages.append(('warning', f"Bỏ qua {bad_dates:,} dòng có ngày trống hoặc không đọc được (cột '{DAILY_DATE_COLUMN}')."))
+    if bad_cells:
+        messages.append(('warning', f"Có {bad_cells:,} ô không phải số trong dữ liệu theo ngày; được tính là 0."))
+    if name_suggestions:
+        messages.append(('warning', format_name_suggestions(list(name_suggestions.values()))))
+
+    monthly = pd.concat(partial_sums).groupby(level=['Month', 'Chuyên khoa']).sum().reset_index()
+    pivoted_df = pivot_monthly_frame(monthly)
+
+    if staging_path is not None:
+        # Precomputed all-specialty daily totals: the drill-down chart never scans the partitions
+        os.makedirs(staging_path, exist_ok=True)
+        pd.concat(daily_totals).groupby(level='Ngày').sum().to_parquet(os.path.join(staging_path, 'daily_totals.parquet'))
+        os.replace(staging_path, store_path)
+    if store_path is not None:
+        report['daily_store'] = store_path
+
+    months = pivoted_df.index.get_level_values('Month')
+    messages.append(('success', f"Đã tổng hợp {rows_read:,} dòng theo ngày thành {months.nunique()} tháng."))
+    return pivoted_df, report
+
+# --- Drill-down ---
+def load_daily_totals(store_path, month=None):
+    """All-specialty totals per day (optionally for one month) from the precomputed aggregate."""
+    totals = pd.read_parquet(os.path.join(store_path, 'daily_totals.parquet'))
+    if month is not None:
+        totals = totals.loc[month:month + pd.offsets.MonthEnd(0)]
+    return totals
+
+def load_daily_rows(store_path, month, specialties=None):
+    """Daily rows of one month (reads only that month's partition), optionally for some specialties."""
+    month_dir = os.path.join(store_path, f"month={month.strftime('%Y-%m')}")
+    if not os.path.isdir(month_dir):
+        return pd.DataFrame(columns=['Ngày', 'Chuyên khoa'] + EXPECTED_CHANNELS + ['Grand Total'])
+    filters = [('Chuyên khoa', 'in', list(specialties))] if specialties else None
+    return pd.read_parquet(month_dir, filters=filters).sort_values(['Ngày', 'Chuyên khoa'])
@@ -0,0 +1,144 @@
+# umc_index.py
+import hashlib
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+RANK_COLUMNS = EXPECTED_CHANNELS + ['Grand Total']
+
+# --- Dataset Identity ---
+def dataset_version(data):
+    """Short content hash of the pivoted frame, used as the cache key for derived indexes."""
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    digest.update('|'.join(map(str, data.columns)).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+# --- Ranking Index ---
+def build_rank_index(data):
+    """Builds per-specialty prefix sums over months for every channel and 'Grand Total'.
+
+    prefix[m, s, c] holds the total of column c for specialty s over the first m months,
+    so the total for any month range is a single subtraction instead of a group-by.
+    column_prefix[m, c] is the same summed over all specialties, for the all-specialty charts.
+    """
+    columns = [col for col in RANK_COLUMNS if col in data.columns]
+    months = data.index.get_level_values('Month').unique().sort_values()
+    specialties = data.index.get_level_values('Chuyên khoa').unique().sort_values()
+
+    # Dense month x specialty x column cube (missing combinations count as 0)
+    full_index = pd.MultiIndex.from_product([months, specialties], names=['Month', 'Chuyên khoa'])
+    cube = data[columns].reindex(full_index, fill_value=0).to_numpy(dtype=np.int64)
+    cube = cube.reshape(len(months), len(specialties), len(columns))
+
+    prefix = np.zeros((len(months) + 1, len(specialties), len(columns)), dtype=np.int64)
+    np.cumsum(cube, axis=0, out=prefix[1:])
+
+    return {
+        'months': months,
+        'specialties': specialties,
+        'columns': columns,
+        'prefix': prefix,
+        'column_prefix': prefix.sum(axis=1),
+    }
+
+def refresh_rank_index(rank_index, data, changed_months):
+    """Updates a previous version's index for `data`, recomputing only from the first changed month.
+
+    Prefix rows before that month are still valid and are copied as is. Falls back to a full build
+    when the months, specialties or columns themselves differ.
+    """
+    columns = [col for col in RANK_COLUMNS if col in data.columns]
+    months = data.index.get_level_values('Month').unique().sort_values()
+    specialties = data.index.get_level_values('Chuyên khoa').unique().sort_values()
+    if not (months.equals(rank_index['months']) and specialties.equals(rank_index['specialties'])
+            and columns == rank_index['columns']):
+        return build_rank_index(data)
+    if len(changed_months) == 0:
+        return rank_index
+
+    lo = months.searchsorted(min(changed_months), side='left')
+    tail_months = months[lo:]
+    tail = data[data.index.get_level_values('Month') >= tail_months[0]]
+    full_index = pd.MultiIndex.from_product([tail_months, specialties], names=['Month', 'Chuyên khoa'])
+    cube = tail[columns].reindex(full_index, fill_value=0).to_numpy(dtype=np.int64)
+    cube = cube.reshape(len(tail_months), len(specialties), len(columns))
+
+    prefix = rank_index['prefix'].copy()
+    np.cumsum(cube, axis=0, out=prefix[lo + 1:])
+    prefix[lo + 1:] += prefix[lo]
+    column_prefix = rank_index['column_prefix'].copy()
+    column_prefix[lo + 1:] = prefix[lo + 1:].sum(axis=1)
+    return dict(rank_index, prefix=prefix, column_prefix=column_prefix)
+
+def range_totals(rank_index, start_date, end_date, column='Grand Total'):
+    """Returns the per-specialty totals of `column` for months in [start_date, end_date]."""
+    months = rank_index['months']
+    lo = months.searchsorted(start_date, side='left')
+    hi = months.searchsorted(end_date, side='right')
+    col = rank_index['columns'].index(column)
+    prefix = rank_index['prefix']
+    return prefix[hi, :, col] - prefix[lo, :, col]
+
+def top_specialties(rank_index, start_date, end_date, n=10, column='Grand Total'):
+    """Top-n specialties by `column` for the date range, as a Series sorted descending.
+
+    Specialties without registrations in the range are left out. Ties keep the
+    alphabetical order, matching `groupby(...).sum().nlargest(n)`.
+    """
+    if column not in rank_index['columns']:
+        return pd.Series(dtype='int64', name=column)
+
+    totals = range_totals(rank_index, start_date, end_date, column)
+    candidates = np.flatnonzero(totals > 0)
+    n = min(n, len(candidates))
+    if n <= 0:
+        return pd.Series(dtype='int64', name=column)
+
+    if n < len(candidates):
+        # Partial selection: O(S) instead of sorting every specialty. Everything above the n-th
+        # value is kept; ties at it are filled in alphabetical (position) order, like nlargest.
+        threshold = -np.partition(-totals[candidates], n - 1)[n - 1]
+        above = candidates[totals[candidates] > threshold]
+        tied = candidates[totals[candidates] == threshold][:n - len(above)]
+        candidates = np.concatenate([above, tied])
+    order = candidates[np.lexsort((candidates, -totals[candidates]))]
+
+    return pd.Series(totals[order], index=rank_index['specialties'][order], name=column)
+
+def ranked_specialty_count(rank_index, start_date, end_date, column='Grand Total'):
+    """Number of specialties with registrations of `column` in the date range."""
+    if column not in rank_index['columns']:
+        return 0
+    return int(np.count_nonzero(range_totals(rank_index, start_date, end_date, column) > 0))
+
+# --- Period Totals (chart downsampling) ---
+def _period_bounds(rank_index, start_date, end_date, resolution):
+    """Period start labels plus [lo, hi) prefix positions for each period clipped to the range.
+
+    `resolution` is a pandas period alias: 'M' (month), 'Q' (quarter) or 'Y' (year).
+    """
+    periods = pd.period_range(start=start_date, end=end_date, freq=resolution)
+    period_starts = periods.start_time
+    lower = np.maximum(period_starts.values, np.datetime64(start_date))
+    upper = np.minimum((periods + 1).start_time.values, np.datetime64(end_date + pd.offsets.MonthBegin(1)))
+    months = rank_index['months']
+    return period_starts, months.searchsorted(lower, side='left'), months.searchsorted(upper, side='left')
+
+def period_column_totals(rank_index, start_date, end_date, resolution='M', columns=None):
+    """All-specialty totals per period for each column, indexed by period start."""
+    columns = [col for col in (columns or rank_index['columns']) if col in rank_index['columns']]
+    col_pos = [rank_index['columns'].index(col) for col in columns]
+    labels, lo, hi = _period_bounds(rank_index, start_date, end_date, resolution)
+    prefix = rank_index['column_prefix'][:, col_pos]
+    return pd.DataFrame(prefix[hi] - prefix[lo], index=labels, columns=columns)
+
+def period_specialty_totals(rank_index, start_date, end_date, specialties, resolution='M', column='Grand Total'):
+    """Per-period totals of `column` for the given specialties, indexed by period start."""
+    specialties = [spec for spec in specialties if spec in rank_index['specialties']]
+    spec_pos = rank_index['specialties'].get_indexer(specialties)
+    col = rank_index['columns'].index(column)
+    labels, lo, hi = _period_bounds(rank_index, start_date, end_date, resolution)
+    prefix = rank_index['prefix'][:, spec_pos, col]
+    return pd.DataFrame(prefix[hi] - prefix[lo], index=labels, columns=specialties)
@@ -0,0 +1,152 @@
+# umc_loader.py
+# Workbook ingestion without Streamlit, shared by the dashboard, the HTTP API and batch jobs.
+import re
+import pandas as pd
+from umc_validate import validate_channel_values, describe_issues
+from umc_normalize import normalize_text, specialty_key, load_alias_table, resolve_specialty_names, format_name_suggestions
+
+# --- Configuration ---
+EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+EXCLUDE_SPECIALTY_TERMS = ['grand total', 'tổng cộng', 'total']
+EXCLUDE_SPECIALTY_KEYS = {specialty_key(term) for term in EXCLUDE_SPECIALTY_TERMS}
+
+# --- Helper Function to Parse Sheet Names ---
+def parse_sheet_name_to_date(sheet_name):
+    """Attempts to parse common month/year formats from sheet names."""
+    sheet_name_lower = str(sheet_name).lower().strip()
+    formats_to_try = [
+        "%b-%y", "%b %y", "%B-%y", "%B %y", "%b-%Y", "%b %Y", "%B-%Y", "%B %Y",
+        "T%m-%y", "T%m_%y", "T%m-%Y", "T%m_%Y", "thang%m_%y", "thang%m-%y",
+        "thang%m_%Y", "thang%m-%Y", "%m/%Y", "%m-%Y", "%Y/%m", "%Y-%m"
+    ]
+    cleaned_name = re.sub(r'^(sheet|data|thang|t)(\s*|-|_)?', '', sheet_name_lower)
+    for fmt in formats_to_try:
+        try:
+            # Return as Timestamp initially, convert later if needed
+            return pd.to_datetime(cleaned_name, format=fmt).replace(day=1)
+        except ValueError:
+            continue
+    return None
+
+# --- Pivoting ---
+def pivot_monthly_frame(combined_df):
+    """Pivots long (Month, Chuyên khoa, channels..., Grand Total) rows into the app's MultiIndex frame."""
+    pivot_values = [ch for ch in EXPECTED_CHANNELS if ch in combined_df.columns] + ['Grand Total']
+    pivot_values = list(set(col for col in pivot_values if col in combined_df.columns))
+
+    pivoted_df = combined_df.pivot_table(
+        index=['Month', 'Chuyên khoa'],
+        values=pivot_values,
+        fill_value=0,
+        aggfunc='sum' # Use sum to handle potential duplicates
+    )
+    pivoted_df = pivoted_df.sort_index()
+
+    # Calculate overall total
+    if 'Grand Total' in pivoted_df.columns:
+         pivoted_df['Total_Registrations_AllM'] = pivoted_df.groupby(level='Chuyên khoa')['Grand Total'].transform('sum')
+    else:
+         channel_sum_cols = [ch for ch in EXPECTED_CHANNELS if ch in pivoted_df.columns]
+         if channel_sum_cols:
+              pivoted_df['Temp_Total'] = pivoted_df[channel_sum_cols].sum(axis=1)
+              pivoted_df['Total_Registrations_AllM'] = pivoted_df.groupby(level='Chuyên khoa')['Temp_Total'].transform('sum')
+              if 'Temp_Total' in pivoted_df.columns: del pivoted_df['Temp_Total']
+         else:
+              pivoted_df['Total_Registrations_AllM'] = 0
+    return pivoted_df
+
+# --- Data Loading Function ---
+def process_umc_workbook(file_path):
+    """Loads data assuming each sheet is a month, EXCLUDING 'Grand Total' specialty rows.
+
+    Returns (pivoted_df or None, report). `report` holds 'messages' as (level, text) pairs with
+    level in {'info', 'warning', 'error', 'success'}, the validation 'issue_summary' and
+    'issue_details' frames, and 'new_aliases' ({key: canonical name} not yet in the alias table,
+    for the caller to persist with umc_normalize.add_aliases). Unexpected errors propagate.
+    """
+    report = {'messages': [], 'issue_summary': None, 'issue_details': None, 'new_aliases': {}}
+    messages = report['messages']
+
+    df_sheets = pd.read_excel(file_path, sheet_name=None)
+    if not df_sheets:
+        messages.append(('error', "File Excel không chứa sheet nào."))
+        return None, report
+
+    all_monthly_data = []
+    valid_sheets_found = 0
+    parsed_sheet_names = [] # Keep track to avoid duplicate warnings
+
+    for sheet_name, raw_data in df_sheets.items():
+        month_date = parse_sheet_name_to_date(sheet_name)
+        if month_date is None:
+            if sheet_name not in parsed_sheet_names: # Show warning only once per name
+                messages.append(('warning', f"Bỏ qua sheet '{sheet_name}' do không nhận dạng được ngày tháng."))
+                parsed_sheet_names.append(sheet_name)
+            continue
+
+        if 'Chuyên khoa' not in raw_data.columns:
+            messages.append(('warning', f"Sheet '{sheet_name}' ({month_date.strftime('%b %Y')}) thiếu cột 'Chuyên khoa'. Bỏ qua."))
+            continue
+
+        # Exclude Grand Total / Summary Rows (matched accent- and case-insensitively)
+        raw_data['Chuyên khoa'] = raw_data['Chuyên khoa'].astype(str).map(normalize_text)
+        mask_keep = ~raw_data['Chuyên khoa'].map(specialty_key).isin(EXCLUDE_SPECIALTY_KEYS)
+        data_cleaned = raw_data[mask_keep].copy()
+        if data_cleaned.empty:
+             messages.append(('warning', f"Sheet '{sheet_name}' ({month_date.strftime('%b %Y')}) không còn dữ liệu sau khi loại bỏ dòng tổng cộng. Bỏ qua."))
+             continue
+
+        present_channels = [ch for ch in EXPECTED_CHANNELS if ch in data_cleaned.columns]
+
+        # Keep raw channel values (and any stated 'Grand Total') for the validation pass below
+        cols_to_keep = ['Chuyên khoa'] + present_channels + ['Grand Total']
+        cols_to_keep = [col for col in cols_to_keep if col in data_cleaned.columns]
+        monthly_df = data_cleaned[cols_to_keep].copy()
+        monthly_df['Month'] = month_date
+        monthly_df['Sheet'] = str(sheet_name)
+
+        all_monthly_data.append(monthly_df)
+        valid_sheets_found += 1
+
+    if not all_monthly_data:
+        messages.append(('error', "Không tìm thấy sheet hợp lệ nào chứa dữ liệu chuyên khoa (sau khi loại bỏ dòng tổng cộng)."))
+        return None, report
+
+    combined_df = pd.concat(all_monthly_data, ignore_index=True)
+
+    # --- Normalize specialty names ---
+    # Spelling/accent/case variants collapse onto one canonical name via the persisted alias table
+    stored_aliases = load_alias_table()
+    name_mapping, aliases, _, name_suggestions = resolve_specialty_names(combined_df['Chuyên khoa'], stored_aliases)
+    report['new_aliases'] = {key: name for key, name in aliases.items() if key not in stored_aliases}
+    merged_variants = combined_df['Chuyên khoa'].nunique() - len(set(name_mapping.values()))
+    combined_df['Chuyên khoa'] = combined_df['Chuyên khoa'].map(name_mapping)
+    if merged_variants > 0:
+        messages.append(('info', f"Đã gộp {merged_variants} biến thể tên chuyên khoa (khác dấu, chữ hoa/thường hoặc chính tả)."))
+    if name_suggestions:
+        messages.append(('warning', format_name_suggestions(name_suggestions)))
+
+    # --- Validate and coerce channel values (all sheets in one pass) ---
+    numeric_channels, issue_summary, issue_details = validate_channel_values(combined_df, EXPECTED_CHANNELS)
+    present_channels = list(numeric_channels.columns)
+    combined_df[present_channels] = numeric_channels.fillna(0).astype(int)
+    combined_df['Grand Total'] = combined_df[present_channels].sum(axis=1) if present_channels else 0
+    combined_df = combined_df.drop(columns=['Sheet'])
+    if not issue_summary.empty:
+        messages.append(('warning', describe_issues(issue_summary, issue_details)))
+        report['issue_summary'] = issue_summary
+        report['issue_details'] = issue_details
+
+    # Check for duplicates before pivoting
+    duplicates = combined_df[combined_df.duplicated(subset=['Month', 'Chuyên khoa'], keep=False)]
+    if not duplicates.empty:
+        messages.append(('warning', "Phát hiện dữ liệu chuyên khoa trùng lặp trong cùng một tháng. Sẽ cộng gộp giá trị."))
+
+    try:
+        pivoted_df = pivot_monthly_frame(combined_df)
+    except Exception as pivot_error:
+        messages.append(('error', f"Lỗi khi tổng hợp dữ liệu: {pivot_error}"))
+        return None, report
+
+    messages.append(('success', f"Đã xử lý thành công dữ liệu từ {valid_sheets_found} sheet."))
+    return pivoted_df, report
@@ -0,0 +1,433 @@
+# umc_loadtest.py
+"""Load test: N simulated users driving a real dashboard server over its websocket protocol.
+
+Run from the app folder (same working directory as `streamlit run`):
+    python umc_loadtest.py --sessions 30 --steps 6
+    python umc_loadtest.py --sessions 30 --json ket_qua.json               # save as a baseline
+    python umc_loadtest.py --sessions 30 --baseline ket_qua.json           # compare with it
+
+The harness starts `streamlit run` itself (on --port) and connects one websocket client per user,
+speaking the browser's protocol (BackMsg rerun requests, ForwardMsg replies), so script runs overlap
+in the server exactly as they do for real users. Each user opens the main page, then repeatedly
+picks a random date range and one of the four analysis pages, and changes a random filter there.
+Reports per-page latency percentiles (request sent -> script finished), server memory per connected
+session and the hit rate of every cached function, counted inside the server process.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import websockets
+except ImportError:  # Installed with Streamlit >= 1.5x (its server depends on it)
+    websockets = None
+
+# --- Configuration ---
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = 'kham_umccare_st.py'
+DEFAULT_PORT = 8599
+RUN_TIMEOUT = 120     # Seconds per script run
+SERVER_START_TIMEOUT = 60
+STATS_INTERVAL = 0.5  # Seconds between cache counter dumps from the server
+PERCENTILES = [50, 90, 95, 99]
+
+# Page -> (script, widgets a user may change there)
+PAGES = {
+    'Tổng quan': ('pages/1_Tong_quan.py', ['overview_top_n_page1', 'overview_rank_column_page1',
+                                           'overview_heatmap_metric_page1', 'overview_resolution_page1']),
+    'Phân tích kênh': ('pages/2_Phan_tich_kenh.py', ['channel_select_filter_page2', 'channel_resolution_page2']),
+    'So sánh chuyên khoa': ('pages/3_So_sanh_chuyen_khoa.py', ['specialty_select_compare_page3', 'specialty_resolution_page3']),
+    'Dữ liệu chi tiết': ('pages/4_Du_lieu_chi_tiet.py', ['data_filter_option_page4']),
+}
+
+# --- Server Side: cache instrumentation ---
+class CacheCounter:
+    """Counts hits and misses per cached function by wrapping Streamlit's cache lookup.
+
+    Relies on internal hooks (CachedFunc._handle_cache_hit / _handle_cache_miss); when a Streamlit
+    release renames them the test still runs and the cache table is reported as unavailable.
+    """
+    def __init__(self):
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.available = False
+        self._lock = threading.Lock()
+
+    def install(self):
+        try:
+            from streamlit.runtime.caching.cache_utils import CachedFunc
+        except ImportError:
+            return
+        if not (hasattr(CachedFunc, '_handle_cache_hit') and hasattr(CachedFunc, '_handle_cache_miss')):
+            return
+        counter, original_hit, original_miss = self, CachedFunc._handle_cache_hit, CachedFunc._handle_cache_miss
+
+        def handle_hit(func, *args, **kwargs):
+            counter._count(counter.hits, func)
+            return original_hit(func, *args, **kwargs)
+
+        def handle_miss(func, *args, **kwargs):
+            counter._count(counter.misses, func)
+            return original_miss(func, *args, **kwargs)
+
+        CachedFunc._handle_cache_hit, CachedFunc._handle_cache_miss = handle_hit, handle_miss
+        self.available = True
+
+    def _count(self, table, cached_func):
+        func = cached_func._info.func
+        name = f"{os.path.basename(func.__code__.co_filename)}:{func.__qualname__}"
+        with self._lock:
+            table[name] += 1
+
+    def snapshot(self):
+        """{function: [hits, misses]}, or None when the hooks could not be installed."""
+        if not self.available:
+            return None
+        with self._lock:
+            return {name: [self.hits[name], self.misses[name]] for name in set(self.hits) | set(self.misses)}
+
+def serve(port, stats_file):
+    """Runs the dashboard server in this process with the cache counter installed (--serve mode)."""
+    from streamlit.web import cli
+
+    counter = CacheCounter()
+    counter.install()
+
+    def dump_stats():
+        while True:
+            with open(stats_file + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(counter.snapshot(), f)
+            os.replace(stats_file + '.tmp', stats_file)
+            time.sleep(STATS_INTERVAL)
+
+    threading.Thread(target=dump_stats, daemon=True).start()
+    sys.argv = ['streamlit', 'run', os.path.join(APP_DIR, MAIN_SCRIPT), '--server.headless', 'true',
+                '--server.port', str(port), '--browser.gatherUsageStats', 'false']
+    cli.main()
+
+def start_server(port, stats_file):
+    """Starts `serve` in a child process and waits until the server answers its health check."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port), '--stats-file', stats_file],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server dừng ngay khi khởi động (mã {process.returncode}).")
+        try:
+            with urllib.request.urlopen(f'http://localhost:{port}/_stcore/health', timeout=1):
+                return process
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Server không phản hồi sau {SERVER_START_TIMEOUT} s.")
+
+def read_cache_stats(stats_file):
+    if not os.path.exists(stats_file):
+        return None
+    with open(stats_file, encoding='utf-8') as f:
+        return json.load(f)
+
+def process_memory(pid):
+    """(current, peak) resident memory of a process in bytes from /proc (Linux), else (None, None)."""
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(fields['VmRSS'].split()[0]) * 1024, int(fields['VmHWM'].split()[0]) * 1024
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+# --- Client Side: one simulated browser tab ---
+def _page_name(script_path):
+    """Streamlit's page name for a script: '1_Tong_quan.py' -> 'Tong quan'."""
+    stem = os.path.splitext(os.path.basename(script_path))[0]
+    return re.sub(r'^\d+_', '', stem).replace('_', ' ')
+
+async def _rerun(ws, page_hash='', widget_states=()):
+    """Requests a script run and reads replies until the run (including st.rerun follow-ups) finishes.
+
+    Returns {'widgets': {key: (type, proto)}, 'errors': exception count, 'pages': {name: hash}}.
+    """
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    request = BackMsg()
+    request.rerun_script.page_script_hash = page_hash
+    request.rerun_script.widget_states.widgets.extend(widget_states)
+    await ws.send(request.SerializeToString())
+
+    result = {'widgets': {}, 'errors': 0, 'pages': {}}
+    while True:
+        msg = ForwardMsg()
+        msg.ParseFromString(await ws.recv())
+        msg_type = msg.WhichOneof('type')
+        if msg_type == 'new_session':  # A run (re)started: only the last run's elements count
+            result['widgets'], result['errors'] = {}, 0
+        elif msg_type == 'navigation':
+            result['pages'] = {page.page_name: page.page_script_hash for page in msg.navigation.app_pages}
+        elif msg_type == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+            element_type = msg.delta.new_element.WhichOneof('type')
+            element = getattr(msg.delta.new_element, element_type)
+            if element_type == 'exception':
+                result['errors'] += 1
+            elif getattr(element, 'id', '').startswith('$$ID-'):
+                result['widgets'][element.id.split('-', 2)[2]] = (element_type, element)
+        elif msg_type == 'script_finished' and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+            return result
+
+async def _timed_rerun(ws, latencies, page_name, kind, page_hash='', widget_states=()):
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(_rerun(ws, page_hash, widget_states), RUN_TIMEOUT)
+    except asyncio.TimeoutError:
+        latencies.append((page_name, kind, RUN_TIMEOUT * 1000, 1))
+        raise
+    latencies.append((page_name, kind, (time.perf_counter() - started) * 1000, result['errors']))
+    return result
+
+def _random_widget_state(widget_type, proto, rng):
+    """A random new value for a slider, selectbox, radio or multiselect, as the browser would send it."""
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    state = WidgetState(id=proto.id)
+    if widget_type == 'slider':
+        state.double_array_value.data[:] = [rng.randint(int(proto.min), int(proto.max))]
+    elif widget_type in ('selectbox', 'radio') and proto.options:
+        state.string_value = rng.choice(list(proto.options))
+    elif widget_type == 'multiselect' and proto.options:
+        state.string_array_value.data[:] = rng.sample(list(proto.options), rng.randint(1, min(len(proto.options), 6)))
+    else:
+        return None
+    return state
+
+def _date_states(widgets, rng):
+    """Widget states picking a random month range on the main page's date inputs."""
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    start_proto, end_proto = widgets['date_start'][1], widgets['date_end'][1]
+    first_day = pd.Timestamp(start_proto.min.replace('/', '-'))
+    months = pd.date_range(first_day.to_period('M').start_time, pd.Timestamp(end_proto.max.replace('/', '-')), freq='MS')
+    months = months.where(months >= first_day, first_day)
+    first, last = sorted(rng.sample(range(len(months)), 2)) if len(months) > 1 else (0, 0)
+    states = []
+    for proto, month in ((start_proto, months[first]), (end_proto, months[last])):
+        state = WidgetState(id=proto.id)
+        state.string_array_value.data[:] = [month.strftime('%Y-%m-%d')]
+        states.append(state)
+    return states
+
+async def simulate_user(ws, steps, rng, think, latencies):
+    """One user: open the main page, then `steps` times pick a range, open a page and change a filter.
+
+    `think` is the mean pause (seconds) between seeing a page and acting on it.
+    """
+    result = await _timed_rerun(ws, latencies, 'Trang chính', 'mở')
+    pages = result['pages']
+    main_hash = pages.get(_page_name(MAIN_SCRIPT), '')
+    if 'date_start' not in result['widgets']:
+        raise RuntimeError("Ứng dụng không tải được dữ liệu; kiểm tra file dữ liệu trong thư mục của server.")
+
+    for _ in range(steps):
+        result = await _timed_rerun(ws, latencies, 'Trang chính', 'mở', main_hash)
+        await asyncio.sleep(rng.uniform(0, 2 * think))
+        await _timed_rerun(ws, latencies, 'Trang chính', 'chọn thời gian', main_hash, _date_states(result['widgets'], rng))
+
+        page_name = rng.choice(list(PAGES))
+        page_path, filter_keys = PAGES[page_name]
+        page_hash = pages[_page_name(page_path)]
+        result = await _timed_rerun(ws, latencies, page_name, 'mở', page_hash)
+        await asyncio.sleep(rng.uniform(0, 2 * think))
+
+        present = [key for key in filter_keys if key in result['widgets']]
+        state = _random_widget_state(*result['widgets'][rng.choice(present)], rng) if present else None
+        if state is not None:  # Widget absent for this range (e.g. no data): nothing to change
+            await _timed_rerun(ws, latencies, page_name, 'lọc', page_hash, [state])
+
+def _connect(url):
+    return websockets.connect(url, subprotocols=['streamlit'], max_size=None)
+
+async def warm_up(url):
+    """One session opening every page once, so the measured run starts with warm caches."""
+    async with _connect(url) as ws:
+        pages = (await _rerun(ws))['pages']
+        for page_path, _ in PAGES.values():
+            await asyncio.wait_for(_rerun(ws, pages[_page_name(page_path)]), RUN_TIMEOUT)
+
+async def run_users(url, n_sessions, steps, seed, ramp, think, server_pid):
+    """Runs all users concurrently, each starting at a random moment within `ramp` seconds.
+
+    Server memory is read once every user has finished but is still connected.
+    """
+    latencies, failures = [], []
+    done, all_done, release = [0], asyncio.Event(), asyncio.Event()
+
+    def finish():
+        done[0] += 1
+        if done[0] == n_sessions:
+            all_done.set()
+
+    async def user(user_no):
+        rng = random.Random(seed + user_no)
+        await asyncio.sleep(rng.uniform(0, ramp))
+        try:
+            async with _connect(url) as ws:
+                try:
+                    await simulate_user(ws, steps, rng, think, latencies)
+                except Exception as error:  # A broken session is reported; the others keep running
+                    failures.append(f"{type(error).__name__}: {error}")
+                finish()
+                await release.wait()  # Keep the session alive until memory has been read
+        except OSError as error:  # Could not connect at all
+            failures.append(f"{type(error).__name__}: {error}")
+            finish()
+
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(user(i)) for i in range(n_sessions)]
+    await all_done.wait()
+    elapsed = time.perf_counter() - started
+    connected_memory, _ = process_memory(server_pid)
+    release.set()
+    await asyncio.gather(*tasks)
+    return latencies, failures, elapsed, connected_memory
+
+# --- Reports ---
+def latency_table(latencies):
+    """Per page and action: run count, latency percentiles (ms) and runs that raised or timed out."""
+    frame = pd.DataFrame(latencies, columns=['Trang', 'Thao tác', 'ms', 'Lỗi'])
+    grouped = frame.groupby(['Trang', 'Thao tác'])
+    table = grouped['ms'].agg(['count', *[(f'p{p}', lambda s, p=p: np.percentile(s, p)) for p in PERCENTILES], 'max'])
+    table = table.rename(columns={'count': 'Số lượt'})
+    table['Lỗi'] = grouped['Lỗi'].apply(lambda s: int((s > 0).sum()))
+    return table.round(1)
+
+def cache_table(before, after):
+    """Hits and misses per cached function between two counter snapshots."""
+    before = before or {}
+    rows = {name: [hits - before.get(name, [0, 0])[0], misses - before.get(name, [0, 0])[1]]
+            for name, (hits, misses) in sorted(after.items())}
+    table = pd.DataFrame.from_dict(rows, orient='index', columns=['Hit', 'Miss'])
+    table.index.name = 'Hàm cache'
+    table = table[(table['Hit'] + table['Miss']) > 0]
+    table['Tỷ lệ hit (%)'] = (100 * table['Hit'] / (table['Hit'] + table['Miss'])).round(1)
+    return table
+
+def _mb(n_bytes):
+    return round(n_bytes / 2**20, 1) if n_bytes is not None else None
+
+def run_load_test(n_sessions, steps, seed=0, ramp=0.0, think=1.0, port=DEFAULT_PORT, warm=True):
+    """Starts a server, runs the simulated users against it and returns the results as plain data."""
+    if websockets is None:
+        raise ImportError("Cần gói websockets để mô phỏng người dùng.")
+    url = f'ws://localhost:{port}/_stcore/stream'
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        stats_file = os.path.join(tmp_dir, 'cache_stats.json')
+        server = start_server(port, stats_file)
+        try:
+            if warm:
+                asyncio.run(warm_up(url))
+            idle_memory, _ = process_memory(server.pid)
+            time.sleep(2 * STATS_INTERVAL)
+            stats_before = read_cache_stats(stats_file)
+
+            latencies, failures, elapsed, connected_memory = asyncio.run(
+                run_users(url, n_sessions, steps, seed, ramp, think, server.pid))
+            _, peak_memory = process_memory(server.pid)
+            time.sleep(2 * STATS_INTERVAL)
+            stats_after = read_cache_stats(stats_file)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    table = latency_table(latencies)
+    caches = cache_table(stats_before, stats_after) if stats_after is not None else None
+    per_session = (connected_memory - idle_memory) / n_sessions if None not in (connected_memory, idle_memory) else None
+    return {
+        'sessions': n_sessions,
+        'steps': steps,
+        'ramp_s': ramp,
+        'think_s': think,
+        'warm_start': warm,
+        'elapsed_s': round(elapsed, 2),
+        'runs': len(latencies),
+        'runs_per_s': round(len(latencies) / elapsed, 2),
+        'failed_sessions': failures,
+        'server_idle_mb': _mb(idle_memory),
+        'server_connected_mb': _mb(connected_memory),
+        'server_peak_mb': _mb(peak_memory),
+        'memory_per_session_kb': round(per_session / 1024, 1) if per_session is not None else None,
+        'latency': [dict(zip(['Trang', 'Thao tác'], key), **row) for key, row in table.to_dict('index').items()],
+        'caches': [dict({'Hàm cache': name}, **row) for name, row in caches.to_dict('index').items()] if caches is not None else None,
+    }
+
+def print_results(results, baseline=None):
+    print(f"\n{results['sessions']} người dùng đồng thời × {results['steps']} bước "
+          f"(bắt đầu trong {results['ramp_s']} s, nghỉ trung bình {results['think_s']} s, "
+          f"cache {'đã làm nóng' if results['warm_start'] else 'nguội'}): "
+          f"{results['runs']} lượt chạy trong {results['elapsed_s']} s ({results['runs_per_s']} lượt/s)")
+    for failure in results['failed_sessions']:
+        print(f"Phiên lỗi: {failure}")
+    if results['memory_per_session_kb'] is not None:
+        print(f"Bộ nhớ server: {results['server_idle_mb']:,} MB khi rảnh · {results['server_connected_mb']:,} MB "
+              f"với {results['sessions']} phiên · đỉnh {results['server_peak_mb']:,} MB "
+              f"→ {results['memory_per_session_kb']:,} KB mỗi phiên")
+
+    table = pd.DataFrame(results['latency']).set_index(['Trang', 'Thao tác'])
+    if baseline is not None:
+        base = pd.DataFrame(baseline['latency']).set_index(['Trang', 'Thao tác'])
+        for col in ['p50', 'p95']:
+            table[f'{col} so với mốc (%)'] = (100 * (table[col] / base[col].reindex(table.index) - 1)).round(1)
+    print("\nĐộ trễ theo trang (ms, từ lúc gửi yêu cầu đến khi script chạy xong):")
+    print(table.to_string())
+
+    if results['caches'] is not None:
+        print("\nHiệu quả cache (trong lúc chạy thử):")
+        print(pd.DataFrame(results['caches']).set_index('Hàm cache').to_string())
+    else:
+        print("\nKhông đo được hiệu quả cache với phiên bản Streamlit này.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm thử tải: mô phỏng nhiều người dùng đồng thời trên một server dashboard.")
+    parser.add_argument('--sessions', type=int, default=20, help="Số người dùng đồng thời (mặc định: %(default)s)")
+    parser.add_argument('--steps', type=int, default=5, help="Số lần đổi trang/bộ lọc mỗi người (mặc định: %(default)s)")
+    parser.add_argument('--ramp', type=float, default=0.0, help="Người dùng bắt đầu rải đều trong số giây này (mặc định: cùng lúc)")
+    parser.add_argument('--think', type=float, default=1.0, help="Thời gian nghỉ trung bình giữa các thao tác, giây (mặc định: %(default)s)")
+    parser.add_argument('--cold', action='store_true', help="Không làm nóng cache trước khi đo")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Lưu kết quả (dùng làm mốc so sánh)")
+    parser.add_argument('--baseline', help="File kết quả của lần chạy trước để so sánh")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)  # Server child process
+    parser.add_argument('--stats-file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.stats_file)
+        return
+
+    results = run_load_test(args.sessions, args.steps, args.seed, args.ramp, args.think, args.port, warm=not args.cold)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
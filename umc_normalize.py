@@ -0,0 +1,180 @@
+# umc_normalize.py
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+# --- Configuration ---
+SPECIALTY_ALIAS_FILE = "specialty_aliases.json"
+FUZZY_MATCH_THRESHOLD = 0.92  # SequenceMatcher ratio on accent-free keys
+FUZZY_MAX_CANDIDATES = 5      # Keys checked with SequenceMatcher after trigram blocking
+MAX_TOKEN_EDITS = 1           # Edits allowed inside the one differing word of an auto-merged typo
+MIN_TYPO_TOKEN_LENGTH = 4     # Shorter words (noi, nhi, mat...) are never treated as typos
+MAX_LISTED_SUGGESTIONS = 5
+
+_alias_lock = threading.Lock()
+
+# --- Text Normalization ---
+def normalize_text(name):
+    """Unicode NFC with surrounding whitespace stripped and inner runs collapsed to one space."""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', str(name))).strip()
+
+def specialty_key(name):
+    """Accent- and case-insensitive matching key: 'NỘI TỔNG QUÁT ' -> 'noi tong quat'."""
+    decomposed = unicodedata.normalize('NFD', normalize_text(name).casefold())
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.replace('đ', 'd')
+
+def _display_preference(name, count):
+    """Sort key for picking the display form among variants: accented, not all caps, most used."""
+    has_accents = specialty_key(name) != name.casefold()
+    return (has_accents, not name.isupper(), count)
+
+# --- Alias Table (persisted: key -> canonical display name) ---
+def load_alias_table(path=SPECIALTY_ALIAS_FILE):
+    """Reads the alias dictionary; a missing or unreadable file yields an empty table."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return dict(json.load(f).get('aliases', {}))
+    except (OSError, ValueError):
+        return {}
+
+def save_alias_table(aliases, path=SPECIALTY_ALIAS_FILE):
+    """Writes the alias dictionary sorted by key (atomically); returns False if the file is not writable."""
+    try:
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'aliases': dict(sorted(aliases.items()))}, f, ensure_ascii=False, indent=2)
+        os.replace(path + '.tmp', path)
+        return True
+    except OSError:
+        return False
+
+def add_aliases(new_aliases, path=SPECIALTY_ALIAS_FILE):
+    """Merges aliases found at ingestion into the stored table; returns False if it could not be written.
+
+    The file is re-read first, so entries stored since the loader read it are kept (they win over
+    `new_aliases`). Nothing is written when every key is already stored.
+    """
+    with _alias_lock:
+        aliases = load_alias_table(path)
+        missing = {key: name for key, name in new_aliases.items() if key not in aliases}
+        if not missing:
+            return True
+        aliases.update(missing)
+        return save_alias_table(aliases, path)
+
+# --- Fuzzy Match Index ---
+def _trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_fuzzy_index(keys):
+    """Trigram -> keys inverted index, so a lookup only compares against keys sharing trigrams."""
+    index = defaultdict(set)
+    for key in keys:
+        for gram in _trigrams(key):
+            index[gram].add(key)
+    return index
+
+def fuzzy_lookup(key, fuzzy_index, threshold=FUZZY_MATCH_THRESHOLD):
+    """Closest other known key for `key` at or above `threshold`, or None.
+
+    Keys whose digits differ ('noi 1' vs 'noi 2') are never matched.
+    """
+    shared = Counter()
+    for gram in _trigrams(key):
+        shared.update(fuzzy_index.get(gram, ()))
+    shared.pop(key, None)
+    digits = re.findall(r'\d+', key)
+
+    best_key, best_ratio = None, threshold
+    for candidate, _ in shared.most_common(FUZZY_MAX_CANDIDATES):
+        if re.findall(r'\d+', candidate) != digits:
+            continue
+        ratio = SequenceMatcher(None, key, candidate).ratio()
+        if ratio >= best_ratio:
+            best_key, best_ratio = candidate, ratio
+    return best_key
+
+def _edit_distance(a, b):
+    """Levenshtein distance (words are short, so the plain O(len(a) * len(b)) table is fine)."""
+    previous = list(range(len(b) + 1))
+    for i, ch_a in enumerate(a, 1):
+        current = [i]
+        for j, ch_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ch_a != ch_b)))
+        previous = current
+    return previous[-1]
+
+def is_spelling_variant(key, candidate):
+    """True when two keys can only be a typo of each other, so merging them is safe.
+
+    Allowed: different spacing ('tai mui hong' / 'taimui hong') or a small edit inside one long word
+    ('phuc hoi chuc nang' / 'phuc hoi chuc nagn'). A whole word that differs ('noi' / 'ngoai',
+    added 'nhi') marks a different specialty, however similar the rest of the name is.
+    """
+    if key.replace(' ', '') == candidate.replace(' ', ''):
+        return True
+    tokens, candidate_tokens = key.split(), candidate.split()
+    if len(tokens) != len(candidate_tokens):
+        return False
+    differing = [(a, b) for a, b in zip(tokens, candidate_tokens) if a != b]
+    if len(differing) != 1:
+        return False
+    a, b = differing[0]
+    return (min(len(a), len(b)) >= MIN_TYPO_TOKEN_LENGTH and not re.search(r'\d', a + b)
+            and _edit_distance(a, b) <= MAX_TOKEN_EDITS)
+
+def format_name_suggestions(suggestions):
+    """Load-report text for near-identical names that were kept apart."""
+    listed = ', '.join(f"'{name}' ~ '{other}'" for name, other in suggestions[:MAX_LISTED_SUGGESTIONS])
+    more = f" và {len(suggestions) - MAX_LISTED_SUGGESTIONS} cặp khác" if len(suggestions) > MAX_LISTED_SUGGESTIONS else ""
+    return (f"Có {len(suggestions)} cặp tên chuyên khoa gần giống nhau nhưng không tự động gộp: {listed}{more}. "
+            f"Nếu là cùng một chuyên khoa, sửa tên trong file dữ liệu hoặc trong {SPECIALTY_ALIAS_FILE}.")
+
+# --- Resolution ---
+def resolve_specialty_names(names, aliases):
+    """Maps raw specialty names to canonical display names.
+
+    `names` is a Series of raw names; only its unique values are resolved. Known keys use the
+    alias table; a new key is merged into its closest known key only when it is a spelling
+    variant of it, otherwise it becomes canonical with its preferred display variant. Returns
+    (mapping raw -> canonical, updated alias table, number of new aliases, suggestions), where
+    suggestions lists (name, similar name) pairs of distinct canonical names that look alike.
+    """
+    aliases = dict(aliases)
+    counts = names.value_counts()
+
+    # Group raw variants by key, remembering how often each display form occurs
+    variants = defaultdict(Counter)
+    for raw_name, count in counts.items():
+        variants[specialty_key(raw_name)][normalize_text(raw_name)] += count
+
+    fuzzy_index = build_fuzzy_index(aliases)
+    new_aliases = 0
+    for key, forms in variants.items():
+        if key in aliases:
+            continue
+        match = fuzzy_lookup(key, fuzzy_index)
+        if match is not None and is_spelling_variant(key, match):
+            aliases[key] = aliases[match]
+        else:
+            aliases[key] = max(forms.items(), key=lambda item: _display_preference(*item))[0]
+            for gram in _trigrams(key):
+                fuzzy_index[gram].add(key)
+        new_aliases += 1
+
+    # Near matches that were kept apart, reported on every load until they are resolved
+    suggestions = {}
+    for key in variants:
+        match = fuzzy_lookup(key, fuzzy_index)
+        if match is not None and aliases[match] != aliases[key]:
+            suggestions.setdefault(frozenset((aliases[key], aliases[match])), (aliases[key], aliases[match]))
+
+    mapping = {raw_name: aliases[specialty_key(raw_name)] for raw_name in counts.index}
+    return mapping, aliases, new_aliases, list(suggestions.values())
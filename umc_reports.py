@@ -0,0 +1,271 @@
+# umc_reports.py
+"""Batch rendering of the dashboard views into static report files.
+
+Run from a scheduler, e.g. cron at 06:00 on the 1st of each month:
+    python umc_reports.py                      # HTML for every view and standard range
+    python umc_reports.py --pdf                # also PDF (needs kaleido + weasyprint)
+
+Each page script is executed headlessly (Streamlit AppTest) with the range in session state, so
+the reports show exactly what the dashboard shows. Files are written to
+<REPORT_DIR>/<dataset version>/<view>_<range>.html; a version's files are never re-rendered
+unless --force is given, and manifest.json lists what is available for the 'Báo cáo' page and
+the API's /reports route. When the workbook is a corrected copy of a stored version, reports that
+none of the changed months can reach are copied from the previous version instead.
+"""
+import argparse
+import html
+import importlib.util
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+
+import pandas as pd
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from umc_index import build_rank_index, dataset_version
+from umc_loader import process_umc_workbook
+from umc_versions import record_version
+
+try:
+    import weasyprint
+except ImportError:  # Optional: PDF output needs weasyprint (and kaleido for static charts)
+    weasyprint = None
+
+# --- Configuration ---
+DATA_FILE = os.environ.get('UMC_DATA_FILE', 'So lieu UMC care.xlsx')
+REPORT_DIR = os.environ.get('UMC_REPORT_DIR', 'reports')
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+RENDER_TIMEOUT = 120  # Seconds per page run
+REPORT_LOOKBACK_MONTHS = 24  # Months before a range that still shape it (YoY comparisons, specialty profiles)
+
+REPORT_VIEWS = {
+    'tong_quan': ('Tổng quan', 'pages/1_Tong_quan.py'),
+    'kenh': ('Phân tích kênh', 'pages/2_Phan_tich_kenh.py'),
+    'chuyen_khoa': ('So sánh chuyên khoa', 'pages/3_So_sanh_chuyen_khoa.py'),
+}
+REPORT_RANGES = {
+    'thang': 'Tháng gần nhất',
+    'quy': 'Quý gần nhất',
+    'tu_dau_nam': 'Từ đầu năm',
+}
+
+REPORT_CSS = """
+body { font-family: 'Segoe UI', Arial, sans-serif; margin: 24px 40px; color: #262730; }
+.row { display: flex; gap: 24px; } .col { flex: 1; min-width: 0; }
+.metric { border: 1px solid #eee; border-radius: 6px; padding: 8px 12px; margin: 6px 0; }
+.metric .value { font-size: 1.6em; } .metric .delta { color: #09ab3b; } .metric .delta.neg { color: #ff2b2b; }
+.alert { padding: 8px 12px; border-radius: 6px; margin: 6px 0; background: #f0f2f6; }
+.alert.warning { background: #fffce7; } .alert.error { background: #ffecec; }
+.widget, .caption { color: #808495; font-size: 0.9em; }
+table { border-collapse: collapse; font-size: 0.85em; margin: 8px 0; }
+th, td { border: 1px solid #e6e9ef; padding: 3px 8px; text-align: right; } th { background: #f7f8fa; }
+footer { margin-top: 32px; color: #808495; font-size: 0.8em; }
+"""
+
+# --- Ranges ---
+def standard_ranges(latest_month):
+    """(start, end) month Timestamps of the standard report ranges, all ending at `latest_month`."""
+    latest_month = pd.Timestamp(latest_month)
+    return {
+        'thang': (latest_month, latest_month),
+        'quy': (latest_month.to_period('Q').start_time, latest_month),
+        'tu_dau_nam': (latest_month.replace(month=1), latest_month),
+    }
+
+# --- Element Rendering ---
+def _text_html(text):
+    """Escaped text with the **bold** markdown the pages use."""
+    return re.sub(r'\*\*(.+?)\*\*', r'<b>\1</b>', html.escape(text)).replace('\n', '<br>')
+
+def _figure_html(spec, static):
+    figure = pio.from_json(spec, skip_invalid=True)
+    if static:
+        # Inline SVG so the PDF renderer does not need to run JavaScript
+        return pio.to_image(figure, format='svg').decode('utf-8')
+    return pio.to_html(figure, full_html=False, include_plotlyjs=False)
+
+def _node_html(node, static):
+    """HTML for one AppTest element-tree node (blocks are rendered recursively)."""
+    node_type = getattr(node, 'type', None)
+    if hasattr(node, 'children'):
+        inner = ''.join(_node_html(child, static) for child in node.children.values())
+        if node_type == 'flex_container' and all(getattr(c, 'type', None) == 'column' for c in node.children.values()):
+            return f'<div class="row">{inner}</div>'
+        if node_type == 'column':
+            return f'<div class="col">{inner}</div>'
+        if node_type == 'expander':
+            return f'<details open><summary>{html.escape(node.label)}</summary>{inner}</details>'
+        return inner
+
+    if node_type in ('title', 'header', 'subheader'):
+        tag = {'title': 'h1', 'header': 'h2', 'subheader': 'h3'}[node_type]
+        return f'<{tag}>{html.escape(node.value)}</{tag}>'
+    if node_type == 'markdown':
+        return f'<p>{_text_html(node.value)}</p>'
+    if node_type == 'caption':
+        return f'<p class="caption">{_text_html(node.value)}</p>'
+    if node_type in ('info', 'success', 'warning', 'error'):
+        return f'<div class="alert {node_type}">{_text_html(node.value)}</div>'
+    if node_type == 'metric':
+        delta = ''
+        if node.delta:
+            negative = ' neg' if node.delta.lstrip().startswith('-') else ''
+            delta = f'<div class="delta{negative}">{html.escape(node.delta)}</div>'
+        return (f'<div class="metric"><div>{html.escape(node.label)}</div>'
+                f'<div class="value">{html.escape(node.value)}</div>{delta}</div>')
+    if node_type in ('dataframe', 'table'):
+        return node.value.to_html(float_format=lambda v: f'{v:,.1f}', na_rep='')
+    if node_type == 'plotly_chart':
+        return _figure_html(node.proto.spec, static)
+    if hasattr(node, 'label') and hasattr(node, 'value'):
+        # Widgets are frozen at their default: show the setting the report was rendered with
+        value = node.value
+        if isinstance(value, (list, tuple)):
+            value = ', '.join(map(str, value))
+        return f'<p class="widget">{html.escape(node.label)} {html.escape(str(value))}</p>'
+    return ''
+
+# --- Page Rendering ---
+def render_view(page_path, session, static=False):
+    """Runs one page script headlessly with `session` as its session state; returns its HTML body."""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(APP_DIR, page_path), default_timeout=RENDER_TIMEOUT)
+    for key, value in session.items():
+        app.session_state[key] = value
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"{page_path}: {app.exception[0].value}")
+    return _node_html(app.main, static)
+
+def _report_document(title, body, static):
+    # Offline viewers (no internet in the wards): plotly.js is embedded, not loaded from a CDN
+    plotly_js = '' if static else f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    generated = datetime.now().strftime('%d/%m/%Y %H:%M')
+    return (f'<!DOCTYPE html><html lang="vi"><head><meta charset="utf-8"><title>{html.escape(title)}</title>'
+            f'<style>{REPORT_CSS}</style>{plotly_js}</head><body>{body}'
+            f'<footer>{html.escape(title)} · Tạo lúc {generated}</footer></body></html>')
+
+def _write_atomic(path, content):
+    """Writes via a temp file so the dashboard never serves a half-written report."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+def pdf_available():
+    return weasyprint is not None and importlib.util.find_spec('kaleido') is not None
+
+# --- Batch Job ---
+def _reusable_reports(version_record, report_dir, force):
+    """The parent version's report manifest when its files may be carried over, else None."""
+    if force or version_record is None or version_record['parent'] is None or version_record['changed_months'] is None:
+        return None
+    return load_manifest(report_dir, version_record['parent'])
+
+def render_reports(data, report_dir=REPORT_DIR, pdf=False, force=False, log=print, version_record=None):
+    """Renders every view x standard range for `data`; returns the manifest of the version's reports.
+
+    With `version_record` (from umc_versions.record_version) reports of the parent version whose
+    range, including its look-back, holds none of the changed months are copied instead of rendered.
+    """
+    version = dataset_version(data)
+    version_dir = os.path.join(report_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    if pdf and not pdf_available():
+        raise ImportError("Xuất PDF cần cài thêm gói kaleido và weasyprint.")
+
+    latest_month = data.index.get_level_values('Month').max()
+    session = {
+        'umc_data': data,
+        'umc_data_version': version,
+        'umc_rank_index': build_rank_index(data),
+    }
+
+    parent_reports = _reusable_reports(version_record, report_dir, force)
+    reports = []
+    for range_name, (start, end) in standard_ranges(latest_month).items():
+        range_label = f"{REPORT_RANGES[range_name]} ({start.strftime('%m/%Y')} - {end.strftime('%m/%Y')})"
+        earliest_affecting = start - pd.DateOffset(months=REPORT_LOOKBACK_MONTHS)
+        unaffected = parent_reports is not None and all(
+            pd.Timestamp(month) < earliest_affecting for month in version_record['changed_months'])
+        for view_name, (view_label, page_path) in REPORT_VIEWS.items():
+            title = f"{view_label} - {range_label}"
+            entry = {'view': view_name, 'range': range_name, 'title': title,
+                     'start': start.strftime('%Y-%m'), 'end': end.strftime('%Y-%m'), 'files': {}}
+            base_path = os.path.join(version_dir, f"{view_name}_{range_name}")
+            view_session = dict(session, start_date=start, end_date=end)
+
+            if unaffected and any(r['view'] == view_name and r['range'] == range_name and r['start'] == entry['start']
+                                  and r['end'] == entry['end'] for r in parent_reports['reports']):
+                parent_base = os.path.join(report_dir, parent_reports['version'], f"{view_name}_{range_name}")
+                for ext in ('.html', '.pdf'):
+                    if not os.path.exists(base_path + ext) and os.path.exists(parent_base + ext):
+                        log(f"Dùng lại {title} ({ext[1:].upper()}) từ phiên bản {parent_reports['version']}")
+                        shutil.copy2(parent_base + ext, base_path + ext)
+
+            if force or not os.path.exists(base_path + '.html'):
+                log(f"Đang tạo {title} ...")
+                body = render_view(page_path, view_session)
+                _write_atomic(base_path + '.html', _report_document(title, body, static=False))
+            entry['files']['html'] = os.path.basename(base_path) + '.html'
+
+            if pdf:
+                if force or not os.path.exists(base_path + '.pdf'):
+                    log(f"Đang tạo PDF {title} ...")
+                    body = render_view(page_path, view_session, static=True)
+                    document = _report_document(title, body, static=True)
+                    _write_atomic(base_path + '.pdf', weasyprint.HTML(string=document).write_pdf())
+                entry['files']['pdf'] = os.path.basename(base_path) + '.pdf'
+            elif os.path.exists(base_path + '.pdf'):
+                entry['files']['pdf'] = os.path.basename(base_path) + '.pdf'
+            reports.append(entry)
+
+    manifest = {
+        'version': version,
+        'latest_month': latest_month.strftime('%Y-%m'),
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'reports': reports,
+    }
+    _write_atomic(os.path.join(version_dir, 'manifest.json'), json.dumps(manifest, ensure_ascii=False, indent=2))
+    return manifest
+
+def load_manifest(report_dir=REPORT_DIR, version=None):
+    """Manifest of `version`'s reports, or of the most recently generated version; None if there is none."""
+    if version is not None:
+        candidates = [os.path.join(report_dir, version, 'manifest.json')]
+    elif os.path.isdir(report_dir):
+        candidates = sorted((os.path.join(report_dir, name, 'manifest.json') for name in os.listdir(report_dir)),
+                            key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0, reverse=True)
+    else:
+        candidates = []
+    for path in candidates:
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo báo cáo tĩnh (HTML/PDF) cho các trang phân tích.")
+    parser.add_argument('--data', default=DATA_FILE, help="File Excel dữ liệu (mặc định: %(default)s)")
+    parser.add_argument('--out', default=REPORT_DIR, help="Thư mục lưu báo cáo (mặc định: %(default)s)")
+    parser.add_argument('--pdf', action='store_true', help="Xuất thêm PDF (cần kaleido + weasyprint)")
+    parser.add_argument('--force', action='store_true', help="Tạo lại cả các báo cáo đã có")
+    args = parser.parse_args()
+
+    data, report = process_umc_workbook(args.data)
+    for level, text in report['messages']:
+        print(f"[{level}] {text}")
+    if data is None:
+        raise SystemExit(1)
+    version_record = record_version(data, dataset_version(data), os.path.basename(args.data))
+    manifest = render_reports(data, args.out, pdf=args.pdf, force=args.force, version_record=version_record)
+    print(f"Đã có {len(manifest['reports'])} báo cáo cho phiên bản dữ liệu {manifest['version']} trong '{args.out}'.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+# umc_session.py
+# Compact, serializable session model. Datasets (frame + ranking index) are held once per process
+# and shared by every session; a session keeps references to them plus a small view state:
+#   {'v': dataset version, 'from': 'YYYY-MM', 'to': 'YYYY-MM', 'w': {widget key: value}}
+# The view is mirrored in the URL query parameters (a reload restores it) and can be saved to a
+# local store under a short id for sharing.
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+from umc_index import build_rank_index, refresh_rank_index, dataset_version
+from umc_loader import process_umc_workbook
+from umc_normalize import add_aliases
+from umc_versions import record_version
+
+# --- Configuration ---
+DEFAULT_DATA_FILE = "So lieu UMC care.xlsx"
+SESSION_STORE_DIR = "session_store"
+MAX_SHARED_DATASETS = 4
+
+# Widget selections worth restoring (all hold str/int/list values); others start from their defaults
+PERSISTED_WIDGETS = [
+    'overview_heatmap_metric_page1', 'overview_heatmap_column_page1', 'overview_resolution_page1',
+    'overview_rank_column_page1', 'overview_top_n_page1',
+    'channel_select_filter_page2', 'channel_resolution_page2',
+    'specialty_suggest_mode_page3', 'specialty_anchor_page3', 'specialty_select_compare_page3',
+    'specialty_resolution_page3',
+    'data_filter_option_page4', 'data_month_select_page4', 'data_channel_select_page4', 'data_specialty_select_page4',
+    'daily_month_select_page6', 'daily_specialty_select_page6',
+    'sim_source_page7', 'sim_target_page7', 'sim_pct_page7', 'sim_spread_page7', 'sim_n_page7', 'sim_specialties_page7',
+    'report_range_page8', 'report_view_page8',
+    'versions_old_page9', 'versions_new_page9',
+]
+
+# --- Shared Datasets ---
+@st.cache_resource
+def _shared_datasets():
+    """Process-wide {version: dataset entry}, least recently used first."""
+    return OrderedDict(), threading.Lock()
+
+def share_dataset(data, daily_store=None, source=None, new_aliases=None):
+    """The shared entry for `data` ({'version', 'data', 'rank_index', 'daily_store'}), created on first use.
+
+    With a `source` (file name) the version is also recorded in the version store; when the previous
+    version of that source is still in memory, only the months that changed are re-aggregated.
+    `new_aliases` from the loader's report are added to the alias table once, with the new entry.
+    """
+    version = dataset_version(data)
+    registry, lock = _shared_datasets()
+    with lock:
+        entry = registry.get(version)
+        if entry is None:
+            if new_aliases:
+                add_aliases(new_aliases)
+            rank_index = None
+            if source is not None:
+                record = record_version(data, version, source)
+                parent = registry.get(record['parent']) if record['parent'] else None
+                if parent is not None:
+                    rank_index = refresh_rank_index(parent['rank_index'], data, pd.to_datetime(record['changed_months']))
+            if rank_index is None:
+                rank_index = build_rank_index(data)
+            entry = {'version': version, 'data': data, 'rank_index': rank_index, 'daily_store': daily_store}
+            registry[version] = entry
+            while len(registry) > MAX_SHARED_DATASETS:
+                registry.popitem(last=False)
+        else:
+            registry.move_to_end(version)
+            if daily_store and not entry['daily_store']:
+                entry['daily_store'] = daily_store
+    return entry
+
+def shared_dataset(version):
+    """The shared entry for `version` if it is still in memory, else None."""
+    registry, lock = _shared_datasets()
+    with lock:
+        return registry.get(version)
+
+@st.cache_resource(ttl=3600)
+def _load_default_dataset(file_path, mtime):
+    data, report = process_umc_workbook(file_path)
+    if data is None or data.empty:
+        return None
+    return share_dataset(data, source=os.path.basename(file_path), new_aliases=report['new_aliases'])
+
+# --- View State ---
+def _month_str(ts):
+    return ts.strftime('%Y-%m') if ts is not None else None
+
+def _blank_view():
+    return {'v': None, 'from': None, 'to': None, 'w': {}}
+
+def current_view():
+    """This session's view state (created empty on first use)."""
+    if 'umc_view' not in st.session_state:
+        st.session_state['umc_view'] = _blank_view()
+    return st.session_state['umc_view']
+
+def activate_dataset(entry):
+    """Points the session at a shared dataset entry (None clears it); returns True if the dataset changed.
+
+    The date range is reset only on a change: to the view's range when the view was saved for this
+    same dataset (a restored session), otherwise to the full span.
+    """
+    state = st.session_state
+    version = entry['version'] if entry is not None else None
+    changed = state.get('umc_data_version') != version
+    state['umc_data'] = entry['data'] if entry is not None else None
+    state['umc_rank_index'] = entry['rank_index'] if entry is not None else None
+    state['umc_daily_store'] = entry['daily_store'] if entry is not None else None
+    state['umc_data_version'] = version
+    if not changed:
+        return False
+
+    view = current_view()
+    if entry is None:
+        state['start_date'], state['end_date'] = None, None
+        return True
+
+    months = entry['rank_index']['months']
+    start, end = months[0], months[-1]
+    if view['v'] == version and view['from'] and view['to']:
+        saved_start, saved_end = max(pd.Timestamp(view['from']), start), min(pd.Timestamp(view['to']), end)
+        if saved_start <= saved_end:
+            start, end = saved_start, saved_end
+    else:
+        view['w'] = {}  # Selections belong to the previous dataset
+    state['start_date'], state['end_date'] = start, end
+    view.update(v=version, **{'from': _month_str(start), 'to': _month_str(end)})
+    return True
+
+def _is_serializable(value):
+    if isinstance(value, (list, tuple)):
+        return all(isinstance(item, (str, int, float, bool)) for item in value)
+    return isinstance(value, (str, int, float, bool))
+
+def sync_widgets():
+    """Remembers the persisted widgets' values and puts them back on pages where they are not mounted yet.
+
+    Selections are tied to the date range: options (specialties, months, slider bounds) depend on it,
+    so a new range starts every page from its defaults, as before.
+    """
+    view, state = current_view(), st.session_state
+    selected_range = (_month_str(state.get('start_date')), _month_str(state.get('end_date')))
+    if (view['from'], view['to']) != selected_range:
+        view['w'] = {}
+        view['from'], view['to'] = selected_range
+    for key in PERSISTED_WIDGETS:
+        if key in state:
+            value = state[key]
+            if _is_serializable(value):
+                view['w'][key] = list(value) if isinstance(value, tuple) else value
+        elif key in view['w']:
+            state[key] = view['w'][key]
+
+def check_widget_value(key, options=None, min_value=None, max_value=None, multi=False):
+    """Drops or clamps a restored selection the widget about to be created would reject.
+
+    Call right before creating a persisted widget: a link only guarantees well-formed values, not
+    ones that fit this dataset and range. Unknown options are dropped (the widget falls back to its
+    default), numbers are clamped to [min_value, max_value].
+    """
+    state = st.session_state
+    if key not in state:
+        return
+    value = state[key]
+    options = list(options) if options is not None else None
+    if multi:
+        kept = [item for item in value if options is None or item in options] if isinstance(value, list) else []
+        if kept != value:
+            if kept:
+                state[key] = kept
+            else:
+                del state[key]
+        return
+    if options is not None and (isinstance(value, list) or value not in options):
+        del state[key]
+        return
+    if min_value is not None or max_value is not None:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            del state[key]
+            return
+        clamped = value
+        if min_value is not None:
+            clamped = max(clamped, min_value)
+        if max_value is not None:
+            clamped = min(clamped, max_value)
+        if clamped != value:
+            state[key] = clamped
+
+# --- URL and Local Store ---
+def encode_view(view):
+    """Query parameters for a view: readable v/from/to plus widget selections as compact base64 JSON."""
+    params = {name: view[name] for name in ('v', 'from', 'to') if view.get(name)}
+    if view.get('w'):
+        packed = zlib.compress(json.dumps(view['w'], ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        params['w'] = base64.urlsafe_b64encode(packed).decode('ascii').rstrip('=')
+    return params
+
+def decode_view(params):
+    """Inverse of encode_view; malformed parameters are ignored rather than failing the page.
+
+    Widget values are only checked for shape here; pages check them against the widget's current
+    options and bounds with check_widget_value.
+    """
+    view = _blank_view()
+    view['v'] = params.get('v') or None
+    for name in ('from', 'to'):
+        if re.fullmatch(r'\d{4}-\d{2}', params.get(name, '')):
+            view[name] = params[name]
+    if params.get('w'):
+        try:
+            packed = base64.urlsafe_b64decode(params['w'] + '=' * (-len(params['w']) % 4))
+            widgets = json.loads(zlib.decompress(packed).decode('utf-8'))
+            view['w'] = {key: value for key, value in widgets.items() if key in PERSISTED_WIDGETS and _is_serializable(value)}
+        except (ValueError, zlib.error, AttributeError):
+            pass
+    return view
+
+def sync_query_params():
+    """Mirrors the current view in the URL (only written when it differs)."""
+    params = encode_view(current_view())
+    if st.query_params.to_dict() != params:
+        st.query_params.from_dict(params)
+
+def save_view(view, store_dir=SESSION_STORE_DIR):
+    """Stores a view under a short content-derived id (same view, same id) and returns the id."""
+    body = json.dumps(view, ensure_ascii=False, sort_keys=True)
+    view_id = hashlib.sha1(body.encode('utf-8')).hexdigest()[:10]
+    path = os.path.join(store_dir, f"{view_id}.json")
+    if not os.path.exists(path):
+        os.makedirs(store_dir, exist_ok=True)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(path + '.tmp', path)
+    return view_id
+
+def load_view(view_id, store_dir=SESSION_STORE_DIR):
+    """A stored view by id, or None when unknown."""
+    if not re.fullmatch(r'[0-9a-f]{10}', view_id or ''):
+        return None
+    path = os.path.join(store_dir, f"{view_id}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return decode_view(encode_view(json.load(f)))  # Same validation as URL parameters
+
+# --- Session Restore ---
+def restore_session(default_file=DEFAULT_DATA_FILE):
+    """Run at the top of every script: restores the view from the URL on the session's first run,
+    attaches a shared dataset when the session has none, then syncs widgets and the URL.
+
+    Pages pass the default data file so a reload straight onto a page works; the main script passes
+    None and activates the dataset itself.
+    """
+    state = st.session_state
+    if 'umc_view' not in state:
+        params = st.query_params.to_dict()
+        state['umc_view'] = (load_view(params['view']) if 'view' in params else None) or decode_view(params)
+
+    view = current_view()
+    if state.get('umc_data') is None and default_file is not None:
+        entry = shared_dataset(view['v']) if view['v'] else None
+        if entry is None and os.path.exists(default_file):
+            entry = _load_default_dataset(default_file, os.path.getmtime(default_file))
+        if entry is not None:
+            if view['v'] and view['v'] != entry['version']:
+                st.info("Dữ liệu đã thay đổi kể từ khi lưu chế độ xem; đang hiển thị toàn bộ khoảng thời gian.")
+            activate_dataset(entry)
+
+    sync_view()
+
+def sync_view():
+    """Brings the view state and the URL up to date with the session (no-op until a dataset is active)."""
+    if st.session_state.get('umc_data_version') is None:
+        return
+    sync_widgets()
+    sync_query_params()
@@ -0,0 +1,132 @@
+# umc_similarity.py
+# Specialty profiles (recent monthly 'Grand Total' shape + channel shares), k-means clusters and a
+# precomputed nearest-neighbour table, derived from the ranking index's prefix sums.
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.decomposition import PCA
+from sklearn.neighbors import NearestNeighbors
+
+# --- Configuration ---
+PROFILE_MONTHS = 24        # Length of the 'Grand Total' series in each profile (fixed, so clusters can warm-start)
+PROFILE_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+MAX_NEIGHBORS = 10
+MAX_CLUSTERS = 8
+
+# --- Profiles ---
+def specialty_profiles(rank_index, n_months=PROFILE_MONTHS):
+    """Feature vectors for every specialty with registrations in the last `n_months` calendar months.
+
+    The series block is each specialty's monthly 'Grand Total' divided by its own mean (the shape of
+    its demand, not its size), scaled so the block weighs about as much as the channel-share block.
+    """
+    months = rank_index['months']
+    window = pd.date_range(end=months[-1], periods=n_months, freq='MS')
+    lo = months.searchsorted(window[0], side='left')
+    prefix = rank_index['prefix'][lo:]
+
+    # Per-month values straight from the prefix sums; calendar gaps become 0
+    monthly = np.diff(prefix, axis=0)
+    columns = rank_index['columns']
+    gt = columns.index('Grand Total')
+    series = pd.DataFrame(monthly[:, :, gt].T, columns=months[lo:]).reindex(columns=window, fill_value=0).to_numpy(dtype=np.float64)
+
+    channels = [ch for ch in PROFILE_CHANNELS if ch in columns]
+    channel_totals = (prefix[-1] - prefix[0])[:, [columns.index(ch) for ch in channels]].astype(np.float64)
+
+    totals = series.sum(axis=1)
+    active = totals > 0
+    series, channel_totals, totals = series[active], channel_totals[active], totals[active]
+
+    shape = series / (totals[:, None] / n_months)
+    channel_sum = channel_totals.sum(axis=1, keepdims=True)
+    shares = np.divide(channel_totals, channel_sum, out=np.zeros_like(channel_totals), where=channel_sum > 0)
+
+    return {
+        'months': window,
+        'specialties': rank_index['specialties'][active],
+        'channels': channels,
+        'totals': totals,
+        'shares': shares,
+        'features': np.hstack([shape / np.sqrt(n_months), shares]),
+    }
+
+def _same_profiles(previous, profiles):
+    return (previous is not None
+            and previous['months'].equals(profiles['months'])
+            and previous['specialties'].equals(profiles['specialties'])
+            and np.array_equal(previous['features'], profiles['features']))
+
+# --- Index ---
+def build_similarity_index(rank_index, previous=None, n_clusters=None):
+    """Clusters and all-pairs nearest neighbours for the current profiles.
+
+    With `previous` (the index built for the prior dataset version) the whole index is returned as is
+    when every profile is identical. Otherwise all profiles are refit; k-means then starts from the
+    previous centres so cluster numbers stay stable as months arrive.
+    """
+    profiles = specialty_profiles(rank_index)
+    if _same_profiles(previous, profiles):
+        return previous
+
+    features = profiles['features']
+    n_specialties = len(features)
+    if n_clusters is None:
+        n_clusters = int(np.clip(round(np.sqrt(n_specialties / 2)), 1, MAX_CLUSTERS))
+    n_clusters = min(n_clusters, n_specialties)
+
+    if n_specialties == 0:
+        labels, centers = np.empty(0, dtype=int), np.empty((0, features.shape[1]))
+    else:
+        if previous is not None and previous['centers'].shape == (n_clusters, features.shape[1]):
+            kmeans = KMeans(n_clusters=n_clusters, init=previous['centers'], n_init=1)
+        else:
+            kmeans = KMeans(n_clusters=n_clusters, n_init=10, random_state=0)
+        labels, centers = kmeans.fit_predict(features), kmeans.cluster_centers_
+
+    # Neighbour table for every specialty (itself excluded), so lookups never touch the model
+    n_neighbors = min(MAX_NEIGHBORS, n_specialties - 1)
+    if n_neighbors > 0:
+        distances, neighbors = NearestNeighbors(n_neighbors=n_neighbors + 1).fit(features).kneighbors(features)
+        distances, neighbors = distances[:, 1:], neighbors[:, 1:]
+    else:
+        distances = np.empty((n_specialties, 0))
+        neighbors = np.empty((n_specialties, 0), dtype=int)
+
+    return dict(profiles,
+                labels=labels,
+                centers=centers,
+                neighbors=neighbors,
+                distances=distances)
+
+# --- Queries ---
+def similar_specialties(similarity_index, specialty, n=5):
+    """The `n` specialties closest to `specialty`, as a Series of distances sorted ascending."""
+    specialties = similarity_index['specialties']
+    if specialty not in specialties:
+        return pd.Series(dtype='float64', name='Khoảng cách')
+    pos = specialties.get_loc(specialty)
+    neighbors = similarity_index['neighbors'][pos, :n]
+    return pd.Series(similarity_index['distances'][pos, :n], index=specialties[neighbors], name='Khoảng cách')
+
+def suggest_comparison_set(similarity_index, specialty, n=5):
+    """`specialty` followed by its n-1 nearest neighbours: a like-for-like comparison set."""
+    return [specialty] + similar_specialties(similarity_index, specialty, n - 1).index.tolist()
+
+def cluster_table(similarity_index):
+    """One row per specialty: cluster number, recent total and channel shares (%)."""
+    table = pd.DataFrame(similarity_index['shares'] * 100,
+                         index=similarity_index['specialties'],
+                         columns=similarity_index['channels'])
+    table.insert(0, 'Tổng lượt', similarity_index['totals'].astype(np.int64))
+    table.insert(0, 'Nhóm', similarity_index['labels'] + 1)
+    return table.sort_values(['Nhóm', 'Tổng lượt'], ascending=[True, False])
+
+def profile_projection(similarity_index):
+    """2-D PCA coordinates of the profiles, for plotting the clusters."""
+    features = similarity_index['features']
+    n_components = min(2, len(features) - 1, features.shape[1])
+    coords = np.zeros((len(features), 2))
+    if n_components > 0:
+        coords[:, :n_components] = PCA(n_components=n_components).fit_transform(features)
+    return pd.DataFrame(coords, index=similarity_index['specialties'], columns=['x', 'y'])
@@ -0,0 +1,65 @@
+# umc_simulator.py
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+
+# --- Channel Cube ---
+def build_channel_cube(data):
+    """Dense month x specialty x channel array of registrations (missing combinations are 0)."""
+    channels = [ch for ch in EXPECTED_CHANNELS if ch in data.columns]
+    months = data.index.get_level_values('Month').unique().sort_values()
+    specialties = data.index.get_level_values('Chuyên khoa').unique().sort_values()
+    full_index = pd.MultiIndex.from_product([months, specialties], names=['Month', 'Chuyên khoa'])
+    cube = data[channels].reindex(full_index, fill_value=0).to_numpy(dtype=np.float64)
+    return {
+        'months': months,
+        'specialties': specialties,
+        'channels': channels,
+        'cube': cube.reshape(len(months), len(specialties), len(channels)),
+    }
+
+def slice_months(channel_cube, start_date, end_date):
+    """The cube restricted to months in [start_date, end_date] (a view, no copy)."""
+    months = channel_cube['months']
+    lo = months.searchsorted(start_date, side='left')
+    hi = months.searchsorted(end_date, side='right')
+    return dict(channel_cube, months=months[lo:hi], cube=channel_cube['cube'][lo:hi])
+
+# --- Scenarios ---
+def sample_shift_fractions(base_fractions, n_scenarios, spread=0.0, seed=0):
+    """(n_scenarios, S) shift fractions around per-specialty `base_fractions`.
+
+    Each scenario scales each specialty's fraction by its own factor drawn uniformly from
+    [1 - spread, 1 + spread], so specialties respond independently and the totals form a real
+    distribution of outcomes; scenario 0 is always the base case. Results are clipped to [0, 1].
+    """
+    base_fractions = np.asarray(base_fractions, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    factors = rng.uniform(1 - spread, 1 + spread, size=(n_scenarios, len(base_fractions)))
+    factors[0] = 1.0
+    return np.clip(factors * base_fractions[None, :], 0.0, 1.0)
+
+def shift_matrices(fractions, n_channels, source, target):
+    """(K, S, C, C) row-stochastic matrices moving fractions[k, s] of channel `source` to `target`.
+
+    Entry [k, s, i, j] is the share of specialty s's channel-i registrations that end up in
+    channel j under scenario k.
+    """
+    n_scenarios, n_specialties = fractions.shape
+    matrices = np.broadcast_to(np.eye(n_channels), (n_scenarios, n_specialties, n_channels, n_channels)).copy()
+    matrices[:, :, source, source] -= fractions
+    matrices[:, :, source, target] += fractions
+    return matrices
+
+def evaluate_scenarios(cube, matrices):
+    """Applies every scenario's shift matrices to a (M, S, C) cube in one pass.
+
+    Returns 'monthly' (K, M, C) all-specialty totals per month and 'specialty' (K, S, C) totals
+    over the months; the (K, M, S, C) intermediate is never materialised.
+    """
+    return {
+        'monthly': np.einsum('msi,ksij->kmj', cube, matrices, optimize=True),
+        'specialty': np.einsum('si,ksij->ksj', cube.sum(axis=0), matrices, optimize=True),
+    }
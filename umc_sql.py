@@ -0,0 +1,122 @@
+# umc_sql.py
+# Optional DuckDB store for ad-hoc slicing of the pivoted dataset.
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # Optional dependency: the SQL page explains how to enable it
+    duckdb = None
+
+# --- Configuration ---
+EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+# Display column -> SQL column in the `registrations` table
+SQL_COLUMN_NAMES = {
+    'Bàn Khám': 'ban_kham',
+    'PKH': 'pkh',
+    'Tổng đài': 'tong_dai',
+    'UMC Care': 'umc_care',
+    'Grand Total': 'grand_total',
+}
+MAX_RESULT_ROWS = 10000
+
+SCHEMA_DESCRIPTION = """\
+registrations(month DATE, specialty VARCHAR, ban_kham, pkh, tong_dai, umc_care, grand_total BIGINT)
+registrations_long(month DATE, specialty VARCHAR, channel VARCHAR, registrations BIGINT)
+Tham số: $start, $end (DATE, khoảng thời gian đang chọn)"""
+
+# Parameterized counterparts of the dashboard analyses (and a few common ad-hoc questions)
+ANALYSIS_QUERIES = {
+    'Tổng lượt đăng ký theo tháng và kênh': """\
+SELECT month, SUM(ban_kham) AS ban_kham, SUM(pkh) AS pkh, SUM(tong_dai) AS tong_dai,
+       SUM(umc_care) AS umc_care, SUM(grand_total) AS grand_total
+FROM registrations
+WHERE month BETWEEN $start AND $end
+GROUP BY month
+ORDER BY month""",
+    'Phân bố kênh tổng hợp': """\
+SELECT channel, SUM(registrations) AS registrations,
+       ROUND(100.0 * SUM(registrations) / SUM(SUM(registrations)) OVER (), 1) AS pct
+FROM registrations_long
+WHERE month BETWEEN $start AND $end
+GROUP BY channel
+ORDER BY registrations DESC""",
+    'Top chuyên khoa theo tổng lượt đăng ký': """\
+SELECT specialty, SUM(grand_total) AS grand_total
+FROM registrations
+WHERE month BETWEEN $start AND $end
+GROUP BY specialty
+ORDER BY grand_total DESC, specialty
+LIMIT 10""",
+    'Tỷ lệ UMC Care theo chuyên khoa và quý': """\
+SELECT date_trunc('quarter', month) AS quarter, specialty,
+       SUM(umc_care) AS umc_care, SUM(grand_total) AS grand_total,
+       ROUND(100.0 * SUM(umc_care) / NULLIF(SUM(grand_total), 0), 1) AS umc_care_pct
+FROM registrations
+WHERE month BETWEEN $start AND $end
+GROUP BY ALL
+ORDER BY quarter, umc_care_pct DESC NULLS LAST""",
+}
+
+# --- Store ---
+def build_duckdb_store(data):
+    """In-memory DuckDB database holding the pivoted frame as `registrations` (+ a long view).
+
+    External file/network access is disabled once the tables exist, so ad-hoc queries can
+    only read the dataset. Returns None when duckdb is not installed.
+    """
+    if duckdb is None:
+        return None
+
+    frame = data.reset_index()
+    select_cols = ['CAST("Month" AS DATE) AS month', '"Chuyên khoa" AS specialty']
+    for column, sql_name in SQL_COLUMN_NAMES.items():
+        select_cols.append(f'CAST("{column}" AS BIGINT) AS {sql_name}' if column in frame.columns else f'CAST(0 AS BIGINT) AS {sql_name}')
+
+    con = duckdb.connect(database=':memory:')
+    con.register('pivoted_frame', frame)
+    con.execute(f"CREATE TABLE registrations AS SELECT {', '.join(select_cols)} FROM pivoted_frame ORDER BY month, specialty")
+    con.unregister('pivoted_frame')
+    con.execute("CREATE VIEW registrations_long AS " + " UNION ALL ".join(
+        f"SELECT month, specialty, '{channel}' AS channel, {SQL_COLUMN_NAMES[channel]} AS registrations FROM registrations"
+        for channel in EXPECTED_CHANNELS
+    ))
+    con.execute("SET enable_external_access = false")
+    return con
+
+# --- Queries ---
+def read_only_statement(con, sql):
+    """The parsed statement when `sql` is exactly one SELECT (WITH ... SELECT included), else None.
+
+    Uses DuckDB's own parser, so keywords inside string literals or identifiers do not matter.
+    Parse errors propagate. Disabled external access in the store remains the real protection.
+    """
+    statements = con.extract_statements(sql)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        return None
+    return statements[0]
+
+def run_query(con, sql, start_date=None, end_date=None, max_rows=MAX_RESULT_ROWS):
+    """Runs a read-only query on its own cursor, binding $start/$end when the SQL uses them.
+
+    Returns (DataFrame of at most max_rows rows, truncated flag).
+    """
+    cursor = con.cursor()  # Cursors are safe to use concurrently on one shared connection
+    try:
+        statement = read_only_statement(cursor, sql)
+        if statement is None:
+            raise ValueError("Chỉ hỗ trợ một câu lệnh SELECT/WITH.")
+        params = {}
+        if 'start' in statement.named_parameters:
+            params['start'] = start_date.date()
+        if 'end' in statement.named_parameters:
+            params['end'] = end_date.date()
+        if params:
+            cursor.execute(statement.query, params)
+        else:
+            cursor.execute(statement.query)
+        columns = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchmany(max_rows + 1)  # One extra row tells us whether we truncated
+    finally:
+        cursor.close()
+    truncated = len(rows) > max_rows
+    return pd.DataFrame.from_records(rows[:max_rows], columns=columns), truncated
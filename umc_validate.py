@@ -0,0 +1,118 @@
+# umc_validate.py
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+EXPECTED_CHANNELS = ['Bàn Khám', 'PKH', 'Tổng đài', 'UMC Care']
+STATED_TOTAL_COLUMN = 'Grand Total'
+OUTLIER_MAD_THRESHOLD = 5.0  # Robust z-score above which a count is flagged
+OUTLIER_MIN_MONTHS = 4       # Months of history a specialty needs before outliers are flagged
+
+# Issue key -> report column label
+ISSUE_LABELS = {
+    'non_numeric': 'Không phải số',
+    'negative': 'Số âm',
+    'outlier': 'Bất thường',
+    'missing_channel': 'Thiếu kênh',
+    'total_mismatch': 'Lệch Grand Total',
+}
+# Issue key -> what the loader does with such cells (only mentioned when the issue occurs)
+ISSUE_HANDLING = {
+    'non_numeric': 'Ô không phải số được tính là 0.',
+    'missing_channel': 'Kênh thiếu được tính là 0.',
+    'total_mismatch': 'Grand Total được tính lại từ các kênh.',
+}
+
+# --- Validation ---
+def validate_channel_values(raw_df, expected_channels=EXPECTED_CHANNELS):
+    """Validates the channel columns of all sheets in one pass.
+
+    `raw_df` is the concatenation of every sheet's rows with columns 'Sheet', 'Chuyên khoa',
+    the raw (uncoerced) channel columns and, when the sheet states one, 'Grand Total'.
+    Returns (numeric channel frame with bad cells as NaN, per-sheet issue counts,
+    per-cell issue details).
+    """
+    channels = [ch for ch in expected_channels if ch in raw_df.columns]
+    raw_values = raw_df[channels]
+
+    # Coerce every channel cell at once through a single flattened Series
+    flat = pd.to_numeric(pd.Series(raw_values.to_numpy().ravel()), errors='coerce')
+    numeric = pd.DataFrame(flat.to_numpy(dtype=np.float64).reshape(raw_values.shape),
+                           index=raw_df.index, columns=channels)
+
+    masks = {
+        'non_numeric': numeric.isna() & raw_values.notna(),
+        'negative': numeric < 0,
+    }
+
+    # Outliers: robust z-score against the same specialty's other months (median / MAD)
+    by_specialty = numeric.groupby(raw_df['Chuyên khoa'])
+    median = by_specialty.transform('median')
+    abs_dev = (numeric - median).abs()
+    mad = abs_dev.groupby(raw_df['Chuyên khoa']).transform('median') * 1.4826
+    months_seen = by_specialty.transform('count')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        robust_z = abs_dev / mad
+    masks['outlier'] = (robust_z > OUTLIER_MAD_THRESHOLD) & (mad > 0) & (months_seen >= OUTLIER_MIN_MONTHS)
+
+    raw_array = raw_values.to_numpy()
+    channel_names = np.asarray(channels, dtype=object)
+    details = []
+    for issue, mask in masks.items():
+        rows, cols = np.nonzero(mask.to_numpy())
+        if len(rows) == 0:
+            continue
+        details.append(pd.DataFrame({
+            'Sheet': raw_df['Sheet'].to_numpy()[rows],
+            'Chuyên khoa': raw_df['Chuyên khoa'].to_numpy()[rows],
+            'Kênh': channel_names[cols],
+            'Giá trị': raw_array[rows, cols].astype(str),
+            'Vấn đề': ISSUE_LABELS[issue],
+        }))
+
+    # Stated 'Grand Total' that doesn't match the sum of the channels
+    if STATED_TOTAL_COLUMN in raw_df.columns:
+        stated = pd.to_numeric(raw_df[STATED_TOTAL_COLUMN], errors='coerce')
+        computed = numeric.fillna(0).sum(axis=1)
+        mismatch = stated.notna() & (stated != computed)
+        if mismatch.any():
+            details.append(pd.DataFrame({
+                'Sheet': raw_df.loc[mismatch, 'Sheet'].to_numpy(),
+                'Chuyên khoa': raw_df.loc[mismatch, 'Chuyên khoa'].to_numpy(),
+                'Kênh': STATED_TOTAL_COLUMN,
+                'Giá trị': (stated[mismatch].map('{:,.0f}'.format) + ' ≠ ' + computed[mismatch].map('{:,.0f}'.format)).to_numpy(),
+                'Vấn đề': ISSUE_LABELS['total_mismatch'],
+            }))
+
+    # Channels missing (absent or entirely blank) per sheet
+    present = raw_df[channels].notna().groupby(raw_df['Sheet'], sort=False).any()
+    present = present.reindex(columns=list(expected_channels), fill_value=False)
+    rows, cols = np.nonzero(~present.to_numpy())
+    if len(rows):
+        details.append(pd.DataFrame({
+            'Sheet': present.index.to_numpy()[rows],
+            'Chuyên khoa': '',
+            'Kênh': present.columns.to_numpy()[cols],
+            'Giá trị': '',
+            'Vấn đề': ISSUE_LABELS['missing_channel'],
+        }))
+
+    if not details:
+        summary = pd.DataFrame(columns=list(ISSUE_LABELS.values()), dtype='int64')
+        details = pd.DataFrame(columns=['Sheet', 'Chuyên khoa', 'Kênh', 'Giá trị', 'Vấn đề'])
+        return numeric, summary, details
+
+    details = pd.concat(details, ignore_index=True)
+    summary = (details.groupby(['Sheet', 'Vấn đề']).size().unstack(fill_value=0)
+               .reindex(index=present.index, columns=list(ISSUE_LABELS.values()), fill_value=0))
+    summary = summary[summary.sum(axis=1) > 0]
+
+    return numeric, summary, details
+
+def describe_issues(summary, details):
+    """Load-report text naming the issue types actually found and how each is handled."""
+    counts = details['Vấn đề'].value_counts()
+    found = [(issue, label) for issue, label in ISSUE_LABELS.items() if label in counts.index]
+    breakdown = ', '.join(f'{label}: {counts[label]:,}' for _, label in found)
+    handling = ' '.join(ISSUE_HANDLING[issue] for issue, _ in found if issue in ISSUE_HANDLING)
+    return f"Phát hiện {len(details):,} vấn đề dữ liệu trong {len(summary)} sheet ({breakdown}). {handling}".strip()
@@ -0,0 +1,175 @@
+# umc_versions.py
+# Stored revisions of the pivoted dataset (one compressed dense cube per version) and vectorized
+# cell-level diffs between them over (Month, Chuyên khoa, channel).
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from umc_loader import EXPECTED_CHANNELS
+
+# --- Configuration ---
+VERSION_STORE_DIR = "data_versions"
+VERSION_MANIFEST = "versions.json"
+MAX_STORED_VERSIONS = 24
+CHANGE_LABELS = {'added': 'Thêm mới', 'removed': 'Bị xóa', 'modified': 'Thay đổi'}
+
+_manifest_lock = threading.Lock()
+
+# --- Compact Form ---
+def version_cube(data):
+    """Dense form of a pivoted frame: months x specialties x channels counts plus a row-presence mask.
+
+    'Grand Total' and the all-month totals are derived from the channels, so they are not stored.
+    """
+    channels = [ch for ch in EXPECTED_CHANNELS if ch in data.columns]
+    month_values = data.index.get_level_values('Month')
+    specialty_values = data.index.get_level_values('Chuyên khoa')
+    months = month_values.unique().sort_values()
+    specialties = specialty_values.unique().sort_values()
+
+    m_pos, s_pos = months.get_indexer(month_values), specialties.get_indexer(specialty_values)
+    cube = np.zeros((len(months), len(specialties), len(channels)), dtype=np.int64)
+    present = np.zeros((len(months), len(specialties)), dtype=bool)
+    cube[m_pos, s_pos] = data[channels].to_numpy(dtype=np.int64)
+    present[m_pos, s_pos] = True
+    return {'months': months, 'specialties': specialties, 'channels': channels, 'cube': cube, 'present': present}
+
+def _version_path(version, store_dir):
+    return os.path.join(store_dir, f"{version}.npz")
+
+def _save_version_cube(version, vcube, store_dir):
+    path = _version_path(version, store_dir)
+    with open(path + '.tmp', 'wb') as f:
+        np.savez_compressed(
+            f,
+            months=vcube['months'].to_numpy(dtype='datetime64[ns]'),
+            specialties=np.asarray(vcube['specialties'], dtype=str),
+            channels=np.asarray(vcube['channels'], dtype=str),
+            cube=vcube['cube'],
+            present=vcube['present'],
+        )
+    os.replace(path + '.tmp', path)
+
+def load_version(version, store_dir=VERSION_STORE_DIR):
+    """The stored cube of `version`, or None when it is not (or no longer) stored."""
+    path = _version_path(version, store_dir)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as stored:
+        return {
+            'months': pd.DatetimeIndex(stored['months'], name='Month'),
+            'specialties': pd.Index(stored['specialties'].tolist(), name='Chuyên khoa'),
+            'channels': stored['channels'].tolist(),
+            'cube': stored['cube'],
+            'present': stored['present'],
+        }
+
+# --- Diff ---
+def _aligned(vcube, months, specialties, channels):
+    cube = np.zeros((len(months), len(specialties), len(channels)), dtype=np.int64)
+    present = np.zeros((len(months), len(specialties)), dtype=bool)
+    m_pos, s_pos = months.get_indexer(vcube['months']), specialties.get_indexer(vcube['specialties'])
+    c_pos = [channels.index(ch) for ch in vcube['channels']]
+    cube[np.ix_(m_pos, s_pos, c_pos)] = vcube['cube']
+    present[np.ix_(m_pos, s_pos)] = vcube['present']
+    return cube, present
+
+def diff_versions(old, new):
+    """Changed cells between two version cubes, one row per (Month, Chuyên khoa, Kênh).
+
+    Both cubes are scattered onto the union of their months, specialties and channels, so the whole
+    comparison is one array operation. A row present in only one version is reported as added or
+    removed on every channel, even where the value is 0.
+    """
+    months = old['months'].union(new['months'])
+    specialties = old['specialties'].union(new['specialties'])
+    channels = [ch for ch in EXPECTED_CHANNELS if ch in old['channels'] or ch in new['channels']]
+    old_cube, old_present = _aligned(old, months, specialties, channels)
+    new_cube, new_present = _aligned(new, months, specialties, channels)
+
+    delta = new_cube - old_cube
+    changed = (delta != 0) | (old_present != new_present)[:, :, None]
+    m, s, c = np.nonzero(changed)
+    kind = np.where(~old_present[m, s], 'added', np.where(~new_present[m, s], 'removed', 'modified'))
+    return pd.DataFrame({
+        'Month': months[m],
+        'Chuyên khoa': specialties[s],
+        'Kênh': np.asarray(channels, dtype=object)[c],
+        'Cũ': old_cube[m, s, c],
+        'Mới': new_cube[m, s, c],
+        'Chênh lệch': delta[m, s, c],
+        'Loại': pd.Series(kind).map(CHANGE_LABELS).to_numpy(),
+    })
+
+def changed_months(diff):
+    """Sorted months with at least one changed cell."""
+    return pd.DatetimeIndex(diff['Month'].unique(), name='Month').sort_values()
+
+def diff_summary(diff):
+    """Per-month count of changed cells and specialties, with the net and absolute change."""
+    if diff.empty:
+        return pd.DataFrame(columns=['Ô thay đổi', 'Chuyên khoa', 'Chênh lệch ròng', 'Tổng thay đổi tuyệt đối'])
+    grouped = diff.groupby('Month')
+    return pd.DataFrame({
+        'Ô thay đổi': grouped.size(),
+        'Chuyên khoa': grouped['Chuyên khoa'].nunique(),
+        'Chênh lệch ròng': grouped['Chênh lệch'].sum(),
+        'Tổng thay đổi tuyệt đối': grouped['Chênh lệch'].apply(lambda d: d.abs().sum()),
+    })
+
+# --- Version Store ---
+def load_version_manifest(store_dir=VERSION_STORE_DIR):
+    """Stored versions, oldest first: dicts with version, saved, source, parent, changed_months, changed_cells."""
+    path = os.path.join(store_dir, VERSION_MANIFEST)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _write_manifest(manifest, store_dir):
+    path = os.path.join(store_dir, VERSION_MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+def record_version(data, version, source, store_dir=VERSION_STORE_DIR):
+    """Stores `data` as `version` (once) and returns its manifest entry.
+
+    The parent is the latest stored version from the same source (e.g. the previous copy of the same
+    workbook); the entry lists the months whose cells differ from it, or None without a parent.
+    """
+    with _manifest_lock:
+        manifest = load_version_manifest(store_dir)
+        existing = next((entry for entry in manifest if entry['version'] == version), None)
+        if existing is not None:
+            return existing
+
+        os.makedirs(store_dir, exist_ok=True)
+        vcube = version_cube(data)
+        parent = next((entry for entry in reversed(manifest) if entry['source'] == source), None)
+        parent_cube = load_version(parent['version'], store_dir) if parent is not None else None
+        entry = {
+            'version': version,
+            'saved': datetime.now().isoformat(timespec='seconds'),
+            'source': source,
+            'parent': parent['version'] if parent_cube is not None else None,
+            'changed_months': None,
+            'changed_cells': None,
+        }
+        if parent_cube is not None:
+            diff = diff_versions(parent_cube, vcube)
+            entry['changed_months'] = [month.strftime('%Y-%m') for month in changed_months(diff)]
+            entry['changed_cells'] = int(len(diff))
+
+        _save_version_cube(version, vcube, store_dir)
+        manifest.append(entry)
+        for dropped in manifest[:-MAX_STORED_VERSIONS]:
+            if os.path.exists(_version_path(dropped['version'], store_dir)):
+                os.remove(_version_path(dropped['version'], store_dir))
+        manifest = manifest[-MAX_STORED_VERSIONS:]
+        _write_manifest(manifest, store_dir)
+        return entry